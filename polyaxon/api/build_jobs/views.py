@@ -29,7 +29,14 @@ from api.endpoint.base import (
 from api.endpoint.build import BuildEndpoint, BuildResourceEndpoint, BuildResourceListEndpoint
 from api.endpoint.project import ProjectResourceListEndpoint
 from api.filters import OrderingFilter, QueryFilter
-from api.utils.files import stream_file
+from api.utils.files import (
+    get_logs_max_age,
+    get_positive_int_param,
+    query_logs_file,
+    search_logs_response,
+    stream_logs_file,
+    tail_logs_response
+)
 from api.utils.views.bookmarks_mixin import BookmarkedListMixinView
 from db.models.build_jobs import BuildJob, BuildJobStatus
 from db.redis.heartbeat import RedisHeartBeat
@@ -46,7 +53,7 @@ from event_manager.events.build_job import (
 )
 from event_manager.events.project import PROJECT_BUILDS_VIEWED
 from libs.archive import archive_logs_file
-from logs_handlers.log_queries.build_job import process_logs
+from logs_handlers.log_queries.build_job import process_logs, tail_logs
 from polyaxon.celery_api import celery_app
 from polyaxon.settings import SchedulerCeleryTasks
 from scopes.authentication.internal import InternalAuthentication
@@ -210,6 +217,19 @@ class BuildStatusDetailView(BuildResourceEndpoint, RetrieveEndpoint):
     lookup_url_kwarg = 'uuid'
 
 
+def get_build_logs_path(build: BuildJob, max_age: float = 0) -> str:
+    job_name = build.unique_name
+    if build.is_done:
+        log_path = stores.get_job_logs_path(job_name=job_name, temp=False)
+        return archive_logs_file(
+            log_path=log_path,
+            namepath=job_name)
+
+    return query_logs_file(log_path=stores.get_job_logs_path(job_name=job_name, temp=True),
+                           query_logs=lambda: process_logs(build=build, temp=True),
+                           max_age=max_age)
+
+
 class BuildLogsView(BuildEndpoint, RetrieveEndpoint):
     """Get build logs."""
 
@@ -218,17 +238,27 @@ class BuildLogsView(BuildEndpoint, RetrieveEndpoint):
                        instance=self.build,
                        actor_id=request.user.id,
                        actor_name=request.user.username)
-        job_name = self.build.unique_name
-        if self.build.is_done:
-            log_path = stores.get_job_logs_path(job_name=job_name, temp=False)
-            log_path = archive_logs_file(
-                log_path=log_path,
-                namepath=job_name)
-        else:
-            process_logs(build=self.build, temp=True)
-            log_path = stores.get_job_logs_path(job_name=job_name, temp=True)
-
-        return stream_file(file_path=log_path, logger=_logger)
+        if not self.build.is_done:
+            tail = get_positive_int_param(request, 'tail')
+            since_seconds = get_positive_int_param(request, 'since_seconds')
+            if tail is not None or since_seconds is not None:
+                return tail_logs_response(
+                    tail_logs(build=self.build, tail_lines=tail, since_seconds=since_seconds))
+        log_path = get_build_logs_path(build=self.build, max_age=get_logs_max_age(request))
+        return stream_logs_file(request=request, file_path=log_path, logger=_logger)
+
+
+class BuildLogsSearchView(BuildEndpoint, RetrieveEndpoint):
+    """Search build logs."""
+
+    def get(self, request, *args, **kwargs):
+        auditor.record(event_type=BUILD_JOB_LOGS_VIEWED,
+                       instance=self.build,
+                       actor_id=request.user.id,
+                       actor_name=request.user.username)
+        log_path = get_build_logs_path(build=self.build,
+                                       max_age=conf.get('LOGS_SEARCH_CACHE_TTL'))
+        return search_logs_response(request=request, file_paths=[log_path])
 
 
 class BuildStopView(BuildEndpoint, CreateEndpoint):
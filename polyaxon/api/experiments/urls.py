@@ -62,6 +62,12 @@ experiments_urlpatterns = [
     re_path(r'^{}/{}/experiments/{}/logs/?$'.format(
         OWNER_NAME_PATTERN, PROJECT_NAME_PATTERN, EXPERIMENT_ID_PATTERN),
         views.ExperimentLogsView.as_view()),
+    re_path(r'^{}/{}/experiments/{}/logs/search/?$'.format(
+        OWNER_NAME_PATTERN, PROJECT_NAME_PATTERN, EXPERIMENT_ID_PATTERN),
+        views.ExperimentLogsSearchView.as_view()),
+    re_path(r'^{}/{}/experiments/{}/resources/?$'.format(
+        OWNER_NAME_PATTERN, PROJECT_NAME_PATTERN, EXPERIMENT_ID_PATTERN),
+        views.ExperimentResourcesView.as_view()),
     re_path(r'^{}/{}/experiments/{}/stop/?$'.format(
         OWNER_NAME_PATTERN, PROJECT_NAME_PATTERN, EXPERIMENT_ID_PATTERN),
         views.ExperimentStopView.as_view()),
@@ -53,7 +53,15 @@ from api.experiments.serializers import (
 )
 from api.filters import OrderingFilter, QueryFilter
 from api.paginator import LargeLimitOffsetPagination
-from api.utils.files import stream_file
+from api.utils.files import (
+    get_logs_max_age,
+    get_positive_int_param,
+    query_logs_file,
+    search_logs_response,
+    stream_file,
+    stream_logs_file,
+    tail_logs_response
+)
 from api.utils.gzip import gzip
 from api.utils.views.bookmarks_mixin import BookmarkedListMixinView
 from api.utils.views.protected import ProtectedView
@@ -69,6 +77,7 @@ from db.models.experiments import (
 from db.models.tokens import Token
 from db.redis.ephemeral_tokens import RedisEphemeralTokens
 from db.redis.heartbeat import RedisHeartBeat
+from db.redis.resources import RedisResourcesSeries
 from db.redis.tll import RedisTTL
 from event_manager.events.chart_view import CHART_VIEW_CREATED, CHART_VIEW_DELETED
 from event_manager.events.experiment import (
@@ -95,8 +104,9 @@ from event_manager.events.experiment_job import (
 from event_manager.events.project import PROJECT_EXPERIMENTS_VIEWED
 from libs.archive import archive_logs_file, archive_outputs, archive_outputs_file
 from libs.spec_validation import validate_experiment_spec_config
-from logs_handlers.log_queries.experiment import process_logs
+from logs_handlers.log_queries.experiment import process_logs, tail_logs
 from logs_handlers.log_queries.experiment_job import process_logs as process_experiment_job_logs
+from logs_handlers.log_queries.experiment_job import tail_logs as tail_experiment_job_logs
 from polyaxon.celery_api import celery_app
 from polyaxon.settings import LogsCeleryTasks, SchedulerCeleryTasks
 from scopes.authentication.ephemeral import EphemeralAuthentication
@@ -594,7 +604,7 @@ class ExperimentJobDetailView(ExperimentJobEndpoint,
     AUDITOR_EVENT_TYPES = {'GET': EXPERIMENT_JOB_VIEWED}
 
 
-def get_experiment_logs_path(experiment: Experiment) -> Optional[str]:
+def get_experiment_logs_path(experiment: Experiment, max_age: float = 0) -> Optional[str]:
     experiment_name = experiment.unique_name
     if experiment.is_done:
         log_path = stores.get_experiment_logs_path(experiment_name=experiment_name, temp=False)
@@ -602,15 +612,19 @@ def get_experiment_logs_path(experiment: Experiment) -> Optional[str]:
             log_path=log_path,
             namepath=experiment_name)
     elif experiment.in_cluster:
-        process_logs(experiment=experiment, temp=True)
-        logs_path = stores.get_experiment_logs_path(experiment_name=experiment_name, temp=True)
+        logs_path = query_logs_file(
+            log_path=stores.get_experiment_logs_path(experiment_name=experiment_name, temp=True),
+            query_logs=lambda: process_logs(experiment=experiment, temp=True),
+            max_age=max_age)
     else:
         return None
 
     return logs_path
 
 
-def get_experiment_job_logs_path(experiment: Experiment, job: ExperimentJob) -> Optional[str]:
+def get_experiment_job_logs_path(experiment: Experiment,
+                                 job: ExperimentJob,
+                                 max_age: float = 0) -> Optional[str]:
     if not job:
         return None
     job_name = job.unique_name
@@ -620,14 +634,36 @@ def get_experiment_job_logs_path(experiment: Experiment, job: ExperimentJob) ->
             log_path=log_path,
             namepath=job_name)
     elif experiment.in_cluster:
-        process_experiment_job_logs(experiment_job=job, temp=True)
-        logs_path = stores.get_experiment_job_logs_path(experiment_job_name=job_name, temp=True)
+        logs_path = query_logs_file(
+            log_path=stores.get_experiment_job_logs_path(experiment_job_name=job_name, temp=True),
+            query_logs=lambda: process_experiment_job_logs(experiment_job=job, temp=True),
+            max_age=max_age)
     else:
         logs_path = None
 
     return logs_path
 
 
+def get_experiment_tail_logs(request,
+                             experiment: Experiment,
+                             job: Optional[ExperimentJob]) -> Optional[str]:
+    """
+    Queries the `tail` last lines, or the lines of the last `since_seconds`,
+    from k8s if the experiment is running.
+    """
+    tail = get_positive_int_param(request, 'tail')
+    since_seconds = get_positive_int_param(request, 'since_seconds')
+    if tail is None and since_seconds is None:
+        return None
+    if experiment.is_done or not experiment.in_cluster:
+        return None
+    if job:
+        return tail_experiment_job_logs(experiment_job=job,
+                                        tail_lines=tail,
+                                        since_seconds=since_seconds)
+    return tail_logs(experiment=experiment, tail_lines=tail, since_seconds=since_seconds)
+
+
 class ExperimentLogsView(ExperimentEndpoint, RetrieveEndpoint, PostEndpoint):
     """
     get:
@@ -641,16 +677,24 @@ class ExperimentLogsView(ExperimentEndpoint, RetrieveEndpoint, PostEndpoint):
                        instance=self.experiment,
                        actor_id=request.user.id,
                        actor_name=request.user.username)
+        job = None
         if self.experiment.is_distributed:
             job = self.experiment.jobs.order_by('created_at').first()
-            logs_path = get_experiment_job_logs_path(experiment=self.experiment, job=job)
+        log_lines = get_experiment_tail_logs(request=request, experiment=self.experiment, job=job)
+        if log_lines is not None:
+            return tail_logs_response(log_lines)
+        max_age = get_logs_max_age(request)
+        if self.experiment.is_distributed:
+            logs_path = get_experiment_job_logs_path(experiment=self.experiment,
+                                                     job=job,
+                                                     max_age=max_age)
         else:
-            logs_path = get_experiment_logs_path(experiment=self.experiment)
+            logs_path = get_experiment_logs_path(experiment=self.experiment, max_age=max_age)
         if not logs_path:
             return Response(status=status.HTTP_404_NOT_FOUND,
                             data='Experiment has no logs.')
 
-        return stream_file(file_path=logs_path, logger=_logger)
+        return stream_logs_file(request=request, file_path=logs_path, logger=_logger)
 
     def post(self, request, *args, **kwargs):
         log_lines = request.data
@@ -669,6 +713,76 @@ class ExperimentLogsView(ExperimentEndpoint, RetrieveEndpoint, PostEndpoint):
         return Response(status=status.HTTP_200_OK)
 
 
+class ExperimentLogsSearchView(ExperimentEndpoint, RetrieveEndpoint):
+    """
+    get:
+        Search experiment logs.
+    """
+
+    def get(self, request, *args, **kwargs):
+        auditor.record(event_type=EXPERIMENT_LOGS_VIEWED,
+                       instance=self.experiment,
+                       actor_id=request.user.id,
+                       actor_name=request.user.username)
+        replica = request.query_params.get('replica')
+        max_age = conf.get('LOGS_SEARCH_CACHE_TTL')
+        if not self.experiment.is_distributed:
+            return search_logs_response(
+                request=request,
+                file_paths=[get_experiment_logs_path(self.experiment, max_age=max_age)],
+                replica=replica)
+
+        # Every replica's logs are in a separate file
+        jobs = self.experiment.jobs.order_by('created_at')
+        if replica:
+            role, _, sequence = replica.partition('.')
+            jobs = jobs.filter(role=role)
+            if sequence:
+                if not sequence.isdigit():
+                    raise ValidationError('`replica` must be a role or a `role.index`.')
+                jobs = jobs.filter(sequence=int(sequence))
+        file_paths = [get_experiment_job_logs_path(experiment=self.experiment,
+                                                   job=job,
+                                                   max_age=max_age)
+                      for job in jobs]
+        return search_logs_response(request=request, file_paths=file_paths)
+
+
+class ExperimentResourcesView(ExperimentEndpoint, RetrieveEndpoint):
+    """
+    get:
+        Returns the resources history of the experiment's jobs at a resolution.
+    """
+
+    def get(self, request, *args, **kwargs):
+        resolutions = conf.get('RESOURCES_SERIES_RESOLUTIONS')
+        resolution = request.query_params.get('resolution', resolutions[0])
+        since = request.query_params.get('since')
+        try:
+            resolution = int(resolution)
+            since = float(since) if since else None
+        except ValueError:
+            raise ValidationError('`resolution` and `since` must be numbers.')
+        if resolution not in resolutions:
+            raise ValidationError('`resolution` must be one of {}.'.format(
+                ', '.join(str(r) for r in resolutions)))
+
+        jobs = list(self.experiment.jobs.order_by('created_at').values_list(
+            'uuid', 'role', 'sequence'))
+        points = RedisResourcesSeries.get_points(job_uuids=[job[0].hex for job in jobs],
+                                                 resolution=resolution,
+                                                 since=since)
+        data = {
+            'resolution': resolution,
+            'jobs': [{
+                'uuid': job_uuid.hex,
+                'replica': '{}.{}'.format(role, sequence),
+                'points': points[job_uuid.hex],
+            } for job_uuid, role, sequence in jobs]
+        }
+        return Response(data=data, status=status.HTTP_200_OK)
+
+
 class ExperimentHeartBeatView(ExperimentEndpoint, PostEndpoint):
     """
     post:
@@ -765,15 +879,22 @@ class ExperimentJobLogsView(ExperimentJobResourceEndpoint,
                        instance=self.experiment,
                        actor_id=request.user.id,
                        actor_name=request.user.username)
+        job = self.job if self.experiment.is_distributed else None
+        log_lines = get_experiment_tail_logs(request=request, experiment=self.experiment, job=job)
+        if log_lines is not None:
+            return tail_logs_response(log_lines)
+        max_age = get_logs_max_age(request)
         if self.experiment.is_distributed:
-            logs_path = get_experiment_job_logs_path(experiment=self.experiment, job=self.job)
+            logs_path = get_experiment_job_logs_path(experiment=self.experiment,
+                                                     job=self.job,
+                                                     max_age=max_age)
         else:
-            logs_path = get_experiment_logs_path(experiment=self.experiment)
+            logs_path = get_experiment_logs_path(experiment=self.experiment, max_age=max_age)
         if not logs_path:
             return Response(status=status.HTTP_404_NOT_FOUND,
                             data='Experiment has no logs.')
 
-        return stream_file(file_path=logs_path, logger=_logger)
+        return stream_logs_file(request=request, file_path=logs_path, logger=_logger)
 
 
 class ExperimentStopView(ExperimentEndpoint, CreateEndpoint):
@@ -28,6 +28,9 @@ jobs_urlpatterns = [
     re_path(r'^{}/{}/jobs/{}/logs/?$'.format(
         OWNER_NAME_PATTERN, PROJECT_NAME_PATTERN, JOB_ID_PATTERN),
         views.JobLogsView.as_view()),
+    re_path(r'^{}/{}/jobs/{}/logs/search/?$'.format(
+        OWNER_NAME_PATTERN, PROJECT_NAME_PATTERN, JOB_ID_PATTERN),
+        views.JobLogsSearchView.as_view()),
     re_path(r'^{}/{}/jobs/{}/stop/?$'.format(
         OWNER_NAME_PATTERN, PROJECT_NAME_PATTERN, JOB_ID_PATTERN),
         views.JobStopView.as_view()),
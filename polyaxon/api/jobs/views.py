@@ -32,7 +32,15 @@ from api.jobs.serializers import (
     JobSerializer,
     JobStatusSerializer
 )
-from api.utils.files import stream_file
+from api.utils.files import (
+    get_logs_max_age,
+    get_positive_int_param,
+    query_logs_file,
+    search_logs_response,
+    stream_file,
+    stream_logs_file,
+    tail_logs_response
+)
 from api.utils.views.bookmarks_mixin import BookmarkedListMixinView
 from api.utils.views.protected import ProtectedView
 from constants.jobs import JobLifeCycle
@@ -55,7 +63,7 @@ from event_manager.events.job import (
 from event_manager.events.project import PROJECT_JOBS_VIEWED
 from libs.archive import archive_logs_file, archive_outputs, archive_outputs_file
 from libs.spec_validation import validate_job_spec_config
-from logs_handlers.log_queries.job import process_logs
+from logs_handlers.log_queries.job import process_logs, tail_logs
 from polyaxon.celery_api import celery_app
 from polyaxon.settings import SchedulerCeleryTasks
 from scopes.authentication.internal import InternalAuthentication
@@ -267,6 +275,19 @@ class JobStatusDetailView(JobResourceEndpoint, RetrieveEndpoint):
     lookup_url_kwarg = 'uuid'
 
 
+def get_job_logs_path(job: Job, max_age: float = 0) -> str:
+    job_name = job.unique_name
+    if job.is_done:
+        log_path = stores.get_job_logs_path(job_name=job_name, temp=False)
+        return archive_logs_file(
+            log_path=log_path,
+            namepath=job_name)
+
+    return query_logs_file(log_path=stores.get_job_logs_path(job_name=job_name, temp=True),
+                           query_logs=lambda: process_logs(job=job, temp=True),
+                           max_age=max_age)
+
+
 class JobLogsView(JobEndpoint, RetrieveEndpoint):
     """Get job logs."""
 
@@ -275,17 +296,26 @@ class JobLogsView(JobEndpoint, RetrieveEndpoint):
                        instance=self.job,
                        actor_id=request.user.id,
                        actor_name=request.user.username)
-        job_name = self.job.unique_name
-        if self.job.is_done:
-            log_path = stores.get_job_logs_path(job_name=job_name, temp=False)
-            log_path = archive_logs_file(
-                log_path=log_path,
-                namepath=job_name)
-        else:
-            process_logs(job=self.job, temp=True)
-            log_path = stores.get_job_logs_path(job_name=job_name, temp=True)
-
-        return stream_file(file_path=log_path, logger=_logger)
+        if not self.job.is_done:
+            tail = get_positive_int_param(request, 'tail')
+            since_seconds = get_positive_int_param(request, 'since_seconds')
+            if tail is not None or since_seconds is not None:
+                return tail_logs_response(
+                    tail_logs(job=self.job, tail_lines=tail, since_seconds=since_seconds))
+        log_path = get_job_logs_path(job=self.job, max_age=get_logs_max_age(request))
+        return stream_logs_file(request=request, file_path=log_path, logger=_logger)
+
+
+class JobLogsSearchView(JobEndpoint, RetrieveEndpoint):
+    """Search job logs."""
+
+    def get(self, request, *args, **kwargs):
+        auditor.record(event_type=JOB_LOGS_VIEWED,
+                       instance=self.job,
+                       actor_id=request.user.id,
+                       actor_name=request.user.username)
+        log_path = get_job_logs_path(job=self.job, max_age=conf.get('LOGS_SEARCH_CACHE_TTL'))
+        return search_logs_response(request=request, file_paths=[log_path])
 
 
 class JobStopView(JobEndpoint, PostEndpoint):
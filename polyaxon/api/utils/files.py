@@ -1,23 +1,67 @@
 import mimetypes
 import os
+import re
+import time
 
-from typing import Any, Union
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
 from wsgiref.util import FileWrapper
 
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 
-from django.http import StreamingHttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 
+import conf
 
-def stream_file(file_path: str, logger: Any) -> Union[Response, StreamingHttpResponse]:
+from libs.log_blocks import (
+    get_blocks_lines_range,
+    get_blocks_tail_offset,
+    get_blocks_time_range,
+    get_compacted_index,
+    is_compacted,
+    read_log_blocks
+)
+from libs.log_files import get_lines_range, get_tail_offset, get_time_range
+from libs.log_search import search_log_files
+
+LOGS_CURSOR_HEADER = 'X-Polyaxon-Logs-Cursor'
+RANGE_REGEX = re.compile(r'^bytes=(\d*)-(\d*)$')
+TIME_REGEX = re.compile(r'^(\d{4}-\d{2}-\d{2})[T ](\d{2}:\d{2}:\d{2})(?:\.\d+)?Z?$')
+RANGE_PARAMS = ('offset', 'limit', 'start_time', 'end_time')
+
+_queried_logs = {}  # Maps the temp log paths of running runs to the time they were queried at
+
+
+def _read_file(file_obj: Any, length: int, chunk_size: int) -> Iterable[bytes]:
+    with file_obj:
+        while length > 0:
+            chunk = file_obj.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def stream_file(file_path: str,
+                logger: Any,
+                start: int = 0,
+                end: Optional[int] = None) -> Union[Response, StreamingHttpResponse]:
     filename = os.path.basename(file_path)
     chunk_size = 8192
     try:
-        wrapped_file = FileWrapper(open(file_path, 'rb'), chunk_size)
+        file_size = os.path.getsize(file_path)
+        start = min(start, file_size)
+        end = file_size if end is None else max(min(end, file_size), start)
+        file_obj = open(file_path, 'rb')
+        if start or end < file_size:
+            file_obj.seek(start)
+            wrapped_file = _read_file(file_obj, length=end - start, chunk_size=chunk_size)
+        else:
+            wrapped_file = FileWrapper(file_obj, chunk_size)
         response = StreamingHttpResponse(wrapped_file,
                                          content_type=mimetypes.guess_type(file_path)[0])
-        response['Content-Length'] = os.path.getsize(file_path)
+        response['Content-Length'] = end - start
         response['Content-Disposition'] = "attachment; filename={}".format(filename)
         return response
     except FileNotFoundError:
@@ -28,3 +72,208 @@ def stream_file(file_path: str, logger: Any) -> Union[Response, StreamingHttpRes
         return Response(
             status=status.HTTP_400_BAD_REQUEST,
             data='Could not get the file, an error was encountered.')
+
+
+def get_positive_int_param(request: Any, param: str) -> Optional[int]:
+    value = request.query_params.get(param)
+    if value is None or value == '':
+        return None
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        value = -1
+    if value < 0:
+        raise ValidationError('`{}` must be a positive integer.'.format(param))
+    return value
+
+
+def get_time_param(request: Any, param: str) -> Optional[str]:
+    """Returns the timestamp, in the format the log lines are prefixed with."""
+    value = request.query_params.get(param)
+    if not value:
+        return None
+    match = TIME_REGEX.match(value.strip())
+    if not match:
+        raise ValidationError('`{}` must be a UTC timestamp, e.g. `2019-01-01T10:00:00`.'.format(
+            param))
+    return '{} {}'.format(*match.groups())
+
+
+def stream_log_blocks(file_path: str,
+                      index: Dict,
+                      start: int,
+                      end: int) -> StreamingHttpResponse:
+    """Streams a range of compacted logs, only the blocks overlapping the range are read."""
+    start = min(start, index['size'])
+    end = max(min(end, index['size']), start)
+    response = StreamingHttpResponse(read_log_blocks(file_path=file_path,
+                                                     index=index,
+                                                     start=start,
+                                                     end=end),
+                                     content_type='text/plain')
+    response['Content-Length'] = end - start
+    response['Content-Disposition'] = "attachment; filename={}".format(
+        os.path.basename(file_path))
+    return response
+
+
+def get_range(range_header: str, file_size: int) -> Optional[Tuple[int, int]]:
+    """Returns the [start, end) bytes of a single range header, None if it's not valid."""
+    match = RANGE_REGEX.match(range_header.strip())
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range, e.g. `bytes=-500` for the last 500 bytes
+        return max(file_size - int(last), 0), file_size
+    start = int(first)
+    end = min(int(last) + 1, file_size) if last else file_size
+    if last and end <= start:
+        return None
+    return start, end
+
+
+def stream_logs_file(request: Any,
+                     file_path: str,
+                     logger: Any) -> Union[Response, StreamingHttpResponse]:
+    """
+    Streams the logs or a part of them, based on the request:
+
+        * `Range` header: a single bytes range.
+        * `tail=N`: the last N lines.
+        * `offset=N&limit=M`: M lines starting from the Nth line.
+        * `start_time=T1&end_time=T2`: the lines logged between the two timestamps.
+        * `since=N`: the logs after the N byte offset.
+
+    The response's cursor header holds the byte offset to resume from.
+
+    The logs of finished runs can be compacted, only the blocks needed are then decompressed.
+    """
+    index = get_compacted_index(file_path)
+    if index:
+        file_size = index['size']
+    else:
+        try:
+            file_size = os.path.getsize(file_path)
+        except OSError:
+            return stream_file(file_path=file_path, logger=logger)
+
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE')
+    if range_header:
+        byte_range = get_range(range_header=range_header, file_size=file_size)
+    tail = get_positive_int_param(request, 'tail')
+    line_offset = get_positive_int_param(request, 'offset')
+    limit = get_positive_int_param(request, 'limit')
+    start_time = get_time_param(request, 'start_time')
+    end_time = get_time_param(request, 'end_time')
+    if byte_range:
+        start, end = byte_range
+        if start >= file_size:
+            response = Response(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+            response['Content-Range'] = 'bytes */{}'.format(file_size)
+            return response
+    elif tail is not None and index:
+        start, end = get_blocks_tail_offset(file_path=file_path, index=index, lines=tail), file_size
+    elif tail is not None:
+        start, end = get_tail_offset(file_path=file_path, lines=tail), file_size
+    elif (line_offset is not None or limit is not None) and index:
+        start, end = get_blocks_lines_range(file_path=file_path,
+                                            index=index,
+                                            offset=line_offset or 0,
+                                            limit=limit)
+    elif line_offset is not None or limit is not None:
+        start, end = get_lines_range(file_path=file_path, offset=line_offset or 0, limit=limit)
+    elif (start_time or end_time) and index:
+        start, end = get_blocks_time_range(file_path=file_path,
+                                           index=index,
+                                           start_time=start_time,
+                                           end_time=end_time)
+    elif start_time or end_time:
+        start, end = get_time_range(file_path=file_path, start_time=start_time, end_time=end_time)
+    else:
+        start, end = get_positive_int_param(request, 'since') or 0, file_size
+
+    if index:
+        response = stream_log_blocks(file_path=file_path, index=index, start=start, end=end)
+    else:
+        response = stream_file(file_path=file_path, logger=logger, start=start, end=end)
+    if isinstance(response, StreamingHttpResponse):
+        start = min(start, file_size)
+        response[LOGS_CURSOR_HEADER] = start + int(response['Content-Length'])
+        response['Accept-Ranges'] = 'bytes'
+        if byte_range:
+            response.status_code = status.HTTP_206_PARTIAL_CONTENT
+            response['Content-Range'] = 'bytes {}-{}/{}'.format(
+                start, start + int(response['Content-Length']) - 1, file_size)
+    return response
+
+
+def get_logs_max_age(request) -> float:
+    """
+    The ranged reads of a running run's logs, e.g. paging through them,
+    reuse the logs queried less than `LOGS_RANGE_CACHE_TTL` seconds ago.
+    """
+    if request.META.get('HTTP_RANGE') or any(param in request.query_params
+                                             for param in RANGE_PARAMS):
+        return conf.get('LOGS_RANGE_CACHE_TTL')
+    return 0
+
+
+def query_logs_file(log_path: str, query_logs: Callable[[], None], max_age: float = 0) -> str:
+    """
+    Queries the logs of a running run from k8s to its temp log path,
+    the logs queried by this process less than `max_age` seconds ago are reused,
+    e.g. by successive searches or ranged reads.
+    """
+    now = time.monotonic()
+    queried_at = _queried_logs.get(log_path)
+    if queried_at is None or now - queried_at >= max_age or not os.path.exists(log_path):
+        query_logs()
+        _queried_logs[log_path] = now
+    for path, queried_at in list(_queried_logs.items()):
+        if now - queried_at >= max_age:
+            _queried_logs.pop(path, None)
+    return log_path
+
+
+def tail_logs_response(log_lines: str) -> HttpResponse:
+    """Returns the last lines queried from k8s for a running job, without persisting them."""
+    return HttpResponse('{}\n'.format(log_lines) if log_lines else '', content_type='text/plain')
+
+
+def search_logs_response(request: Any,
+                         file_paths: List[str],
+                         replica: Optional[str] = None) -> Union[Response, StreamingHttpResponse]:
+    """
+    Streams the log lines matching the request's filters:
+
+        * `q`: a regex the lines must match.
+        * `replica`: the name of the replica the lines were logged by, e.g. `worker.3`.
+        * `since`/`until`: the lines logged between the two timestamps.
+        * `limit`: the maximum number of lines.
+
+    The lines are sent while the files are scanned.
+    """
+    query = request.query_params.get('q')
+    try:
+        pattern = re.compile(query.encode('utf-8')) if query else None
+    except re.error as e:
+        raise ValidationError('`q` is not a valid regex: {}.'.format(e))
+    start_time = get_time_param(request, 'since')
+    end_time = get_time_param(request, 'until')
+    limit = get_positive_int_param(request, 'limit')
+
+    file_paths = [file_path for file_path in file_paths
+                  if file_path and (os.path.exists(file_path) or is_compacted(file_path))]
+    if not file_paths:
+        return Response(status=status.HTTP_404_NOT_FOUND, data='No logs found.')
+
+    return StreamingHttpResponse(search_log_files(file_paths=file_paths,
+                                                  limit=limit,
+                                                  max_workers=conf.get('LOGS_SEARCH_WORKERS'),
+                                                  pattern=pattern,
+                                                  replica=replica,
+                                                  start_time=start_time,
+                                                  end_time=end_time),
+                                 content_type='text/plain')
@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from logs_handlers.utils import _lock_log
+from logs_handlers.writer import LogWriter
+
+LOG_LINE = '2019-01-01T10:00:00.000000000Z Epoch 1/10 - loss: 0.2345 - acc: 0.9123'
+
+
+class Command(BaseCommand):
+    """Compares the lines/sec of the per-batch locked writes with the buffered log writer."""
+    help = 'Benchmarks the sidecar logs writes.'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--lines',
+            type=int,
+            default=100000,
+            dest='lines',
+            help='Specifies the number of log lines to write.',
+        )
+        parser.add_argument(
+            '--runs',
+            type=int,
+            default=50,
+            dest='runs',
+            help='Specifies the number of runs the lines are spread across.',
+        )
+        parser.add_argument(
+            '--batch',
+            type=int,
+            default=1,
+            dest='batch',
+            help='Specifies the number of lines per write, the sidecar sends small batches.',
+        )
+
+    @staticmethod
+    def _get_batches(log_dir: str, lines: int, runs: int, batch: int):
+        log_paths = [os.path.join(log_dir, 'run_{}'.format(i), 'logs.txt') for i in range(runs)]
+        log_lines = '\n'.join([LOG_LINE] * batch)
+        for i in range(lines // batch):
+            yield log_paths[i % runs], log_lines
+
+    @staticmethod
+    def _create_path(log_path: str) -> None:
+        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+
+    def _benchmark_lock_log(self, log_dir: str, lines: int, runs: int, batch: int) -> float:
+        start = time.monotonic()
+        for log_path, log_lines in self._get_batches(log_dir, lines, runs, batch):
+            self._create_path(log_path)
+            _lock_log(log_path, log_lines, append=True)
+        return time.monotonic() - start
+
+    def _benchmark_log_writer(self, log_dir: str, lines: int, runs: int, batch: int) -> float:
+        log_writer = LogWriter(max_files=runs, flush_interval=1, buffer_size=256 * 1024)
+        start = time.monotonic()
+        for log_path, log_lines in self._get_batches(log_dir, lines, runs, batch):
+            log_writer.write(log_path=log_path,
+                             log_lines=log_lines,
+                             create_path=lambda path=log_path: self._create_path(path))
+        log_writer.close()
+        return time.monotonic() - start
+
+    def handle(self, *args, **options) -> None:
+        lines = options['lines']
+        runs = options['runs']
+        batch = options['batch']
+        for name, benchmark in [('open/flock', self._benchmark_lock_log),
+                                ('buffered writer', self._benchmark_log_writer)]:
+            log_dir = tempfile.mkdtemp()
+            try:
+                duration = benchmark(log_dir, lines, runs, batch)
+            finally:
+                shutil.rmtree(log_dir)
+            self.stdout.write('{}: {} lines in {:.2f}s, {:.0f} lines/sec'.format(
+                name, lines, duration, lines / duration if duration else float('inf')))
@@ -1,15 +1,71 @@
-from typing import Any
+import time
+
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
 
 import redis
 
+from redis.client import Pipeline
+
+import stats
+
+
+def record_latency(command: str, start: float) -> None:
+    stats.timing('redis.{}'.format(command.lower()), (time.monotonic() - start) * 1000)
+
+
+class TimedPipeline(Pipeline):
+    def execute(self, raise_on_error: bool = True) -> Any:
+        start = time.monotonic()
+        try:
+            return super().execute(raise_on_error=raise_on_error)
+        finally:
+            record_latency('pipeline', start)
+
+
+class TimedRedis(redis.StrictRedis):
+    """Reports the latency of every command, and of every pipeline, through `stats`."""
+
+    def execute_command(self, *args, **options) -> Any:
+        start = time.monotonic()
+        try:
+            return super().execute_command(*args, **options)
+        finally:
+            record_latency(args[0], start)
+
+    def pipeline(self, transaction: bool = True, shard_hint: Any = None) -> TimedPipeline:
+        return TimedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
 
 class BaseRedisDb(object):
     REDIS_POOL = None
 
+    # The clients are thread safe, a single client is shared per connection pool
+    _clients = {}  # type: Dict[Any, TimedRedis]
+
     @classmethod
     def _get_redis(cls) -> Any:
-        return redis.StrictRedis(connection_pool=cls.REDIS_POOL)
+        client = BaseRedisDb._clients.get(cls.REDIS_POOL)
+        if client is None:
+            client = TimedRedis(connection_pool=cls.REDIS_POOL)
+            BaseRedisDb._clients[cls.REDIS_POOL] = client
+        return client
 
     @classmethod
     def connection(cls) -> Any:
         return cls._get_redis()
+
+    @classmethod
+    @contextmanager
+    def pipeline(cls, transaction: bool = True) -> Iterator[Any]:
+        """
+        Queues the commands and sends them in a single round trip,
+        in a MULTI/EXEC block if `transaction` is set.
+
+        The commands still queued when the block exits are executed,
+        call `execute` inside the block to read the replies.
+        """
+        with cls._get_redis().pipeline(transaction=transaction) as pipe:
+            yield pipe
+            if pipe.command_stack:
+                pipe.execute()
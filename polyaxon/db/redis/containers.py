@@ -1,4 +1,4 @@
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from db.redis.base import BaseRedisDb
 from polyaxon.settings import RedisPools
@@ -16,6 +16,10 @@ class RedisJobContainers(BaseRedisDb):
 
     REDIS_POOL = RedisPools.JOB_CONTAINERS
 
+    @staticmethod
+    def _decode(value: Optional[bytes]) -> Optional[str]:
+        return value.decode('utf-8') if value else None
+
     @classmethod
     def get_containers(cls) -> List[str]:
         red = cls._get_redis()
@@ -23,57 +27,111 @@ class RedisJobContainers(BaseRedisDb):
         return [container_id.decode('utf-8') for container_id in container_ids]
 
     @classmethod
-    def get_experiment_for_job(cls, job_uuid: str, red=None) -> Optional[str]:
-        red = red or cls._get_redis()
-        experiment_uuid = red.hget(cls.KEY_JOBS_TO_EXPERIMENTS, job_uuid)
-        return experiment_uuid.decode('utf-8') if experiment_uuid else None
+    def get_experiment_for_job(cls, job_uuid: str) -> Optional[str]:
+        red = cls._get_redis()
+        return cls._decode(red.hget(cls.KEY_JOBS_TO_EXPERIMENTS, job_uuid))
 
     @classmethod
-    def get_job(cls, container_id: str) -> Tuple[Optional[str], Optional[str]]:
+    def get_experiments_for_jobs(cls, job_uuids: List[str]) -> List[Optional[str]]:
+        """Reads the experiments of all jobs in a single round trip."""
+        if not job_uuids:
+            return []
+        red = cls._get_redis()
+        return [cls._decode(experiment_uuid)
+                for experiment_uuid in red.hmget(cls.KEY_JOBS_TO_EXPERIMENTS, job_uuids)]
+
+    @classmethod
+    def get_jobs(cls,
+                 container_ids: List[str]) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+        """
+        Maps the containers to their (job, experiment), with two round trips for all containers.
+
+        The containers are added and removed from the set and the hash in the same transaction,
+        a container mapped to a job is always monitored.
+        """
+        if not container_ids:
+            return {}
         red = cls._get_redis()
-        if red.sismember(cls.KEY_CONTAINERS, container_id):
-            job_uuid = red.hget(cls.KEY_CONTAINERS_TO_JOBS, container_id)
-            if not job_uuid:
-                return None, None
+        job_uuids = [cls._decode(job_uuid)
+                     for job_uuid in red.hmget(cls.KEY_CONTAINERS_TO_JOBS, container_ids)]
+        # The containers removed in the meantime are not mapped to a job anymore
+        mapped_job_uuids = [job_uuid for job_uuid in job_uuids if job_uuid]
+        experiment_uuids = dict(zip(mapped_job_uuids,
+                                    cls.get_experiments_for_jobs(mapped_job_uuids)))
+        return {
+            container_id: (job_uuid, experiment_uuids[job_uuid]) if job_uuid else (None, None)
+            for container_id, job_uuid in zip(container_ids, job_uuids)
+        }
+
+    @classmethod
+    def get_job(cls, container_id: str) -> Tuple[Optional[str], Optional[str]]:
+        return cls.get_jobs([container_id])[container_id]
 
-            job_uuid = job_uuid.decode('utf-8')
-            experiment_uuid = cls.get_experiment_for_job(job_uuid=job_uuid, red=red)
-            return job_uuid, experiment_uuid
-        return None, None
+    @classmethod
+    def remove_containers(cls, container_ids: List[str]) -> None:
+        if not container_ids:
+            return
+        with cls.pipeline() as pipe:
+            pipe.srem(cls.KEY_CONTAINERS, *container_ids)
+            pipe.hdel(cls.KEY_CONTAINERS_TO_JOBS, *container_ids)
 
     @classmethod
-    def remove_container(cls, container_id: str, red=None) -> None:
-        red = red or cls._get_redis()
-        red.srem(cls.KEY_CONTAINERS, container_id)
-        red.hdel(cls.KEY_CONTAINERS_TO_JOBS, container_id)
+    def remove_container(cls, container_id: str) -> None:
+        cls.remove_containers([container_id])
 
     @classmethod
     def remove_job(cls, job_uuid: str) -> None:
         red = cls._get_redis()
         key_jobs_to_containers = cls.KEY_JOBS_TO_CONTAINERS.format(job_uuid)
-        containers = red.smembers(key_jobs_to_containers)
-        for container_id in containers:
-            container_id = container_id.decode('utf-8')
-            red.srem(key_jobs_to_containers, container_id)
-            cls.remove_container(container_id=container_id, red=red)
+        container_ids = [container_id.decode('utf-8')
+                         for container_id in red.smembers(key_jobs_to_containers)]
+        with cls.pipeline() as pipe:
+            if container_ids:
+                pipe.srem(cls.KEY_CONTAINERS, *container_ids)
+                pipe.hdel(cls.KEY_CONTAINERS_TO_JOBS, *container_ids)
+            pipe.delete(key_jobs_to_containers)
+            # Remove the experiment too
+            pipe.hdel(cls.KEY_JOBS_TO_EXPERIMENTS, job_uuid)
+
+    @classmethod
+    def monitor_containers(cls, containers: Dict[str, str]) -> None:
+        """
+        Monitors the containers, a dict of container ids to job uuids.
+
+        The containers already monitored are checked in a single round trip,
+        the new containers are looked up and added in a single transaction.
+        """
+        if not containers:
+            return
+        container_ids = list(containers.keys())
+        with cls.pipeline(transaction=False) as pipe:
+            for container_id in container_ids:
+                pipe.sismember(cls.KEY_CONTAINERS, container_id)
+            monitored = pipe.execute()
+        new_containers = {container_id: containers[container_id]
+                          for container_id, is_monitored in zip(container_ids, monitored)
+                          if not is_monitored}
+        if not new_containers:
+            return
 
-        # Remove the experiment too
-        red.hdel(cls.KEY_CONTAINERS_TO_JOBS, job_uuid)
+        from db.models.experiment_jobs import ExperimentJob
+
+        experiment_uuids = dict(
+            ExperimentJob.objects.filter(uuid__in=set(new_containers.values()))
+            .values_list('uuid', 'experiment__uuid'))
+        experiment_uuids = {job_uuid.hex: experiment_uuid.hex
+                            for job_uuid, experiment_uuid in experiment_uuids.items()}
+        with cls.pipeline() as pipe:
+            for container_id, job_uuid in new_containers.items():
+                if job_uuid not in experiment_uuids:
+                    continue
+                pipe.sadd(cls.KEY_CONTAINERS, container_id)
+                pipe.hset(cls.KEY_CONTAINERS_TO_JOBS, container_id, job_uuid)
+                # Add container for job
+                pipe.sadd(cls.KEY_JOBS_TO_CONTAINERS.format(job_uuid), container_id)
+                # Add job to experiment
+                pipe.hset(cls.KEY_JOBS_TO_EXPERIMENTS, job_uuid, experiment_uuids[job_uuid])
 
     @classmethod
     def monitor(cls, container_id: str, job_uuid: str) -> None:
-        red = cls._get_redis()
-        if not red.sismember(cls.KEY_CONTAINERS, container_id):
-            from db.models.experiment_jobs import ExperimentJob
-
-            try:
-                job = ExperimentJob.objects.get(uuid=job_uuid)
-            except ExperimentJob.DoesNotExist:
-                return
-
-            red.sadd(cls.KEY_CONTAINERS, container_id)
-            red.hset(cls.KEY_CONTAINERS_TO_JOBS, container_id, job_uuid)
-            # Add container for job
-            red.sadd(cls.KEY_JOBS_TO_CONTAINERS.format(job_uuid), container_id)
-            # Add job to experiment
-            red.hset(cls.KEY_JOBS_TO_EXPERIMENTS, job_uuid, job.experiment.uuid.hex)
+        cls.monitor_containers({container_id: job_uuid})
@@ -1,8 +1,18 @@
+import itertools
+import time
+
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+from django.conf import settings
+
 import conf
 
 from db.redis.base import BaseRedisDb
 from polyaxon.settings import RedisPools
 
+# Number of heartbeats checked per round trip
+HEARTBEATS_CHUNK_SIZE = 1000
+
 
 class RedisHeartBeat(BaseRedisDb):
     """
@@ -68,32 +78,196 @@ class RedisHeartBeat(BaseRedisDb):
 
         self._red.delete(self.redis_key)
 
+    @staticmethod
+    def use_sorted_set() -> bool:
+        return conf.get('HEARTBEAT_BACKEND') == settings.HEARTBEAT_BACKEND_SORTED_SET
+
+    @classmethod
+    def _ping_many(cls, key: str, sorted_key: str, ids: List[int]) -> None:
+        if cls.use_sorted_set():
+            RedisSortedHeartBeat.ping(sorted_key, ids)
+            return
+        ttl = conf.get('TTL_HEARTBEAT')
+        with cls.pipeline(transaction=False) as pipe:
+            for i in ids:
+                pipe.setex(name=key.format(i), value=1, time=ttl)
+
+    @classmethod
+    def _are_alive(cls, key: str, sorted_key: str, ids: List[int]) -> Dict[int, bool]:
+        """Checks the heartbeats of all ids in a single round trip."""
+        if not ids:
+            return {}
+        if cls.use_sorted_set():
+            return RedisSortedHeartBeat.are_alive(sorted_key, ids)
+        red = cls._get_redis()
+        values = red.mget([key.format(i) for i in ids])
+        return {i: bool(value) for i, value in zip(ids, values)}
+
+    @classmethod
+    def _get_stale(cls,
+                   sorted_key: str,
+                   ids: Iterable[int],
+                   are_alive: Callable[[List[int]], Dict[int, bool]]) -> Iterator[int]:
+        """Yields the ids without a heartbeat, the keys are checked in chunks."""
+        if cls.use_sorted_set():
+            # A single range query, the runs that never pinged are stale as well
+            alive = RedisSortedHeartBeat.get_alive(
+                sorted_key, since=time.time() - conf.get('TTL_HEARTBEAT'))
+            yield from (i for i in ids if i not in alive)
+            return
+
+        ids = iter(ids)
+        while True:
+            chunk = list(itertools.islice(ids, HEARTBEATS_CHUNK_SIZE))
+            if not chunk:
+                return
+            alive = are_alive(chunk)
+            yield from (i for i in chunk if not alive[i])
+
+    @classmethod
+    def experiments_ping(cls, experiment_ids: List[int]) -> None:
+        cls._ping_many(cls.KEY_EXPERIMENT, RedisSortedHeartBeat.KEY_EXPERIMENTS, experiment_ids)
+
+    @classmethod
+    def jobs_ping(cls, job_ids: List[int]) -> None:
+        cls._ping_many(cls.KEY_JOB, RedisSortedHeartBeat.KEY_JOBS, job_ids)
+
+    @classmethod
+    def builds_ping(cls, build_ids: List[int]) -> None:
+        cls._ping_many(cls.KEY_BUILD, RedisSortedHeartBeat.KEY_BUILDS, build_ids)
+
     @classmethod
     def experiment_ping(cls, experiment_id) -> None:
-        heart_beat = RedisHeartBeat(experiment=experiment_id)
-        heart_beat.ping()
+        cls.experiments_ping([experiment_id])
 
     @classmethod
     def job_ping(cls, job_id) -> None:
-        heart_beat = RedisHeartBeat(job=job_id)
-        heart_beat.ping()
+        cls.jobs_ping([job_id])
 
     @classmethod
     def build_ping(cls, build_id) -> None:
-        heart_beat = RedisHeartBeat(build=build_id)
-        heart_beat.ping()
+        cls.builds_ping([build_id])
+
+    @classmethod
+    def experiments_are_alive(cls, experiment_ids: List[int]) -> Dict[int, bool]:
+        return cls._are_alive(cls.KEY_EXPERIMENT,
+                              RedisSortedHeartBeat.KEY_EXPERIMENTS,
+                              experiment_ids)
+
+    @classmethod
+    def jobs_are_alive(cls, job_ids: List[int]) -> Dict[int, bool]:
+        return cls._are_alive(cls.KEY_JOB, RedisSortedHeartBeat.KEY_JOBS, job_ids)
+
+    @classmethod
+    def builds_are_alive(cls, build_ids: List[int]) -> Dict[int, bool]:
+        return cls._are_alive(cls.KEY_BUILD, RedisSortedHeartBeat.KEY_BUILDS, build_ids)
+
+    @classmethod
+    def get_stale_experiments(cls, experiment_ids: Iterable[int]) -> Iterator[int]:
+        return cls._get_stale(RedisSortedHeartBeat.KEY_EXPERIMENTS,
+                              experiment_ids,
+                              cls.experiments_are_alive)
+
+    @classmethod
+    def get_stale_jobs(cls, job_ids: Iterable[int]) -> Iterator[int]:
+        return cls._get_stale(RedisSortedHeartBeat.KEY_JOBS, job_ids, cls.jobs_are_alive)
+
+    @classmethod
+    def get_stale_builds(cls, build_ids: Iterable[int]) -> Iterator[int]:
+        return cls._get_stale(RedisSortedHeartBeat.KEY_BUILDS, build_ids, cls.builds_are_alive)
 
     @classmethod
     def experiment_is_alive(cls, experiment_id) -> bool:
-        heart_beat = RedisHeartBeat(experiment=experiment_id)
-        return heart_beat.is_alive()
+        return cls.experiments_are_alive([experiment_id])[experiment_id]
 
     @classmethod
     def job_is_alive(cls, job_id) -> bool:
-        heart_beat = RedisHeartBeat(job=job_id)
-        return heart_beat.is_alive()
+        return cls.jobs_are_alive([job_id])[job_id]
 
     @classmethod
     def build_is_alive(cls, build_id) -> bool:
-        heart_beat = RedisHeartBeat(build=build_id)
-        return heart_beat.is_alive()
+        return cls.builds_are_alive([build_id])[build_id]
+
+    @classmethod
+    def compact_experiments(cls, experiment_ids: Iterable[int]) -> None:
+        """Removes the heartbeats of the finished experiments, keys expire on their own."""
+        if cls.use_sorted_set():
+            RedisSortedHeartBeat.compact(RedisSortedHeartBeat.KEY_EXPERIMENTS, experiment_ids)
+
+    @classmethod
+    def compact_jobs(cls, job_ids: Iterable[int]) -> None:
+        if cls.use_sorted_set():
+            RedisSortedHeartBeat.compact(RedisSortedHeartBeat.KEY_JOBS, job_ids)
+
+    @classmethod
+    def compact_builds(cls, build_ids: Iterable[int]) -> None:
+        if cls.use_sorted_set():
+            RedisSortedHeartBeat.compact(RedisSortedHeartBeat.KEY_BUILDS, build_ids)
+
+
+class RedisSortedHeartBeat(BaseRedisDb):
+    """
+    Stores the heartbeats as a sorted set per kind of run, scored by the time of the last ping,
+    `ZADD heartbeats:<kind> <timestamp> <id>`.
+
+    A ping is O(log n), several runs are pinged with a single command,
+    and the runs that pinged, or did not ping, since a given time
+    are read with a single range query.
+    """
+    KEY_EXPERIMENTS = 'heartbeats:experiment'
+    KEY_JOBS = 'heartbeats:job'
+    KEY_BUILDS = 'heartbeats:build'
+
+    REDIS_POOL = RedisPools.HEARTBEAT
+
+    @classmethod
+    def ping(cls, key: str, ids: List[int], timestamp: Optional[float] = None) -> None:
+        if not ids:
+            return
+        timestamp = time.time() if timestamp is None else timestamp
+        red = cls._get_redis()
+        red.zadd(key, {i: timestamp for i in ids})
+
+    @classmethod
+    def get_pings(cls, key: str, ids: List[int]) -> Dict[int, Optional[float]]:
+        """Returns the time of the last ping of all ids in a single round trip."""
+        with cls.pipeline(transaction=False) as pipe:
+            for i in ids:
+                pipe.zscore(key, i)
+            timestamps = pipe.execute()
+        return dict(zip(ids, timestamps))
+
+    @classmethod
+    def are_alive(cls, key: str, ids: List[int]) -> Dict[int, bool]:
+        since = time.time() - conf.get('TTL_HEARTBEAT')
+        return {i: timestamp is not None and timestamp >= since
+                for i, timestamp in cls.get_pings(key, ids).items()}
+
+    @classmethod
+    def get_alive(cls, key: str, since: float) -> Set[int]:
+        """Returns the runs that pinged since `since`."""
+        red = cls._get_redis()
+        return {int(i) for i in red.zrangebyscore(key, since, '+inf')}
+
+    @classmethod
+    def get_stale(cls, key: str, since: float) -> List[int]:
+        """Returns the runs that did not ping since `since`."""
+        red = cls._get_redis()
+        return [int(i) for i in red.zrangebyscore(key, '-inf', '({}'.format(since))]
+
+    @classmethod
+    def clear(cls, key: str, ids: List[int]) -> None:
+        if not ids:
+            return
+        red = cls._get_redis()
+        red.zrem(key, *ids)
+
+    @classmethod
+    def compact(cls, key: str, ids: Iterable[int]) -> None:
+        """
+        Removes the stale heartbeats of the runs that are not in `ids`, i.e. the finished runs,
+        the stale runs that are still in `ids` are kept to be detected as zombies.
+        """
+        ids = set(ids)
+        stale_ids = cls.get_stale(key, since=time.time() - conf.get('TTL_HEARTBEAT'))
+        cls.clear(key, [i for i in stale_ids if i not in ids])
@@ -0,0 +1,67 @@
+import json
+
+from typing import Dict, List, Optional, Tuple
+
+import conf
+
+from db.redis.base import BaseRedisDb
+from polyaxon.settings import RedisPools
+
+
+class RedisResourcesSeries(BaseRedisDb):
+    """
+    Keeps a bounded history of the jobs' resources, rolled up at fixed resolutions.
+
+    Every job has a sorted set per resolution scored by the buckets' timestamps,
+    only the latest `RESOURCES_SERIES_MAX_LENGTH` points are kept.
+    """
+
+    KEY_RESOURCES_SERIES = 'RESOURCES_SERIES:{}:{}'  # Redis sorted set: points of a job/resolution
+
+    REDIS_POOL = RedisPools.TO_STREAM
+
+    @classmethod
+    def get_key(cls, job_uuid: str, resolution: int) -> str:
+        return cls.KEY_RESOURCES_SERIES.format(job_uuid, resolution)
+
+    @classmethod
+    def add_points(cls, points: Dict[Tuple[str, int], List[Dict]]) -> None:
+        """
+        Adds the points, a dict of (job uuid, resolution) to points, in a single round trip.
+
+        A point replaces the point already stored for the same bucket.
+        """
+        if not points:
+            return
+        max_length = conf.get('RESOURCES_SERIES_MAX_LENGTH')
+        ttl = conf.get('RESOURCES_SERIES_TTL')
+        with cls.pipeline(transaction=False) as pipe:
+            for (job_uuid, resolution), job_points in points.items():
+                if not job_points:
+                    continue
+                key = cls.get_key(job_uuid, resolution)
+                timestamps = [point['timestamp'] for point in job_points]
+                pipe.zremrangebyscore(key, min(timestamps), max(timestamps))
+                pipe.zadd(key, {json.dumps(point, sort_keys=True): point['timestamp']
+                                for point in job_points})
+                pipe.zremrangebyrank(key, 0, -max_length - 1)
+                pipe.expire(key, ttl)
+
+    @classmethod
+    def get_points(cls,
+                   job_uuids: List[str],
+                   resolution: int,
+                   since: Optional[float] = None) -> Dict[str, List[Dict]]:
+        """Returns the points of the jobs since a timestamp, in a single round trip."""
+        if not job_uuids:
+            return {}
+        with cls.pipeline(transaction=False) as pipe:
+            for job_uuid in job_uuids:
+                pipe.zrangebyscore(cls.get_key(job_uuid, resolution),
+                                   '-inf' if since is None else since,
+                                   '+inf')
+            results = pipe.execute()
+        return {
+            job_uuid: [json.loads(point.decode('utf-8')) for point in points]
+            for job_uuid, points in zip(job_uuids, results)
+        }
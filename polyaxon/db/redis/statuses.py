@@ -0,0 +1,42 @@
+import json
+
+from typing import Any, Optional, Tuple
+
+from db.redis.base import BaseRedisDb
+from polyaxon.settings import RedisPools
+
+
+class RedisStatuses(BaseRedisDb):
+    """
+    Publishes runs' status transitions,
+    so that other services can be notified without polling the database.
+    """
+
+    CHANNEL_STATUSES = 'STATUSES'  # Redis pub/sub channel: {'uuid': run uuid, 'status': status}
+
+    REDIS_POOL = RedisPools.TO_STREAM
+
+    @classmethod
+    def publish(cls, uuid: str, status: str) -> None:
+        red = cls._get_redis()
+        red.publish(cls.CHANNEL_STATUSES, json.dumps({'uuid': uuid, 'status': status}))
+
+    @classmethod
+    def subscribe(cls) -> Any:
+        red = cls._get_redis()
+        pubsub = red.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(cls.CHANNEL_STATUSES)
+        return pubsub
+
+    @staticmethod
+    def get_message_value(message: Any) -> Tuple[Optional[str], Optional[str]]:
+        if not message or message.get('type') != 'message':
+            return None, None
+        data = message['data']
+        if not isinstance(data, str):
+            data = data.decode('utf-8')
+        try:
+            value = json.loads(data)
+        except ValueError:
+            return None, None
+        return value.get('uuid'), value.get('status')
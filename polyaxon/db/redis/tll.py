@@ -1,4 +1,4 @@
-from typing import Any, Optional, Union
+from typing import Any, Dict, List, Optional, Union
 
 import conf
 
@@ -101,29 +101,40 @@ class RedisTTL(BaseRedisDb):
         ttl = RedisTTL(build=build_id)
         ttl.set_value(value)
 
+    @classmethod
+    def _pop_values(cls, key: str, ids: List[int]) -> Dict[int, int]:
+        """Reads and clears the ttls of all ids in a single transaction."""
+        if not ids:
+            return {}
+        keys = [key.format(i) for i in ids]
+        with cls.pipeline() as pipe:
+            pipe.mget(keys)
+            pipe.delete(*keys)
+            values, _ = pipe.execute()
+        default = conf.get('GLOBAL_COUNTDOWN')
+        return {i: (int(value.decode()) if value else None) or default
+                for i, value in zip(ids, values)}
+
+    @classmethod
+    def get_for_experiments(cls, experiment_ids: List[int]) -> Dict[int, int]:
+        return cls._pop_values(cls.KEY_EXPERIMENT, experiment_ids)
+
+    @classmethod
+    def get_for_jobs(cls, job_ids: List[int]) -> Dict[int, int]:
+        return cls._pop_values(cls.KEY_JOB, job_ids)
+
+    @classmethod
+    def get_for_builds(cls, build_ids: List[int]) -> Dict[int, int]:
+        return cls._pop_values(cls.KEY_BUILD, build_ids)
+
     @classmethod
     def get_for_experiment(cls, experiment_id: int) -> int:
-        ttl = RedisTTL(experiment=experiment_id)
-        ttl_value = ttl.get_value()
-        if ttl_value:
-            ttl.clear()
-            return ttl_value
-        return conf.get('GLOBAL_COUNTDOWN')
+        return cls.get_for_experiments([experiment_id])[experiment_id]
 
     @classmethod
     def get_for_job(cls, job_id: int) -> int:
-        ttl = RedisTTL(job=job_id)
-        ttl_value = ttl.get_value()
-        if ttl_value:
-            ttl.clear()
-            return ttl_value
-        return conf.get('GLOBAL_COUNTDOWN')
+        return cls.get_for_jobs([job_id])[job_id]
 
     @classmethod
     def get_for_build(cls, build_id: int) -> int:
-        ttl = RedisTTL(build=build_id)
-        ttl_value = ttl.get_value()
-        if ttl_value:
-            ttl.clear()
-            return ttl_value
-        return conf.get('GLOBAL_COUNTDOWN')
+        return cls.get_for_builds([build_id])[build_id]
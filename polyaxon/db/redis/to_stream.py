@@ -1,6 +1,6 @@
 import json
 
-from typing import Dict, List, Optional, Union
+from typing import Dict, List, Optional, Set, Tuple, Union
 
 from db.redis.base import BaseRedisDb
 from polyaxon.settings import RedisPools
@@ -65,6 +65,29 @@ class RedisToStream(BaseRedisDb):
     def is_monitored_experiment_logs(cls, experiment_uuid: str) -> bool:
         return cls._is_monitored(cls.KEY_EXPERIMENT_LOGS, experiment_uuid)
 
+    @classmethod
+    def _get_monitored(cls, key: str) -> Set[str]:
+        red = cls._get_redis()
+        return {object_id.decode('utf-8') for object_id in red.smembers(key)}
+
+    @classmethod
+    def get_monitored_job_logs(cls) -> Set[str]:
+        return cls._get_monitored(cls.KEY_JOB_LOGS)
+
+    @classmethod
+    def get_monitored_experiment_logs(cls) -> Set[str]:
+        return cls._get_monitored(cls.KEY_EXPERIMENT_LOGS)
+
+    @classmethod
+    def get_monitored_resources(cls) -> Tuple[Set[str], Set[str]]:
+        """Returns the jobs and the experiments with monitored resources, in a single round trip."""
+        with cls.pipeline(transaction=False) as pipe:
+            pipe.smembers(cls.KEY_JOB_RESOURCES)
+            pipe.smembers(cls.KEY_EXPERIMENT_RESOURCES)
+            job_uuids, experiment_uuids = pipe.execute()
+        return ({job_uuid.decode('utf-8') for job_uuid in job_uuids},
+                {experiment_uuid.decode('utf-8') for experiment_uuid in experiment_uuids})
+
     @classmethod
     def _remove_object(cls, key: str, object_id: str) -> None:
         red = cls._get_redis()
@@ -100,20 +123,54 @@ class RedisToStream(BaseRedisDb):
             return resources if as_json else json.dumps(resources)
         return None
 
+    @classmethod
+    def _get_jobs_latest_resources(cls, jobs: List[Dict]) -> List[Optional[bytes]]:
+        """Reads the latest stats of all jobs in a single round trip."""
+        if not jobs:
+            return []
+        red = cls._get_redis()
+        return red.hmget(cls.KEY_JOB_LATEST_STATS, [job['uuid'] for job in jobs])
+
     @classmethod
     def get_latest_experiment_resources(cls,
                                         jobs: List[Dict],
                                         as_json: bool = False) -> List[Optional[Union[str, Dict]]]:
         stats = []
-        for job in jobs:
-            job_resources = cls.get_latest_job_resources(job=job['uuid'],
-                                                         job_name=job['name'],
-                                                         as_json=True)
-            if job_resources:
-                stats.append(job_resources)
+        for job, resources in zip(jobs, cls._get_jobs_latest_resources(jobs)):
+            if resources:
+                resources = json.loads(resources.decode('utf-8'))
+                resources['job_name'] = job['name']
+                stats.append(resources)
         return stats if as_json else json.dumps(stats)
 
+    @classmethod
+    def get_raw_latest_experiment_resources(cls, jobs: List[Dict]) -> bytes:
+        """
+        Same as `get_latest_experiment_resources` but returns the serialized list as bytes,
+        the stored payloads are spliced as is, without being decoded and encoded again.
+        """
+        stats = []
+        for job, resources in zip(jobs, cls._get_jobs_latest_resources(jobs)):
+            if not resources:
+                continue
+            job_name = b'{"job_name": ' + json.dumps(job['name']).encode('utf-8')
+            resources = resources.strip()
+            if resources == b'{}':
+                stats.append(job_name + b'}')
+            else:
+                stats.append(job_name + b', ' + resources[1:])
+        return b'[' + b', '.join(stats) + b']'
+
     @classmethod
     def set_latest_job_resources(cls, job: str, payload: Dict) -> None:
         red = cls._get_redis()
         red.hset(cls.KEY_JOB_LATEST_STATS, job, json.dumps(payload))
+
+    @classmethod
+    def set_latest_jobs_resources(cls, payloads: Dict[str, Dict]) -> None:
+        """Sets the latest resources of all jobs in a single round trip."""
+        if not payloads:
+            return
+        red = cls._get_redis()
+        red.hmset(cls.KEY_JOB_LATEST_STATS,
+                  {job: json.dumps(payload) for job, payload in payloads.items()})
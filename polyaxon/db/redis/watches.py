@@ -0,0 +1,30 @@
+from typing import Optional
+
+from db.redis.base import BaseRedisDb
+from polyaxon.settings import RedisPools
+
+
+class RedisWatches(BaseRedisDb):
+    """
+    RedisWatches provides a db to store the last resource version seen by the monitors' watches,
+    the watches are resumed from it after a restart of the monitors.
+    """
+    KEY_RESOURCE_VERSION = 'watches.resource_version:{}'
+
+    REDIS_POOL = RedisPools.JOB_CONTAINERS
+
+    @classmethod
+    def get_resource_version(cls, name: str) -> Optional[str]:
+        red = cls._get_redis()
+        value = red.get(cls.KEY_RESOURCE_VERSION.format(name))
+        return value.decode('utf-8') if value else None
+
+    @classmethod
+    def set_resource_version(cls, name: str, resource_version: str) -> None:
+        red = cls._get_redis()
+        red.set(cls.KEY_RESOURCE_VERSION.format(name), resource_version)
+
+    @classmethod
+    def clear_resource_version(cls, name: str) -> None:
+        red = cls._get_redis()
+        red.delete(cls.KEY_RESOURCE_VERSION.format(name))
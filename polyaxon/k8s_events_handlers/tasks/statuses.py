@@ -1,19 +1,31 @@
-from typing import Any, Dict
+import bisect
 
-from django.db import IntegrityError
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple, Union
 
+from django.db import IntegrityError, transaction
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import is_naive, make_aware, now
+
+import auditor
 import conf
 
+from constants.jobs import JobLifeCycle
 from db.models.build_jobs import BuildJob
-from db.models.experiment_jobs import ExperimentJob
+from db.models.experiment_jobs import ExperimentJob, ExperimentJobStatus
 from db.models.experiments import Experiment
 from db.models.jobs import Job
 from db.models.notebooks import NotebookJob
 from db.models.projects import Project
 from db.models.tensorboards import TensorboardJob
+from db.redis.heartbeat import RedisHeartBeat
+from event_manager.events.experiment_job import EXPERIMENT_JOB_NEW_STATUS
 from k8s_events_handlers.tasks.logger import logger
 from polyaxon.celery_api import celery_app
 from polyaxon.settings import Intervals, K8SEventsCeleryTasks
+from signals.run_time import set_job_finished_at, set_job_started_at
+from signals.statuses import publish_status
 
 
 def set_node_scheduling(job: Any, node_name: str) -> None:
@@ -64,6 +76,147 @@ def k8s_events_handle_experiment_job_statuses(self: 'celery_app.task', payload:
         self.retry(countdown=Intervals.EXPERIMENTS_SCHEDULER)
 
 
+def get_status_date(created_at: Optional[Union[str, datetime]]) -> Optional[datetime]:
+    """Parses the serialized date of a payload, as the statuses' `created_at` field does."""
+    if isinstance(created_at, str):
+        created_at = parse_datetime(created_at)
+    if created_at and is_naive(created_at):
+        created_at = make_aware(created_at)
+    return created_at
+
+
+def get_new_statuses(job: Any,
+                     status_model: Any,
+                     payloads: List[Dict],
+                     job_statuses: Optional[List[Tuple[datetime, str]]] = None) -> List[Any]:
+    """
+    Replays `AbstractJob._set_status` in memory, returns the statuses to create in order.
+
+    `job_statuses` are the `(created_at, status)` of the job's statuses,
+    needed to check the transitions of the payloads with a `created_at`
+    against the last status before them, e.g. for the events received out of order.
+    """
+    timeline = sorted(job_statuses or [], key=lambda job_status: job_status[0])
+    last_status = job.last_status
+    statuses = []
+    for payload in payloads:
+        if JobLifeCycle.is_done(last_status):
+            # We should not update statuses anymore
+            break
+        status = payload['status']
+        created_at = get_status_date(payload.get('created_at'))
+        if created_at:
+            dates = [job_status[0] for job_status in timeline]
+            position = bisect.bisect_right(dates, created_at)
+            current_status = timeline[position - 1][1] if position else None
+        else:
+            current_status = last_status
+        if JobLifeCycle.can_transition(status_from=current_status, status_to=status):
+            params = {'created_at': created_at} if created_at else {}
+            statuses.append(status_model(job=job,
+                                         status=status,
+                                         message=payload['message'],
+                                         traceback=payload.get('traceback'),
+                                         details=payload['details'],
+                                         **params))
+            bisect.insort(timeline, (statuses[-1].created_at, status))
+            last_status = status
+    return statuses
+
+
+@celery_app.task(name=K8SEventsCeleryTasks.K8S_EVENTS_BATCH_EXPERIMENT_JOB_STATUSES,
+                 bind=True,
+                 max_retries=3,
+                 ignore_result=True)
+def k8s_events_batch_experiment_job_statuses(self: 'celery_app.task',
+                                             payloads: List[Dict]) -> None:
+    """Experiment jobs statuses, in batches.
+
+    The jobs are fetched with a single query, and the statuses and nodes are written in bulk,
+    the new statuses side effects run once per job, and the running jobs' experiments
+    are pinged at once.
+    """
+    payloads_by_job = OrderedDict()
+    for payload in payloads:
+        payloads_by_job.setdefault(payload['details']['labels']['job_uuid'], []).append(payload)
+    logger.debug('handling events statuses for %s jobs', len(payloads_by_job))
+
+    jobs = {job.uuid.hex: job for job in ExperimentJob.objects.filter(
+        uuid__in=list(payloads_by_job)).select_related('experiment', 'status')}
+
+    # The statuses of the jobs with dated payloads, the transitions are checked at those dates
+    dated_jobs = [job for job_uuid, job in jobs.items()
+                  if any(p.get('created_at') for p in payloads_by_job[job_uuid])]
+    statuses_by_job = {}
+    if dated_jobs:
+        for job_id, created_at, status in ExperimentJobStatus.objects.filter(
+                job__in=dated_jobs).values_list('job_id', 'created_at', 'status'):
+            statuses_by_job.setdefault(job_id, []).append((created_at, status))
+
+    scheduled_jobs = []
+    jobs_statuses = OrderedDict()
+    heartbeat_experiments = set()
+    retry_payloads = []
+    for job_uuid, job_payloads in payloads_by_job.items():
+        job = jobs.get(job_uuid)
+        if job is None:
+            logger.debug('Job uuid`%s` does not exist', job_uuid)
+            continue
+        if job.last_status is None and self.request.retries < 2:
+            retry_payloads += job_payloads
+            continue
+
+        node_names = [p['details']['node_name'] for p in job_payloads if p['details']['node_name']]
+        if node_names and not job.node_scheduled:
+            job.node_scheduled = node_names[0]
+            scheduled_jobs.append(job)
+        if not job.is_done and any(p['status'] in JobLifeCycle.HEARTBEAT_STATUS
+                                   for p in job_payloads):
+            heartbeat_experiments.add(job.experiment_id)
+        statuses = get_new_statuses(job,
+                                    ExperimentJobStatus,
+                                    job_payloads,
+                                    job_statuses=statuses_by_job.get(job.id))
+        if statuses:
+            jobs_statuses[job] = statuses
+
+    try:
+        with transaction.atomic():
+            ExperimentJob.objects.bulk_update(scheduled_jobs, ['node_scheduled'])
+            ExperimentJobStatus.objects.bulk_create(
+                [status for statuses in jobs_statuses.values() for status in statuses])
+            # Same updates as the statuses' post_save signal, applied with the latest status
+            for job, statuses in jobs_statuses.items():
+                for status in statuses:
+                    set_job_started_at(instance=job, status=status.status)
+                    set_job_finished_at(instance=job, status=status.status)
+                job.status = statuses[-1]
+                job.updated_at = now()
+            ExperimentJob.objects.bulk_update(
+                list(jobs_statuses), ['status', 'started_at', 'updated_at', 'finished_at'])
+    except IntegrityError:
+        # Due to concurrency this could happen, we just retry it
+        logger.info('Retry jobs statuses handling for %s jobs', len(payloads_by_job))
+        self.retry(countdown=Intervals.EXPERIMENTS_SCHEDULER)
+
+    for job in jobs_statuses:
+        publish_status(instance=job, status=job.last_status)
+        # check if the new status is done to remove the containers from the monitors
+        if job.is_done:
+            from db.redis.containers import RedisJobContainers
+
+            RedisJobContainers.remove_job(job.uuid.hex)
+        # Check if we need to change the experiment status
+        auditor.record(event_type=EXPERIMENT_JOB_NEW_STATUS, instance=job)
+
+    # The running replicas are a heartbeat of their experiments, all pinged at once
+    RedisHeartBeat.experiments_ping(list(heartbeat_experiments))
+
+    if retry_payloads:
+        logger.info('Retry the statuses of %s jobs without status', len(retry_payloads))
+        self.retry(kwargs={'payloads': retry_payloads}, countdown=1)
+
+
 @celery_app.task(name=K8SEventsCeleryTasks.K8S_EVENTS_HANDLE_JOB_STATUSES,
                  bind=True,
                  max_retries=3,
@@ -1,7 +1,7 @@
 import os
 import tarfile
 
-from typing import Any, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 from hestia.paths import check_or_create_path
 from polystores.exceptions import PolyaxonStoresException
@@ -10,6 +10,8 @@ from rest_framework.exceptions import ValidationError
 import conf
 import stores
 
+from libs.log_blocks import get_blocks_index_path, get_blocks_path
+from libs.log_chunks import download_log_chunks, get_manifest_path, read_manifest
 from stores.exceptions import VolumeNotFoundError  # pylint:disable=ungrouped-imports
 
 
@@ -91,9 +93,54 @@ def archive_logs_file(log_path: str, namepath: str, persistence_logs: str = 'def
     check_or_create_path(download_dir)
     try:
         store_manager = stores.get_logs_store(persistence_logs=persistence_logs)
+        if store_manager.store.is_local_store:
+            return log_path
+        if download_log_blocks(store_manager=store_manager,
+                               log_path=log_path,
+                               download_filepath=download_filepath):
+            # The logs of a finished job are compacted
+            return download_filepath
+        manifest = download_logs_manifest(store_manager=store_manager,
+                                          log_path=log_path,
+                                          download_filepath=download_filepath)
+        if manifest:
+            # The logs of a running job are uploaded in chunks
+            return download_log_chunks(store=store_manager,
+                                       log_path=log_path,
+                                       manifest=manifest,
+                                       download_path=download_filepath)
         store_manager.download_file(log_path, download_filepath)
     except (PolyaxonStoresException, VolumeNotFoundError) as e:
         raise ValidationError(e)
-    if store_manager.store.is_local_store:
-        return log_path
     return download_filepath
+
+
+def download_log_blocks(store_manager: Any, log_path: str, download_filepath: str) -> bool:
+    index_filepath = get_blocks_index_path(download_filepath)
+    if os.path.exists(index_filepath):
+        os.remove(index_filepath)
+    try:
+        store_manager.download_file(get_blocks_index_path(log_path), index_filepath)
+    except PolyaxonStoresException:
+        return False
+    if not os.path.exists(index_filepath):
+        return False
+    store_manager.download_file(get_blocks_path(log_path), get_blocks_path(download_filepath))
+    if os.path.exists(download_filepath):
+        # A previous download of the raw logs
+        os.remove(download_filepath)
+    return True
+
+
+def download_logs_manifest(store_manager: Any,
+                           log_path: str,
+                           download_filepath: str) -> Optional[Dict]:
+    manifest_filepath = '{}.manifest'.format(download_filepath)
+    try:
+        store_manager.download_file(get_manifest_path(log_path), manifest_filepath)
+    except PolyaxonStoresException:
+        return None
+    manifest = read_manifest(manifest_filepath)
+    if os.path.exists(manifest_filepath):
+        os.remove(manifest_filepath)
+    return manifest
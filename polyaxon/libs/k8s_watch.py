@@ -0,0 +1,149 @@
+import logging
+import time
+
+from typing import Callable, Dict, Iterator, Optional
+
+from kubernetes import watch
+from kubernetes.client.rest import ApiException
+
+import stats
+
+from db.redis.watches import RedisWatches
+
+_logger = logging.getLogger('polyaxon.monitors.watches')
+
+HTTP_GONE = 410
+
+
+def is_newer(resource_version: Optional[str], last_resource_version: Optional[str]) -> bool:
+    """Resource versions are opaque, they are only compared when both are integers."""
+    try:
+        return int(resource_version) > int(last_resource_version)
+    except (TypeError, ValueError):
+        return True
+
+
+class ResumableWatch(object):
+    """
+    Watches the k8s objects returned by `list_func` from the last resource version seen.
+
+    The resource version is persisted in redis, at most every `persist_interval` seconds,
+    to resume the watch after a restart of the monitor instead of replaying all the objects.
+    An event's resource version is only recorded once the event was handled,
+    i.e. the next event is requested, and `flush` is called before persisting it
+    to flush the buffers the handled events might still be waiting in.
+    When the resource version is too old, i.e. `410 Gone`, the objects are listed again by pages,
+    and the objects not modified since the last resource version seen are dropped.
+
+    The restarts of the watch and the relists are counted, and reported through `stats`.
+    """
+
+    def __init__(self,
+                 name: str,
+                 list_func: Callable,
+                 watch_ttl: Optional[int] = None,
+                 page_size: int = 500,
+                 persist_interval: float = 1,
+                 flush: Optional[Callable[[], None]] = None,
+                 **list_kwargs) -> None:
+        self.name = name
+        self.list_func = list_func
+        self.watch_ttl = watch_ttl
+        self.page_size = page_size
+        self.persist_interval = persist_interval
+        self.flush = flush
+        self.list_kwargs = list_kwargs
+        self.resource_version = RedisWatches.get_resource_version(name)
+        self._persisted_resource_version = self.resource_version
+        self._persisted_at = time.monotonic()
+        self.restarts = 0
+        self.relists = 0
+
+    def _incr(self, counter: str) -> None:
+        setattr(self, counter, getattr(self, counter) + 1)
+        stats.incr('monitors.watches.{}.{}'.format(self.name, counter))
+
+    def persist(self, force: bool = False) -> None:
+        if self.resource_version == self._persisted_resource_version:
+            return
+        if not force and time.monotonic() - self._persisted_at < self.persist_interval:
+            return
+        resource_version = self.resource_version
+        if self.flush:
+            self.flush()
+        if resource_version:
+            RedisWatches.set_resource_version(self.name, resource_version)
+        else:
+            RedisWatches.clear_resource_version(self.name)
+        self._persisted_resource_version = resource_version
+        self._persisted_at = time.monotonic()
+
+    def _set_resource_version(self, resource_version: Optional[str]) -> None:
+        self.resource_version = resource_version
+        self.persist()
+
+    def relist(self) -> Iterator[Dict]:
+        """
+        Lists the objects by pages of `page_size`,
+        the objects modified since the last resource version seen are yielded as `ADDED` events.
+        """
+        self._incr('relists')
+        last_resource_version = self.resource_version
+        list_resource_version = None
+        dropped = 0
+        params = {'limit': self.page_size}
+        while True:
+            objects = self.list_func(**self.list_kwargs, **params)
+            # All the pages are read from the same snapshot as the first one
+            list_resource_version = list_resource_version or objects.metadata.resource_version
+            for obj in objects.items:
+                if (last_resource_version and
+                        not is_newer(obj.metadata.resource_version, last_resource_version)):
+                    dropped += 1
+                    continue
+                yield {'type': 'ADDED', 'object': obj}
+            if not objects.metadata._continue:  # pylint:disable=protected-access
+                break
+            params['_continue'] = objects.metadata._continue  # pylint:disable=protected-access
+
+        _logger.info('Relisted the `%s` watch objects, %s were not modified', self.name, dropped)
+        self.resource_version = list_resource_version
+        self.persist(force=True)
+
+    def _watch(self) -> Iterator[Dict]:
+        w = watch.Watch()
+        params = {'resource_version': self.resource_version}
+        if self.watch_ttl:
+            params['timeout_seconds'] = self.watch_ttl
+        try:
+            for event in w.stream(self.list_func, **self.list_kwargs, **params):
+                if event['type'] == 'ERROR':
+                    # The object of an error event is a status, e.g. `410 Gone`
+                    raw_object = event['raw_object']
+                    raise ApiException(status=raw_object.get('code'),
+                                       reason=raw_object.get('message'))
+                yield event
+                self._set_resource_version(event['object'].metadata.resource_version)
+        finally:
+            w.stop()
+            self.persist(force=True)
+
+    def stream(self) -> Iterator[Dict]:
+        """Yields the objects' events like `watch.Watch().stream`, the watch is never stopped."""
+        if not self.resource_version:
+            yield from self.relist()
+        while True:
+            try:
+                yield from self._watch()
+                # The watch timed out, it's resumed from the last resource version seen
+                self._incr('restarts')
+            except ApiException as e:
+                if e.status != HTTP_GONE:
+                    raise
+                _logger.info('The `%s` watch resource version %s is too old, relisting',
+                             self.name, self.resource_version)
+                yield from self.relist()
+
+    @property
+    def counters(self) -> Dict[str, int]:
+        return {'restarts': self.restarts, 'relists': self.relists}
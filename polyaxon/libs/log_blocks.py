@@ -0,0 +1,254 @@
+import bisect
+import fcntl
+import json
+import os
+import zlib
+
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from libs.log_files import find_time_offsets, get_index_path, get_line_timestamp
+
+BLOCK_SIZE = 256 * 1024
+COMPRESSION_LEVEL = 6
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def get_blocks_path(file_path: str) -> str:
+    """The blocks are gzip members, the file is a valid gzip file of the whole logs."""
+    return '{}.gz'.format(file_path)
+
+
+def get_blocks_index_path(file_path: str) -> str:
+    return '{}.gz.idx'.format(file_path)
+
+
+def get_blocks_index(file_path: str) -> Optional[Dict]:
+    try:
+        with open(get_blocks_index_path(file_path), 'r') as index_file:
+            return json.load(index_file)
+    except (OSError, ValueError):
+        return None
+
+
+def is_compacted(file_path: str) -> bool:
+    return os.path.exists(get_blocks_index_path(file_path))
+
+
+def get_compacted_index(file_path: str) -> Optional[Dict]:
+    """
+    Returns the index of the compacted logs, None if the logs are not compacted.
+
+    The lines appended after the compaction, and not compacted yet by the logs handler,
+    are read as the `tail` of the logs after the blocks, the logs are not compacted on read.
+    """
+    try:
+        log_file = open(file_path, 'rb')
+    except FileNotFoundError:
+        return get_blocks_index(file_path)
+
+    with log_file:
+        # Shared with the other reads, the index and the tail are read between compactions
+        fcntl.flock(log_file, fcntl.LOCK_SH)
+        index = get_blocks_index(file_path)
+        if not index or os.fstat(log_file.fileno()).st_nlink == 0:
+            return index
+        tail_lines = log_file.readlines()
+    if tail_lines:
+        index['tail'] = {'start': index['size'], 'line': index['lines'], 'lines': tail_lines}
+        index['size'] += sum(len(line) for line in tail_lines)
+        index['lines'] += len(tail_lines)
+    return index
+
+
+def get_tail_lines(index: Dict) -> List[bytes]:
+    tail = index.get('tail')
+    return tail['lines'] if tail else []
+
+
+def _compress(data: bytes) -> bytes:
+    compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, GZIP_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _open_blocks_file(file_path: str, blocks: List[Dict]):
+    blocks_path = get_blocks_path(file_path)
+    if not blocks:
+        return open('{}.tmp'.format(blocks_path), 'wb')
+    # The new blocks are added after the last indexed one,
+    # the readers of the current index are not affected
+    blocks_file = open(blocks_path, 'r+b')
+    blocks_file.truncate(blocks[-1]['offset'] + blocks[-1]['length'])
+    blocks_file.seek(0, os.SEEK_END)
+    return blocks_file
+
+
+def compact_log_file(file_path: str, block_size: int = BLOCK_SIZE) -> Dict:
+    """
+    Rewrites the log file as independently compressed blocks of about `block_size` bytes,
+    with an index of the raw bytes, lines and timestamps of every block,
+    and removes the raw log file.
+
+    If the logs were already compacted, the log file holds the lines appended since,
+    they are compacted in new blocks after the existing ones.
+
+    The log file is locked, as by the logs writer, until it is removed,
+    the lines flushed meanwhile are appended to a new log file,
+    and the compactions of the same logs run one at a time.
+    """
+    try:
+        log_file = open(file_path, 'rb')
+    except FileNotFoundError:
+        return get_blocks_index(file_path)
+
+    with log_file:
+        fcntl.flock(log_file, fcntl.LOCK_EX)
+        if os.fstat(log_file.fileno()).st_nlink == 0:
+            # Compacted while waiting for the lock
+            return get_blocks_index(file_path)
+        return _compact_log_file(file_path=file_path, log_file=log_file, block_size=block_size)
+
+
+def _compact_log_file(file_path: str, log_file, block_size: int) -> Dict:
+    blocks_path = get_blocks_path(file_path)
+    tmp_blocks_path = '{}.tmp'.format(blocks_path)
+    index = get_blocks_index(file_path) if os.path.exists(blocks_path) else None
+    if not (index and index['blocks']):
+        index = {'size': 0, 'lines': 0, 'blocks': []}
+    blocks = index['blocks']
+    size = index['size']
+    lines = index['lines']
+    is_new = not blocks
+    with _open_blocks_file(file_path, blocks) as blocks_file:
+        while True:
+            block_lines = log_file.readlines(block_size)
+            if not block_lines:
+                break
+            data = b''.join(block_lines)
+            compressed = _compress(data)
+            timestamps = [timestamp for timestamp in map(get_line_timestamp, block_lines)
+                          if timestamp]
+            blocks.append({
+                'offset': blocks_file.tell(),
+                'length': len(compressed),
+                'start': size,
+                'end': size + len(data),
+                'line': lines,
+                'lines': len(block_lines),
+                'start_time': min(timestamps) if timestamps else None,
+                'end_time': max(timestamps) if timestamps else None,
+            })
+            blocks_file.write(compressed)
+            size += len(data)
+            lines += len(block_lines)
+
+    index = {'size': size, 'lines': lines, 'blocks': blocks}
+    index_path = get_blocks_index_path(file_path)
+    tmp_index_path = '{}.tmp'.format(index_path)
+    with open(tmp_index_path, 'w') as index_file:
+        json.dump(index, index_file)
+    if is_new:
+        os.replace(tmp_blocks_path, blocks_path)
+    os.replace(tmp_index_path, index_path)
+    os.remove(file_path)
+    if os.path.exists(get_index_path(file_path)):
+        os.remove(get_index_path(file_path))
+    return index
+
+
+def read_block(file_path: str, block: Dict) -> bytes:
+    with open(get_blocks_path(file_path), 'rb') as blocks_file:
+        blocks_file.seek(block['offset'])
+        return zlib.decompress(blocks_file.read(block['length']), GZIP_WBITS)
+
+
+def get_blocks_range(index: Dict, start: int = 0, end: Optional[int] = None) -> List[Dict]:
+    """Returns the blocks holding the bytes range [start, end) of the raw logs."""
+    end = index['size'] if end is None else end
+    return [block for block in index['blocks'] if block['end'] > start and block['start'] < end]
+
+
+def read_log_blocks(file_path: str,
+                    index: Dict,
+                    start: int = 0,
+                    end: Optional[int] = None) -> Iterator[bytes]:
+    """Yields the bytes range [start, end) of the raw logs, only the needed blocks are read."""
+    end = index['size'] if end is None else end
+    for block in get_blocks_range(index=index, start=start, end=end):
+        data = read_block(file_path=file_path, block=block)
+        yield data[max(start - block['start'], 0):end - block['start']]
+    tail = index.get('tail')
+    if tail and end > tail['start']:
+        data = b''.join(tail['lines'])
+        yield data[max(start - tail['start'], 0):end - tail['start']]
+
+
+def get_blocks_line_offset(file_path: str, index: Dict, line: int) -> int:
+    """Returns the byte offset of the line, only the block holding the line is read."""
+    if line <= 0:
+        return 0
+    if line >= index['lines']:
+        return index['size']
+    tail = index.get('tail')
+    if tail and line >= tail['line']:
+        tail_lines = tail['lines'][:line - tail['line']]
+        return tail['start'] + sum(len(tail_line) for tail_line in tail_lines)
+    blocks = index['blocks']
+    block = blocks[bisect.bisect_right([b['line'] for b in blocks], line) - 1]
+    position = block['start']
+    block_lines = read_block(file_path=file_path, block=block).splitlines(keepends=True)
+    for block_line in block_lines[:line - block['line']]:
+        position += len(block_line)
+    return position
+
+
+def get_blocks_tail_offset(file_path: str, index: Dict, lines: int) -> int:
+    if lines <= 0:
+        return index['size']
+    return get_blocks_line_offset(file_path=file_path, index=index, line=index['lines'] - lines)
+
+
+def get_blocks_lines_range(file_path: str,
+                           index: Dict,
+                           offset: int,
+                           limit: Optional[int] = None) -> Tuple[int, int]:
+    """Returns the bytes range [start, end) of `limit` lines starting at the `offset` line."""
+    start = get_blocks_line_offset(file_path=file_path, index=index, line=offset)
+    if limit is None:
+        return start, index['size']
+    return start, get_blocks_line_offset(file_path=file_path, index=index, line=offset + limit)
+
+
+def get_blocks_time_range(file_path: str,
+                          index: Dict,
+                          start_time: Optional[str],
+                          end_time: Optional[str]) -> Tuple[int, int]:
+    """
+    Returns the bytes range [start, end) of the lines logged between the two timestamps,
+    the blocks logged entirely before the window are skipped based on the index.
+    """
+    start = None
+    end = None
+    for block in index['blocks']:
+        block_end_time = block['end_time']
+        if block_end_time:
+            if start is None and start_time and block_end_time < start_time:
+                continue
+            if start is not None and end_time and block_end_time <= end_time:
+                continue
+        block_lines = read_block(file_path=file_path, block=block).splitlines(keepends=True)
+        start, end = find_time_offsets(lines=block_lines,
+                                       offset=block['start'],
+                                       start_time=start_time,
+                                       end_time=end_time,
+                                       start=start)
+        if end is not None:
+            break
+    tail = index.get('tail')
+    if tail and end is None:
+        start, end = find_time_offsets(lines=tail['lines'],
+                                       offset=tail['start'],
+                                       start_time=start_time,
+                                       end_time=end_time,
+                                       start=start)
+    size = index['size']
+    return size if start is None else start, size if end is None else end
@@ -0,0 +1,135 @@
+import json
+import os
+import shutil
+import time
+
+from typing import Dict, List, Optional
+
+CHUNK_NAME = 'chunk-{:06d}'
+MANIFEST_NAME = 'manifest.json'
+
+
+def get_chunks_path(log_path: str) -> str:
+    return '{}.chunks'.format(log_path)
+
+
+def get_manifest_path(log_path: str) -> str:
+    return os.path.join(get_chunks_path(log_path), MANIFEST_NAME)
+
+
+def get_appended_path(temp_path: str) -> str:
+    """
+    The local file the appended lines are written to, and shipped as chunks from,
+    it's kept apart from the temp file rewritten with the logs queried from k8s.
+    """
+    return '{}.appended'.format(temp_path)
+
+
+def get_shipped_path(temp_path: str) -> str:
+    """The local copy of the manifest of the chunks already uploaded from the temp file."""
+    return '{}.shipped'.format(temp_path)
+
+
+def get_empty_manifest() -> Dict:
+    return {'size': 0, 'uploaded_at': 0, 'chunks': []}
+
+
+def read_manifest(manifest_path: str) -> Optional[Dict]:
+    try:
+        with open(manifest_path, 'r') as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(manifest_path: str, manifest: Dict) -> None:
+    tmp_manifest_path = '{}.tmp'.format(manifest_path)
+    with open(tmp_manifest_path, 'w') as manifest_file:
+        json.dump(manifest, manifest_file)
+    os.replace(tmp_manifest_path, manifest_path)
+
+
+def get_chunks_range(manifest: Dict, start: int = 0, end: Optional[int] = None) -> List[Dict]:
+    """Returns the chunks holding the bytes range [start, end) of the log file."""
+    end = manifest['size'] if end is None else end
+    return [chunk for chunk in manifest['chunks'] if chunk['end'] > start and chunk['start'] < end]
+
+
+def ship_log_chunks(store,
+                    temp_path: str,
+                    log_path: str,
+                    chunk_size: int,
+                    chunk_interval: float,
+                    force: bool = False) -> Dict:
+    """
+    Uploads the bytes appended to the temp log file since the last call as a new immutable chunk,
+    under `<log_path>.chunks/chunk-000123`, and uploads the manifest listing the chunks.
+
+    A chunk is only uploaded once at least `chunk_size` bytes are pending,
+    or `chunk_interval` seconds passed since the last chunk, so that every byte is uploaded once.
+    """
+    shipped_path = get_shipped_path(temp_path)
+    manifest = read_manifest(shipped_path) or get_empty_manifest()
+    size = os.path.getsize(temp_path)
+    if size < manifest['size']:
+        # The temp file was rewritten, the chunks are shipped again from the start
+        manifest = get_empty_manifest()
+    pending = size - manifest['size']
+    if pending <= 0:
+        return manifest
+    is_due = pending >= chunk_size or time.time() - manifest['uploaded_at'] >= chunk_interval
+    if not (force or is_due):
+        return manifest
+
+    name = CHUNK_NAME.format(len(manifest['chunks']))
+    chunk_path = '{}.{}'.format(temp_path, name)
+    with open(temp_path, 'rb') as log_file, open(chunk_path, 'wb') as chunk_file:
+        log_file.seek(manifest['size'])
+        chunk_file.write(log_file.read(pending))
+    try:
+        store.upload_file(filename=chunk_path,
+                          path=os.path.join(get_chunks_path(log_path), name),
+                          use_basename=False)
+    finally:
+        os.remove(chunk_path)
+
+    manifest['chunks'].append({'name': name, 'start': manifest['size'], 'end': size})
+    manifest['size'] = size
+    manifest['uploaded_at'] = time.time()
+    write_manifest(shipped_path, manifest)
+    store.upload_file(filename=shipped_path,
+                      path=get_manifest_path(log_path),
+                      use_basename=False)
+    return manifest
+
+
+def discard_log_chunks(store, temp_path: str, log_path: str) -> None:
+    """Deletes the chunks once the whole log file was uploaded."""
+    shipped_path = get_shipped_path(temp_path)
+    if not os.path.exists(shipped_path):
+        return
+    store.delete(get_chunks_path(log_path))
+    os.remove(shipped_path)
+
+
+def download_log_chunks(store, log_path: str, manifest: Dict, download_path: str) -> str:
+    """
+    Reassembles the log file from its chunks.
+
+    A previous download is kept as long as it ends on a chunk boundary,
+    and only the chunks written after it are downloaded.
+    """
+    start = os.path.getsize(download_path) if os.path.exists(download_path) else 0
+    if start > manifest['size'] or start not in {chunk['end'] for chunk in manifest['chunks']}:
+        start = 0
+    chunk_download_path = '{}.chunk'.format(download_path)
+    with open(download_path, 'ab' if start else 'wb') as log_file:
+        for chunk in get_chunks_range(manifest, start=start):
+            store.download_file(os.path.join(get_chunks_path(log_path), chunk['name']),
+                                chunk_download_path,
+                                use_basename=False)
+            with open(chunk_download_path, 'rb') as chunk_file:
+                shutil.copyfileobj(chunk_file, log_file)
+    if os.path.exists(chunk_download_path):
+        os.remove(chunk_download_path)
+    return download_path
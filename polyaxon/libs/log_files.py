@@ -0,0 +1,183 @@
+import json
+import os
+import re
+import zlib
+
+from typing import Dict, Iterable, Optional, Tuple
+
+READ_BLOCK_SIZE = 64 * 1024
+LINES_INDEX_STEP = 1000
+# Number of bytes at the start of the log file checked to tell a rewritten file
+INDEX_HEAD_SIZE = 4096
+# Log lines are stored with a `%Y-%m-%d %H:%M:%S %Z` timestamp prefix
+LINE_TIMESTAMP_REGEX = re.compile(rb'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})')
+
+
+def get_tail_offset(file_path: str, lines: int, block_size: int = READ_BLOCK_SIZE) -> int:
+    """Returns the byte offset of the last `lines` lines, by scanning the file backwards."""
+    file_size = os.path.getsize(file_path)
+    if lines <= 0:
+        return file_size
+    with open(file_path, 'rb') as log_file:
+        position = file_size
+        # A trailing new line ends the last line, it does not start a new one
+        log_file.seek(max(file_size - 1, 0))
+        if file_size and log_file.read(1) == b'\n':
+            position -= 1
+        remaining = lines
+        while position > 0:
+            read_size = min(block_size, position)
+            position -= read_size
+            log_file.seek(position)
+            block = log_file.read(read_size)
+            index = len(block)
+            while remaining:
+                index = block.rfind(b'\n', 0, index)
+                if index < 0:
+                    break
+                remaining -= 1
+            if not remaining:
+                return position + index + 1
+    return 0
+
+
+def get_index_path(file_path: str) -> str:
+    return '{}.idx'.format(file_path)
+
+
+def get_file_identity(file_path: str, head_size: int) -> Dict:
+    """Identifies the log file by its inode and the checksum of its first bytes."""
+    with open(file_path, 'rb') as log_file:
+        head = log_file.read(head_size)
+        return {'inode': os.fstat(log_file.fileno()).st_ino,
+                'head_size': len(head),
+                'head': zlib.crc32(head)}
+
+
+def is_valid_index(file_path: str, index: Optional[Dict], step: int, file_size: int) -> bool:
+    """Checks that the index was built for the lines of this log file."""
+    if not index or index.get('step') != step or index.get('size', 0) > file_size:
+        return False
+    identity = index.get('identity')
+    return bool(identity) and identity == get_file_identity(file_path,
+                                                            head_size=identity['head_size'])
+
+
+def _scan_lines(file_path: str, index: Dict, step: int) -> Dict:
+    """Extends the index with the lines written after the last indexed position."""
+    offsets = index['offsets']
+    lines = index['lines']
+    position = index['size']
+    with open(file_path, 'rb') as log_file:
+        log_file.seek(position)
+        for line in log_file:
+            if not line.endswith(b'\n'):
+                # Not complete yet, it will be indexed with the next scan
+                break
+            position += len(line)
+            lines += 1
+            if lines % step == 0:
+                offsets.append(position)
+    return {'size': position, 'lines': lines, 'step': step, 'offsets': offsets}
+
+
+def get_lines_index(file_path: str, step: int = LINES_INDEX_STEP) -> Dict:
+    """
+    Returns a sparse index of the log file with the byte offset of every `step` lines.
+
+    The index is stored next to the log file, and only extended with the new lines
+    as long as the log file is appended to, a log file replaced or rewritten is indexed again.
+    """
+    index_path = get_index_path(file_path)
+    index = None
+    try:
+        with open(index_path, 'r') as index_file:
+            index = json.load(index_file)
+    except (OSError, ValueError):
+        pass
+
+    file_size = os.path.getsize(file_path)
+    if not is_valid_index(file_path=file_path, index=index, step=step, file_size=file_size):
+        index = {'size': 0, 'lines': 0, 'step': step, 'offsets': [0]}
+    elif index['size'] == file_size:
+        return index
+
+    index = _scan_lines(file_path=file_path, index=index, step=step)
+    index['identity'] = get_file_identity(file_path,
+                                          head_size=min(index['size'], INDEX_HEAD_SIZE))
+    try:
+        tmp_index_path = '{}.tmp'.format(index_path)
+        with open(tmp_index_path, 'w') as index_file:
+            json.dump(index, index_file)
+        os.replace(tmp_index_path, index_path)
+    except OSError:
+        # The index is only an optimization
+        pass
+    return index
+
+
+def get_line_offset(file_path: str, line: int, index: Dict) -> int:
+    """Returns the byte offset of the line, reading at most `step` lines from the index."""
+    if line <= 0:
+        return 0
+    if line >= index['lines']:
+        return index['size']
+    step = index['step']
+    position = index['offsets'][line // step]
+    with open(file_path, 'rb') as log_file:
+        log_file.seek(position)
+        for _ in range(line % step):
+            position += len(log_file.readline())
+    return position
+
+
+def get_lines_range(file_path: str,
+                    offset: int,
+                    limit: Optional[int] = None,
+                    step: int = LINES_INDEX_STEP) -> Tuple[int, int]:
+    """Returns the bytes range [start, end) of `limit` lines starting at the `offset` line."""
+    index = get_lines_index(file_path=file_path, step=step)
+    start = get_line_offset(file_path=file_path, line=offset, index=index)
+    if limit is None:
+        return start, os.path.getsize(file_path)
+    end = get_line_offset(file_path=file_path, line=offset + limit, index=index)
+    return start, end
+
+
+def get_line_timestamp(line: bytes) -> Optional[str]:
+    match = LINE_TIMESTAMP_REGEX.match(line)
+    return match.group(1).decode('utf-8') if match else None
+
+
+def find_time_offsets(lines: Iterable[bytes],
+                      offset: int,
+                      start_time: Optional[str],
+                      end_time: Optional[str],
+                      start: Optional[int] = None) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Scans the lines starting at the `offset` byte, and returns the byte offsets
+    of the first line logged at or after `start_time`,
+    and of the first line logged after `end_time`.
+    """
+    for line in lines:
+        timestamp = get_line_timestamp(line)
+        if timestamp:
+            if start is None and (not start_time or timestamp >= start_time):
+                start = offset
+            if end_time and timestamp > end_time:
+                return start, offset
+        offset += len(line)
+    return start, None
+
+
+def get_time_range(file_path: str,
+                   start_time: Optional[str],
+                   end_time: Optional[str]) -> Tuple[int, int]:
+    """Returns the bytes range [start, end) of the lines logged between the two timestamps."""
+    file_size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as log_file:
+        start, end = find_time_offsets(lines=log_file,
+                                       offset=0,
+                                       start_time=start_time,
+                                       end_time=end_time)
+    return file_size if start is None else start, file_size if end is None else end
@@ -0,0 +1,132 @@
+import itertools
+import queue
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional, Pattern
+
+from libs.log_blocks import get_compacted_index, get_tail_lines, read_block
+from libs.log_files import get_line_timestamp
+
+# Maximum number of matching lines buffered per search worker
+SEARCH_BUFFER_SIZE = 1000
+SEARCH_MAX_WORKERS = 8
+_DONE = object()
+
+
+def read_log_file_lines(file_path: str,
+                        start_time: Optional[str] = None,
+                        end_time: Optional[str] = None) -> Iterator[bytes]:
+    """
+    Yields the lines of a raw or compacted log file,
+    for compacted logs, only one block is decompressed at a time,
+    and the blocks outside the time window are skipped.
+    """
+    index = get_compacted_index(file_path)
+    if not index:
+        with open(file_path, 'rb') as log_file:
+            yield from log_file
+        return
+
+    for block in index['blocks']:
+        if start_time and block['end_time'] and block['end_time'] < start_time:
+            continue
+        if end_time and block['start_time'] and block['start_time'] > end_time:
+            return
+        yield from read_block(file_path=file_path, block=block).splitlines(keepends=True)
+    yield from get_tail_lines(index)
+
+
+def is_replica_line(line: bytes, replica: bytes) -> bool:
+    """Checks the name the line was logged with, e.g. `<timestamp> worker.3 -- <log line>`."""
+    head, sep, _ = line.partition(b' -- ')
+    return bool(sep) and head.endswith(b' ' + replica)
+
+
+def search_log_file(file_path: str,
+                    pattern: Optional[Pattern] = None,
+                    replica: Optional[str] = None,
+                    start_time: Optional[str] = None,
+                    end_time: Optional[str] = None) -> Iterator[bytes]:
+    """Yields the lines matching all the filters, the file is streamed, not loaded."""
+    replica = replica.encode('utf-8') if replica else None
+    for line in read_log_file_lines(file_path=file_path,
+                                    start_time=start_time,
+                                    end_time=end_time):
+        if replica and not is_replica_line(line, replica):
+            continue
+        if start_time or end_time:
+            timestamp = get_line_timestamp(line)
+            if timestamp and start_time and timestamp < start_time:
+                continue
+            if timestamp and end_time and timestamp > end_time:
+                # The logs are ordered
+                return
+        if pattern and not pattern.search(line):
+            continue
+        yield line if line.endswith(b'\n') else line + b'\n'
+
+
+def search_log_files(file_paths: List[str],
+                     limit: Optional[int] = None,
+                     max_workers: int = SEARCH_MAX_WORKERS,
+                     **filters) -> Iterator[bytes]:
+    """
+    Yields the lines matching the filters, up to `limit` lines.
+
+    Several files, e.g. the logs of every replica of an experiment, are searched in parallel
+    by at most `max_workers` threads, the lines of each file are yielded in order,
+    the files' lines are interleaved.
+    The matching lines are buffered in a single queue of `SEARCH_BUFFER_SIZE` lines per worker,
+    the searches stop as soon as the limit is reached.
+    """
+    if limit is not None and limit <= 0:
+        return
+    if len(file_paths) == 1:
+        yield from itertools.islice(search_log_file(file_path=file_paths[0], **filters), limit)
+        return
+
+    max_workers = max(min(max_workers, len(file_paths)), 1)
+    results = queue.Queue(maxsize=SEARCH_BUFFER_SIZE * max_workers)
+    stopped = threading.Event()
+
+    def put(item) -> bool:
+        while not stopped.is_set():
+            try:
+                results.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def search(file_path):
+        if stopped.is_set():
+            return
+        try:
+            for line in search_log_file(file_path=file_path, **filters):
+                if not put(line):
+                    return
+        except OSError:
+            pass
+        finally:
+            put(_DONE)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futures = [executor.submit(search, file_path) for file_path in file_paths]
+    running = len(futures)
+    count = 0
+    try:
+        while running:
+            line = results.get()
+            if line is _DONE:
+                running -= 1
+                continue
+            yield line
+            count += 1
+            if limit is not None and count >= limit:
+                return
+    finally:
+        stopped.set()
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
@@ -7,6 +7,11 @@ from logs_handlers.log_queries.experiment import process_experiment_jobs_logs
 from logs_handlers.log_queries.experiment import process_logs as process_experiment_logs
 from logs_handlers.log_queries.experiment_job import process_logs as process_experiment_job_logs
 from logs_handlers.log_queries.job import process_logs as process_job_logs
+from logs_handlers.utils import (
+    compact_experiment_job_logs,
+    compact_experiment_logs,
+    compact_job_logs
+)
 
 
 def logs_collect_experiment_jobs(experiment_uuid: str) -> None:
@@ -20,8 +25,11 @@ def logs_collect_experiment_jobs(experiment_uuid: str) -> None:
 
     if experiment.jobs.count() > 1:
         process_experiment_jobs_logs(experiment=experiment, temp=False)
+        for experiment_job in experiment.jobs.all():
+            compact_experiment_job_logs(experiment_job_name=experiment_job.unique_name)
     else:
         process_experiment_logs(experiment=experiment, temp=False)
+        compact_experiment_logs(experiment_name=experiment.unique_name)
 
 
 def logs_collect_experiment_job(experiment_job_uuid: str) -> None:
@@ -48,6 +56,7 @@ def logs_collect_job(job_uuid: str) -> None:
         return
 
     process_job_logs(job=job, temp=False)
+    compact_job_logs(job_name=job.unique_name)
 
 
 def logs_collect_build_job(build_uuid: str) -> None:
@@ -60,3 +69,4 @@ def logs_collect_build_job(build_uuid: str) -> None:
         return
 
     process_build_logs(build=build, temp=False)
+    compact_job_logs(job_name=build.unique_name)
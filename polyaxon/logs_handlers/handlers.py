@@ -1,17 +1,46 @@
+import time
+
+from collections import OrderedDict
 from typing import Iterable, Optional, Union
 
+import conf
+
 from db.models.build_jobs import BuildJob
 from db.models.experiments import Experiment
 from db.models.jobs import Job
 from logs_handlers.tasks.logger import logger
 from logs_handlers.utils import safe_log_experiment, safe_log_job
 
+RUNS_CACHE_SIZE = 10000
+
+# Maps (model, run uuid) to the time the run was last seen, least recently seen first
+_runs_cache = OrderedDict()
+
+
+def run_exists(model, run_uuid: str) -> bool:
+    """
+    Checks that the run exists, a run that exists is cached for `LOGS_RUNS_CACHE_TTL` seconds,
+    since every log batch of a run would otherwise hit the db.
+    """
+    key = (model.__name__, str(run_uuid))
+    seen_at = _runs_cache.get(key)
+    current = time.monotonic()
+    if seen_at is not None and current - seen_at < conf.get('LOGS_RUNS_CACHE_TTL'):
+        return True
+    _runs_cache.pop(key, None)
+    if not model.objects.filter(uuid=run_uuid).exists():
+        return False
+    _runs_cache[key] = current
+    while len(_runs_cache) > RUNS_CACHE_SIZE:
+        _runs_cache.popitem(last=False)
+    return True
+
 
 def handle_experiment_job_log(experiment_name: str,
                               experiment_uuid: str,
                               log_lines: Optional[Union[str, Iterable[str]]],
                               temp: bool = True) -> None:
-    if not Experiment.objects.filter(uuid=experiment_uuid).exists():
+    if not run_exists(Experiment, experiment_uuid):
         return
 
     logger.debug('handling log event for %s', experiment_uuid)
@@ -25,7 +54,7 @@ def handle_job_logs(job_uuid: str,
                     job_name: str,
                     log_lines: Optional[Union[str, Iterable[str]]],
                     temp: bool = True) -> None:
-    if not Job.objects.filter(uuid=job_uuid).exists():
+    if not run_exists(Job, job_uuid):
         return
 
     logger.debug('handling log event for %s', job_name)
@@ -36,7 +65,7 @@ def handle_build_job_logs(job_uuid: str,
                           job_name: str,
                           log_lines: Optional[Union[str, Iterable[str]]],
                           temp: bool = True) -> None:
-    if not BuildJob.objects.filter(uuid=job_uuid).exists():
+    if not run_exists(BuildJob, job_uuid):
         return
 
     logger.debug('handling log event for %s', job_name)
@@ -1,21 +1,35 @@
-from typing import Any, Iterable
+from typing import Any, Iterable, Optional
 
 from hestia.logging_utils import LogSpec
 from kubernetes.client.rest import ApiException
 
 from polyaxon_k8s.exceptions import PolyaxonK8SError
 
+READ_CHUNK_SIZE = 64 * 1024
+
 
 def query_logs(k8s_manager: 'K8SManager',
                pod_id: str,
                container_job_name: str,
-               stream: bool = False) -> Any:
+               stream: bool = False,
+               tail_lines: Optional[int] = None,
+               since_seconds: Optional[int] = None,
+               preload_content: bool = True) -> Any:
     params = {}
     if stream:
         params = {
             'follow': True,
             '_preload_content': False
         }
+    elif not preload_content:
+        # The response is read in chunks
+        params['_preload_content'] = False
+    if tail_lines is not None:
+        # Only the last lines are sent by k8s
+        params['tail_lines'] = tail_lines
+    if since_seconds is not None:
+        # Only the lines of the last seconds are sent by k8s
+        params['since_seconds'] = since_seconds
 
     return k8s_manager.k8s_api.read_namespaced_pod_log(
         pod_id,
@@ -62,11 +76,52 @@ def stream_logs(k8s_manager: 'K8SManager',
                 yield process_log_line(log_line=log_line, task_type=task_type, task_idx=task_idx)
 
 
+def iter_log_lines(chunks: Iterable[bytes]) -> Iterable[bytes]:
+    """Splits the chunks of a response in lines, only the current chunk is kept in memory."""
+    pending = b''
+    for chunk in chunks:
+        log_lines = (pending + chunk).split(b'\n')
+        pending = log_lines.pop()
+        yield from log_lines
+    if pending:
+        yield pending
+
+
+def stream_process_logs(k8s_manager: 'K8SManager',
+                        pod_id: str,
+                        container_job_name: str,
+                        task_type: str = None,
+                        task_idx: int = None) -> Iterable[str]:
+    """Same as `process_logs`, but the logs are read and processed line by line."""
+    logs = None
+    retries = 0
+    while retries < 3 and logs is None:
+        try:
+            logs = query_logs(k8s_manager=k8s_manager,
+                              pod_id=pod_id,
+                              container_job_name=container_job_name,
+                              preload_content=False)
+        except (PolyaxonK8SError, ApiException):
+            retries += 1
+
+    if logs is None:
+        return
+
+    try:
+        for log_line in iter_log_lines(logs.stream(READ_CHUNK_SIZE)):
+            if log_line:
+                yield process_log_line(log_line=log_line, task_type=task_type, task_idx=task_idx)
+    finally:
+        logs.release_conn()
+
+
 def process_logs(k8s_manager: 'K8SManager',
                  pod_id: str,
                  container_job_name: str,
                  task_type: str = None,
-                 task_idx: int = None) -> str:
+                 task_idx: int = None,
+                 tail_lines: Optional[int] = None,
+                 since_seconds: Optional[int] = None) -> str:
     logs = None
     retries = 0
     no_logs = True
@@ -74,7 +129,9 @@ def process_logs(k8s_manager: 'K8SManager',
         try:
             logs = query_logs(k8s_manager=k8s_manager,
                               pod_id=pod_id,
-                              container_job_name=container_job_name)
+                              container_job_name=container_job_name,
+                              tail_lines=tail_lines,
+                              since_seconds=since_seconds)
             no_logs = False
         except (PolyaxonK8SError, ApiException):
             retries += 1
@@ -1,4 +1,4 @@
-from typing import Iterable
+from typing import Iterable, Optional
 
 import conf
 
@@ -21,3 +21,14 @@ def process_logs(build: 'BuildJob', temp: bool = True) -> None:
                                   container_job_name=conf.get('CONTAINER_NAME_DOCKERIZER_JOB'))
 
     safe_log_job(job_name=build.unique_name, log_lines=log_lines, temp=temp, append=False)
+
+
+def tail_logs(build: 'BuildJob',
+              tail_lines: Optional[int] = None,
+              since_seconds: Optional[int] = None) -> str:
+    k8s_manager = K8SManager(namespace=conf.get('K8S_NAMESPACE'), in_cluster=True)
+    return base.process_logs(k8s_manager=k8s_manager,
+                             pod_id=build.pod_id,
+                             container_job_name=conf.get('CONTAINER_NAME_DOCKERIZER_JOB'),
+                             tail_lines=tail_lines,
+                             since_seconds=since_seconds)
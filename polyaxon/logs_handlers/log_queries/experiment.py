@@ -1,12 +1,12 @@
-from typing import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
 
 import conf
 
 from constants.experiment_jobs import get_experiment_job_container_name
 from constants.k8s_jobs import EXPERIMENT_JOB_NAME_FORMAT
 from logs_handlers.log_queries import base
-from logs_handlers.log_queries.experiment_job import process_logs as process_experiment_job_logs
-from logs_handlers.utils import safe_log_experiment
+from logs_handlers.utils import safe_log_experiment, stream_log_experiment_job
 from polyaxon_k8s.manager import K8SManager
 
 
@@ -41,9 +41,49 @@ def process_logs(experiment: 'Experiment', temp: bool = True) -> None:
                         append=False)
 
 
+def tail_logs(experiment: 'Experiment',
+              tail_lines: Optional[int] = None,
+              since_seconds: Optional[int] = None) -> str:
+    pod_id = EXPERIMENT_JOB_NAME_FORMAT.format(
+        task_type=experiment.default_job_role,
+        task_idx=0,
+        experiment_uuid=experiment.uuid.hex)
+    k8s_manager = K8SManager(namespace=conf.get('K8S_NAMESPACE'), in_cluster=True)
+    container_job_name = get_experiment_job_container_name(backend=experiment.backend,
+                                                           framework=experiment.framework)
+    return base.process_logs(k8s_manager=k8s_manager,
+                             pod_id=pod_id,
+                             container_job_name=container_job_name,
+                             tail_lines=tail_lines,
+                             since_seconds=since_seconds)
+
+
 def process_experiment_jobs_logs(experiment: 'Experiment', temp: bool = True) -> None:
+    """
+    Collects the logs of all the experiment's replicas concurrently,
+    every replica's logs are streamed line by line to its log file.
+    """
     k8s_manager = K8SManager(namespace=conf.get('K8S_NAMESPACE'), in_cluster=True)
-    for experiment_job in experiment.jobs.all():
-        process_experiment_job_logs(experiment_job=experiment_job,
-                                    temp=temp,
-                                    k8s_manager=k8s_manager)
+    container_job_name = get_experiment_job_container_name(backend=experiment.backend,
+                                                           framework=experiment.framework)
+    # The jobs are read beforehand, the collectors do not query the db
+    experiment_jobs = [{
+        'experiment_job_name': experiment_job.unique_name,
+        'pod_id': experiment_job.pod_id,
+        'task_type': experiment_job.role,
+        'task_idx': experiment_job.sequence,
+    } for experiment_job in experiment.jobs.all()]
+
+    def collect(experiment_job: Dict) -> None:
+        log_lines = base.stream_process_logs(k8s_manager=k8s_manager,
+                                             pod_id=experiment_job['pod_id'],
+                                             container_job_name=container_job_name,
+                                             task_type=experiment_job['task_type'],
+                                             task_idx=experiment_job['task_idx'])
+        stream_log_experiment_job(experiment_job_name=experiment_job['experiment_job_name'],
+                                  log_lines=log_lines,
+                                  temp=temp)
+
+    with ThreadPoolExecutor(max_workers=conf.get('LOGS_COLLECT_WORKERS')) as executor:
+        # Raises the first error once all the replicas are collected
+        list(executor.map(collect, experiment_jobs))
@@ -1,3 +1,5 @@
+from typing import Optional
+
 import conf
 
 from constants.experiment_jobs import get_experiment_job_container_name
@@ -26,3 +28,19 @@ def process_logs(experiment_job: 'ExperimentJob',
                             log_lines=log_lines,
                             temp=temp,
                             append=False)
+
+
+def tail_logs(experiment_job: 'ExperimentJob',
+              tail_lines: Optional[int] = None,
+              since_seconds: Optional[int] = None) -> str:
+    k8s_manager = K8SManager(namespace=conf.get('K8S_NAMESPACE'), in_cluster=True)
+    container_job_name = get_experiment_job_container_name(
+        backend=experiment_job.experiment.backend,
+        framework=experiment_job.experiment.framework)
+    return base.process_logs(k8s_manager=k8s_manager,
+                             pod_id=experiment_job.pod_id,
+                             container_job_name=container_job_name,
+                             task_type=experiment_job.role,
+                             task_idx=experiment_job.sequence,
+                             tail_lines=tail_lines,
+                             since_seconds=since_seconds)
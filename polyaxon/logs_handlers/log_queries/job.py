@@ -1,4 +1,4 @@
-from typing import Iterable
+from typing import Iterable, Optional
 
 import conf
 
@@ -21,3 +21,14 @@ def process_logs(job: 'Job', temp: bool = True) -> None:
                                   container_job_name=conf.get('CONTAINER_NAME_JOB'))
 
     safe_log_job(job_name=job.unique_name, log_lines=log_lines, temp=temp, append=False)
+
+
+def tail_logs(job: 'Job',
+              tail_lines: Optional[int] = None,
+              since_seconds: Optional[int] = None) -> str:
+    k8s_manager = K8SManager(namespace=conf.get('K8S_NAMESPACE'), in_cluster=True)
+    return base.process_logs(k8s_manager=k8s_manager,
+                             pod_id=job.pod_id,
+                             container_job_name=conf.get('CONTAINER_NAME_JOB'),
+                             tail_lines=tail_lines,
+                             since_seconds=since_seconds)
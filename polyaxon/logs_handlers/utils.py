@@ -1,9 +1,20 @@
 import fcntl
+import os
 
-from typing import Iterable, Optional, Union
+from typing import Callable, Iterable, Optional, Union
 
+import conf
 import stores
 
+from libs.log_blocks import (
+    compact_log_file,
+    get_blocks_index_path,
+    get_blocks_path,
+    is_compacted
+)
+from libs.log_chunks import discard_log_chunks, get_appended_path, ship_log_chunks
+from logs_handlers.writer import get_log_writer
+
 
 def _lock_log(log_path: str,
               log_lines: Optional[Union[str, Iterable[str]]],
@@ -17,12 +28,96 @@ def _lock_log(log_path: str,
         fcntl.flock(log_file, fcntl.LOCK_UN)
 
 
+def _get_append_path(log_path: str) -> str:
+    """With a bucket persistence, the appended lines are shipped as chunks from their own file."""
+    if stores.is_bucket_logs_persistence():
+        return get_appended_path(log_path)
+    return log_path
+
+
+def _append_log(log_path: str,
+                log_lines: Optional[Union[str, Iterable[str]]],
+                create_path: Callable) -> None:
+    """
+    Appends the lines with the logs writer,
+    the lines appended after the compaction of the logs, e.g. by a late sidecar,
+    are compacted right away in new blocks.
+    """
+    append_path = _get_append_path(log_path)
+    log_writer = get_log_writer()
+    log_writer.write(log_path=append_path, log_lines=log_lines, create_path=create_path)
+    if append_path == log_path and is_compacted(log_path):
+        log_writer.flush(log_path)
+        compact_log_file(log_path)
+
+
+def _upload_log(temp_path: str, log_path: str, append: bool, force: bool = False) -> None:
+    """
+    Appended lines are uploaded as new chunks, instead of uploading the whole file every time,
+    a whole file replaces the chunks.
+
+    The pending lines are only shipped once enough of them are pending,
+    `force` ships them right away, e.g. on the done signal of the run which has no lines.
+    """
+    store = stores.get_logs_store()
+    appended_path = get_appended_path(temp_path)
+    if append:
+        # The appended lines are buffered by the writer
+        get_log_writer().flush(appended_path)
+        if not os.path.exists(appended_path):
+            # Nothing was written yet
+            return
+        ship_log_chunks(store=store,
+                        temp_path=appended_path,
+                        log_path=log_path,
+                        chunk_size=conf.get('LOGS_CHUNK_SIZE'),
+                        chunk_interval=conf.get('LOGS_CHUNK_INTERVAL'),
+                        force=force)
+        return
+
+    if not os.path.exists(temp_path):
+        # Nothing was written yet
+        return
+    store.upload_file(filename=temp_path, path=log_path, use_basename=False)
+    discard_log_chunks(store=store, temp_path=appended_path, log_path=log_path)
+    if os.path.exists(appended_path):
+        os.remove(appended_path)
+
+
+def _stream_log(log_path: str, log_lines: Iterable[str]) -> None:
+    """
+    Writes the lines as they are read, the log file is only replaced once all lines are written,
+    and is kept if there are no lines or reading the lines fails.
+    """
+    tmp_log_path = '{}.tmp'.format(log_path)
+    has_lines = False
+    try:
+        with open(tmp_log_path, 'w') as log_file:
+            for log_line in log_lines:
+                log_file.write(log_line + '\n')
+                has_lines = True
+    except Exception:
+        if os.path.exists(tmp_log_path):
+            os.remove(tmp_log_path)
+        raise
+    if has_lines:
+        os.replace(tmp_log_path, log_path)
+    else:
+        os.remove(tmp_log_path)
+
+
 def safe_log_job(job_name: str,
                  log_lines: Optional[Union[str, Iterable[str]]],
                  temp: bool,
                  append: bool = False) -> None:
     def _safe_log_job(_temp=temp):
         log_path = stores.get_job_logs_path(job_name=job_name, temp=_temp)
+        if append:
+            _append_log(
+                log_path=log_path,
+                log_lines=log_lines,
+                create_path=lambda: stores.create_job_logs_path(job_name=job_name, temp=_temp))
+            return log_path
         try:
             stores.create_job_logs_path(job_name=job_name, temp=_temp)
             _lock_log(log_path, log_lines, append=append)
@@ -30,14 +125,17 @@ def safe_log_job(job_name: str,
             # Retry
             stores.create_job_logs_path(job_name=job_name, temp=_temp)
             _lock_log(log_path, log_lines, append=append)
+        return log_path
 
     # We are storing a temp file or a mounted path
     if temp or not stores.is_bucket_logs_persistence():
         _safe_log_job()
     else:
         # We are storing a file to bucket; Store the file as temp and then upload it
-        _safe_log_job(True)
-        stores.upload_job_logs(job_name=job_name)  # Add to stores
+        _upload_log(temp_path=_safe_log_job(True),
+                    log_path=stores.get_job_logs_path(job_name=job_name, temp=False),
+                    append=append,
+                    force=not log_lines)
 
 
 def safe_log_experiment(experiment_name: str,
@@ -48,6 +146,13 @@ def safe_log_experiment(experiment_name: str,
         log_path = stores.get_experiment_logs_path(
             experiment_name=experiment_name,
             temp=_temp)
+        if append:
+            _append_log(
+                log_path=log_path,
+                log_lines=log_lines,
+                create_path=lambda: stores.create_experiment_logs_path(
+                    experiment_name=experiment_name, temp=_temp))
+            return log_path
         try:
             stores.create_experiment_logs_path(experiment_name=experiment_name, temp=_temp)
             _lock_log(log_path, log_lines, append=append)
@@ -55,6 +160,7 @@ def safe_log_experiment(experiment_name: str,
             # Retry
             stores.create_experiment_logs_path(experiment_name=experiment_name, temp=_temp)
             _lock_log(log_path, log_lines, append=append)
+        return log_path
 
     # Check if we are appending and the store is local
     if append and not stores.is_bucket_logs_persistence():
@@ -64,8 +170,11 @@ def safe_log_experiment(experiment_name: str,
         _safe_log_experiment()
     else:
         # We are storing a file to bucket; Store the file as temp and then upload it
-        _safe_log_experiment(True)
-        stores.upload_experiment_logs(experiment_name=experiment_name)
+        _upload_log(temp_path=_safe_log_experiment(True),
+                    log_path=stores.get_experiment_logs_path(experiment_name=experiment_name,
+                                                             temp=False),
+                    append=append,
+                    force=not log_lines)
 
 
 def safe_log_experiment_job(experiment_job_name: str,
@@ -75,6 +184,13 @@ def safe_log_experiment_job(experiment_job_name: str,
     def _safe_log_experiment_job(_temp=temp):
         log_path = stores.get_experiment_job_logs_path(experiment_job_name=experiment_job_name,
                                                        temp=_temp)
+        if append:
+            _append_log(
+                log_path=log_path,
+                log_lines=log_lines,
+                create_path=lambda: stores.create_experiment_job_logs_path(
+                    experiment_job_name=experiment_job_name, temp=_temp))
+            return log_path
         try:
             stores.create_experiment_job_logs_path(experiment_job_name=experiment_job_name,
                                                    temp=_temp)
@@ -84,11 +200,75 @@ def safe_log_experiment_job(experiment_job_name: str,
             stores.create_experiment_job_logs_path(experiment_job_name=experiment_job_name,
                                                    temp=_temp)
             _lock_log(log_path, log_lines, append=append)
+        return log_path
 
     # We are storing a temp file or a mounted path
     if temp or not stores.is_bucket_logs_persistence():
         _safe_log_experiment_job()
     else:
         # We are storing a file to bucket; Store the file as temp and then upload it
-        _safe_log_experiment_job(True)
-        stores.upload_experiment_job_logs(experiment_job_name=experiment_job_name)
+        _upload_log(temp_path=_safe_log_experiment_job(True),
+                    log_path=stores.get_experiment_job_logs_path(
+                        experiment_job_name=experiment_job_name, temp=False),
+                    append=append,
+                    force=not log_lines)
+
+
+def stream_log_experiment_job(experiment_job_name: str,
+                              log_lines: Iterable[str],
+                              temp: bool) -> None:
+    """Same as `safe_log_experiment_job`, but the lines are written as they are read."""
+    def _stream_log_experiment_job(_temp=temp):
+        stores.create_experiment_job_logs_path(experiment_job_name=experiment_job_name,
+                                               temp=_temp)
+        log_path = stores.get_experiment_job_logs_path(experiment_job_name=experiment_job_name,
+                                                       temp=_temp)
+        _stream_log(log_path=log_path, log_lines=log_lines)
+        return log_path
+
+    # We are storing a temp file or a mounted path
+    if temp or not stores.is_bucket_logs_persistence():
+        _stream_log_experiment_job()
+    else:
+        # We are storing a file to bucket; Store the file as temp and then upload it
+        _upload_log(temp_path=_stream_log_experiment_job(True),
+                    log_path=stores.get_experiment_job_logs_path(
+                        experiment_job_name=experiment_job_name, temp=False),
+                    append=False)
+
+
+def _compact_log(temp_path: str, log_path: str) -> None:
+    """Rewrites the logs of a finished run in compressed blocks, and removes the raw logs."""
+    if not stores.is_bucket_logs_persistence():
+        if os.path.exists(log_path):
+            compact_log_file(log_path)
+        return
+
+    # The collected logs are still in the temp file
+    if not os.path.exists(temp_path):
+        return
+    compact_log_file(temp_path)
+    store = stores.get_logs_store()
+    for get_path in [get_blocks_path, get_blocks_index_path]:
+        store.upload_file(filename=get_path(temp_path), path=get_path(log_path), use_basename=False)
+        os.remove(get_path(temp_path))
+    store.delete(log_path)
+
+
+def compact_job_logs(job_name: str) -> None:
+    _compact_log(temp_path=stores.get_job_logs_path(job_name=job_name, temp=True),
+                 log_path=stores.get_job_logs_path(job_name=job_name, temp=False))
+
+
+def compact_experiment_logs(experiment_name: str) -> None:
+    _compact_log(
+        temp_path=stores.get_experiment_logs_path(experiment_name=experiment_name, temp=True),
+        log_path=stores.get_experiment_logs_path(experiment_name=experiment_name, temp=False))
+
+
+def compact_experiment_job_logs(experiment_job_name: str) -> None:
+    _compact_log(
+        temp_path=stores.get_experiment_job_logs_path(experiment_job_name=experiment_job_name,
+                                                      temp=True),
+        log_path=stores.get_experiment_job_logs_path(experiment_job_name=experiment_job_name,
+                                                     temp=False))
@@ -0,0 +1,134 @@
+import atexit
+import fcntl
+import os
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+import conf
+
+from logs_handlers.tasks.logger import logger
+
+
+class LogWriter(object):
+    """
+    Appends log lines to the runs' log files.
+
+    The files of the most recent runs are kept open in an LRU, and the lines are buffered
+    per file and written with a single locked `write` when the buffer is full
+    or every `flush_interval` seconds, a zero interval writes the lines right away.
+    """
+
+    def __init__(self, max_files: int, flush_interval: float, buffer_size: int) -> None:
+        self.max_files = max_files
+        self.flush_interval = flush_interval
+        self.buffer_size = buffer_size
+        self._files = OrderedDict()  # Maps log paths to open files, least recently used first
+        self._buffers = {}  # type: Dict[str, List[str]]
+        self._buffer_sizes = {}  # type: Dict[str, int]
+        self._creators = {}  # type: Dict[str, Optional[Callable]]
+        self._lock = threading.RLock()
+        self._flusher = None
+        self._pid = None
+
+    def _start_flusher(self) -> None:
+        # The flusher thread does not survive a fork, e.g. of the celery worker
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._files = OrderedDict()
+        self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+        self._flusher.start()
+
+    def _flush_periodically(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError as e:
+                logger.warning('Could not flush the logs: %s', e)
+
+    def _open(self, log_path: str, create_path: Optional[Callable] = None):
+        log_file = self._files.pop(log_path, None)
+        if log_file is not None and os.fstat(log_file.fileno()).st_nlink == 0:
+            # The file was deleted, e.g. the run was cleaned
+            log_file.close()
+            log_file = None
+        if log_file is None:
+            if create_path:
+                create_path()
+            log_file = open(log_path, 'ab')
+            while len(self._files) >= self.max_files:
+                _, evicted_file = self._files.popitem(last=False)
+                evicted_file.close()
+        self._files[log_path] = log_file
+        return log_file
+
+    def _flush_path(self, log_path: str) -> None:
+        log_lines = self._buffers.pop(log_path, None)
+        self._buffer_sizes.pop(log_path, None)
+        create_path = self._creators.pop(log_path, None)
+        if not log_lines:
+            return
+        data = ''.join(log_lines).encode('utf-8')
+        try:
+            log_file = self._open(log_path, create_path=create_path)
+        except OSError:
+            # Retry
+            if create_path:
+                create_path()
+            log_file = self._open(log_path)
+        fcntl.flock(log_file, fcntl.LOCK_EX)
+        while os.fstat(log_file.fileno()).st_nlink == 0:
+            # The file was compacted and removed while waiting for the lock
+            fcntl.flock(log_file, fcntl.LOCK_UN)
+            log_file = self._open(log_path, create_path=create_path)
+            fcntl.flock(log_file, fcntl.LOCK_EX)
+        try:
+            log_file.write(data)
+            log_file.flush()
+        finally:
+            fcntl.flock(log_file, fcntl.LOCK_UN)
+
+    def write(self, log_path: str, log_lines: str, create_path: Optional[Callable] = None) -> None:
+        """Buffers the log lines, `create_path` is called before opening the file."""
+        if not log_lines:
+            return
+        log_lines = log_lines + '\n'
+        with self._lock:
+            self._buffers.setdefault(log_path, []).append(log_lines)
+            self._buffer_sizes[log_path] = self._buffer_sizes.get(log_path, 0) + len(log_lines)
+            self._creators[log_path] = create_path
+            if self.flush_interval <= 0 or self._buffer_sizes[log_path] >= self.buffer_size:
+                self._flush_path(log_path)
+            else:
+                self._start_flusher()
+
+    def flush(self, log_path: Optional[str] = None) -> None:
+        with self._lock:
+            log_paths = [log_path] if log_path else list(self._buffers.keys())
+            for path in log_paths:
+                self._flush_path(path)
+
+    def close(self) -> None:
+        with self._lock:
+            self.flush()
+            while self._files:
+                _, log_file = self._files.popitem()
+                log_file.close()
+
+
+_log_writer = None
+
+
+def get_log_writer() -> LogWriter:
+    global _log_writer
+
+    if _log_writer is None:
+        _log_writer = LogWriter(max_files=conf.get('LOGS_WRITER_MAX_FILES'),
+                                flush_interval=conf.get('LOGS_WRITER_FLUSH_INTERVAL'),
+                                buffer_size=conf.get('LOGS_WRITER_BUFFER_SIZE'))
+        atexit.register(_log_writer.close)
+    return _log_writer
@@ -0,0 +1,38 @@
+import time
+
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+
+class EventsAggregator(object):
+    """
+    Aggregates the repeated events of an object with the same reason over `window` seconds.
+
+    The first occurrence is reported, the repeated ones within the window are only counted,
+    and their count is reported with the next occurrence after the window.
+    The occurrences are counted for the `max_keys` most recently seen keys.
+    """
+
+    def __init__(self, window: float, max_keys: int) -> None:
+        self.window = window
+        self.max_keys = max_keys
+        self._keys = OrderedDict()  # Maps the keys to their last report time and repeated count
+
+    def add(self, key: Hashable, timestamp: Optional[float] = None) -> Optional[int]:
+        """
+        Returns the number of occurrences to report with the event,
+        or None if the event is repeated within the window.
+        """
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        entry = self._keys.get(key)
+        if entry:
+            self._keys.move_to_end(key)
+            reported_at, repeated = entry
+            if timestamp - reported_at < self.window:
+                self._keys[key] = (reported_at, repeated + 1)
+                return None
+
+        self._keys[key] = (timestamp, 0)
+        while len(self._keys) > self.max_keys:
+            self._keys.popitem(last=False)
+        return entry[1] + 1 if entry else 1
@@ -11,6 +11,7 @@ import conf
 from db.models.clusters import Cluster
 from libs.base_monitor import BaseMonitorCommand
 from monitor_namespace import monitor
+from monitor_namespace.aggregator import EventsAggregator
 from polyaxon_k8s.manager import K8SManager
 
 
@@ -41,9 +42,13 @@ class Command(BaseMonitorCommand):
             # End process
             return
 
+        # Kept across the watches, the watch is resumed from the last resource version seen
+        event_watch = monitor.get_event_watch(k8s_manager)
+        aggregator = EventsAggregator(window=conf.get('K8S_EVENTS_AGGREGATION_WINDOW'),
+                                      max_keys=conf.get('K8S_EVENTS_AGGREGATION_MAX_KEYS'))
         while True:
             try:
-                monitor.run(k8s_manager, cluster)
+                monitor.run(k8s_manager, cluster, event_watch=event_watch, aggregator=aggregator)
             except (ApiException, ValueError) as e:
                 monitor.logger.warning(
                     "Exception when calling CoreV1Api->list_event_for_all_namespaces: %s\n", e)
@@ -1,7 +1,11 @@
 import logging
 
-from kubernetes import watch
+from typing import Any, Optional, Tuple
 
+import conf
+
+from libs.k8s_watch import ResumableWatch
+from monitor_namespace.aggregator import EventsAggregator
 from polyaxon.celery_api import celery_app
 from polyaxon.settings import K8SEventsCeleryTasks
 
@@ -12,16 +16,68 @@ LEVEL_MAPPING = {
 }
 
 
-def run(k8s_manager: 'K8SManager', cluster: 'Cluster') -> None:  # pylint:disable=too-many-branches
-    w = watch.Watch()
-
-    for event in w.stream(k8s_manager.k8s_api.list_namespaced_event,
-                          namespace=k8s_manager.namespace):
+def get_event_watch(k8s_manager: 'K8SManager') -> ResumableWatch:
+    params = {}
+    if conf.get('K8S_EVENTS_FIELD_SELECTOR'):
+        params['field_selector'] = conf.get('K8S_EVENTS_FIELD_SELECTOR')
+    return ResumableWatch(name='namespace',
+                          list_func=k8s_manager.k8s_api.list_namespaced_event,
+                          page_size=conf.get('K8S_WATCH_PAGE_SIZE'),
+                          namespace=k8s_manager.namespace,
+                          **params)
+
+
+def is_polyaxon_object(involved_object: Any) -> bool:
+    prefixes = conf.get('K8S_EVENTS_OBJECT_PREFIXES')
+    if not prefixes:
+        return True
+    return bool(involved_object and
+                involved_object.name and
+                involved_object.name.startswith(tuple(prefixes)))
+
+
+def get_event_key(event: Any) -> Tuple:
+    """The repeated events are aggregated by involved object and reason."""
+    involved_object = event.involved_object
+    if not involved_object:
+        return None, None, event.reason
+    return involved_object.kind, involved_object.name, event.reason
+
+
+def run(k8s_manager: 'K8SManager',  # pylint:disable=too-many-branches
+        cluster: 'Cluster',
+        event_watch: Optional[ResumableWatch] = None,
+        aggregator: Optional[EventsAggregator] = None) -> None:
+    """
+    Reports the warning and error events of the Polyaxon objects.
+
+    With an `aggregator` the repeated events of an object with the same reason
+    are reported once per window, with their count.
+    """
+    event_watch = event_watch or get_event_watch(k8s_manager)
+    for event in event_watch.stream():
         logger.debug("event: %s", event)
 
         event_type = event['type'].lower()
         event = event['object']
 
+        level = (event.type and event.type.lower())
+        level = LEVEL_MAPPING.get(level, level)
+
+        # Checked before converting the event, most events are dropped
+        if level not in ('warning', 'error') and event_type not in ('error',):
+            continue
+
+        if not is_polyaxon_object(event.involved_object):
+            continue
+
+        count = 1
+        if aggregator:
+            count = aggregator.add(get_event_key(event))
+            if count is None:
+                logger.debug("Dropping repeated event: %s", event.reason)
+                continue
+
         meta = {
             k: v for k, v
             in event.metadata.to_dict().items()
@@ -30,9 +86,6 @@ def run(k8s_manager: 'K8SManager', cluster: 'Cluster') -> None:  # pylint:disabl
 
         creation_timestamp = meta.pop('creation_timestamp', None)
 
-        level = (event.type and event.type.lower())
-        level = LEVEL_MAPPING.get(level, level)
-
         component = source_host = reason = short_name = kind = None
         if event.source:
             source = event.source.to_dict()
@@ -63,41 +116,41 @@ def run(k8s_manager: 'K8SManager', cluster: 'Cluster') -> None:  # pylint:disabl
         else:
             obj_name = "({})".format(k8s_manager.namespace)
 
-        if level in ('warning', 'error') or event_type in ('error',):
-            if event.involved_object:
-                meta['involved_object'] = {
-                    k: v for k, v
-                    in event.involved_object.to_dict().items()
-                    if v is not None
-                }
-
-            data = {
-                'server_name': source_host or 'n/a',
-                'obj_name': obj_name,
-                'message': message
+        if event.involved_object:
+            meta['involved_object'] = {
+                k: v for k, v
+                in event.involved_object.to_dict().items()
+                if v is not None
             }
 
-            if component:
-                data['component'] = component
-
-            if short_name:
-                data['name'] = short_name
-
-            if kind:
-                data['kind'] = kind
-
-            if reason:
-                data['reason '] = reason
+        data = {
+            'server_name': source_host or 'n/a',
+            'obj_name': obj_name,
+            'message': message,
+            'count': count,
+        }
 
-            payload = dict(
-                data=data,
-                meta=meta,
-                level=level,
-            )
-            if creation_timestamp:
-                payload['created_at'] = creation_timestamp
+        if component:
+            data['component'] = component
 
-            logger.debug("Publishing event: %s", data)
-            celery_app.send_task(
-                K8SEventsCeleryTasks.K8S_EVENTS_HANDLE_NAMESPACE,
-                kwargs={'cluster_id': cluster.id, 'payload': payload})
+        if short_name:
+            data['name'] = short_name
+
+        if kind:
+            data['kind'] = kind
+
+        if reason:
+            data['reason '] = reason
+
+        payload = dict(
+            data=data,
+            meta=meta,
+            level=level,
+        )
+        if creation_timestamp:
+            payload['created_at'] = creation_timestamp
+
+        logger.debug("Publishing event: %s", data)
+        celery_app.send_task(
+            K8SEventsCeleryTasks.K8S_EVENTS_HANDLE_NAMESPACE,
+            kwargs={'cluster_id': cluster.id, 'payload': payload})
@@ -0,0 +1,183 @@
+import logging
+import os
+import time
+
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger('polyaxon.monitors.resources')
+
+CGROUP_ROOT = '/sys/fs/cgroup'
+
+# cgroup v1 controllers, the cpu accounting is mounted under one of these names
+CPUACCT_CONTROLLERS = ('cpuacct', 'cpu,cpuacct', 'cpuacct,cpu')
+MEMORY_CONTROLLER = 'memory'
+
+# memory.max in cgroup v2 when the container has no limit
+MEMORY_MAX = 'max'
+# memory.limit_in_bytes in cgroup v1 when the container has no limit is the max counter
+# rounded down to the page size, this is its lowest value with pages of up to 64k
+MEMORY_MAX_V1 = 2 ** 63 - 2 ** 16
+
+
+def read_value(path: str) -> str:
+    with open(path, 'r') as f:
+        return f.read().strip()
+
+
+def read_int(path: str) -> int:
+    return int(read_value(path))
+
+
+def read_stat(path: str) -> Dict[str, int]:
+    stat = {}
+    for line in read_value(path).splitlines():
+        key, value = line.split()
+        stat[key] = int(value)
+    return stat
+
+
+def get_host_memory() -> Optional[int]:
+    """Returns the physical memory of the host in bytes, or None if it can't be read."""
+    try:
+        return os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def find_container_dir(controller_root: str, container_id: str) -> Optional[str]:
+    """
+    Finds the cgroup of a container under a controller's hierarchy.
+
+    Depending on the cgroup driver and the runtime the cgroup is named after the container id,
+    e.g. `docker/<id>`, `kubepods/burstable/pod<uid>/<id>`,
+    or `system.slice/docker-<id>.scope`.
+    """
+    if not os.path.isdir(controller_root):
+        return None
+    for dirpath, dirnames, _ in os.walk(controller_root):
+        for dirname in dirnames:
+            if container_id in dirname:
+                return os.path.join(dirpath, dirname)
+    return None
+
+
+class CgroupSampler(object):
+    """
+    Samples the cpu and memory counters of the containers from the cgroup filesystem,
+    supports both the cgroup v1 and the unified cgroup v2 hierarchies.
+
+    The cpu usage is a cumulative counter, the percentage is computed
+    against the previous sample of the container kept in memory,
+    the first sample of a container returns None.
+
+    A memory limit at or above the host's memory is not enforced, it is reported as unset.
+    """
+
+    def __init__(self, root: str = CGROUP_ROOT, host_memory: Optional[int] = None) -> None:
+        self.root = root
+        self.host_memory = host_memory or get_host_memory() or MEMORY_MAX_V1
+        self.is_v2 = os.path.exists(os.path.join(root, 'cgroup.controllers'))
+        self._paths = {}  # type: Dict[str, Tuple[str, str]]
+        self._samples = {}  # type: Dict[str, Tuple[float, int, List[int]]]
+
+    def _find_paths(self, container_id: str) -> Optional[Tuple[str, str]]:
+        if self.is_v2:
+            path = find_container_dir(self.root, container_id)
+            return (path, path) if path else None
+
+        cpu_path = None
+        for controller in CPUACCT_CONTROLLERS:
+            cpu_path = find_container_dir(os.path.join(self.root, controller), container_id)
+            if cpu_path:
+                break
+        memory_path = find_container_dir(os.path.join(self.root, MEMORY_CONTROLLER),
+                                         container_id)
+        if cpu_path and memory_path:
+            return cpu_path, memory_path
+        return None
+
+    def get_paths(self, container_id: str) -> Optional[Tuple[str, str]]:
+        """Returns the cpu and the memory cgroups of the container, the lookup is cached."""
+        paths = self._paths.get(container_id)
+        if paths is None:
+            paths = self._find_paths(container_id)
+            if paths:
+                self._paths[container_id] = paths
+        return paths
+
+    def remove(self, container_id: str) -> None:
+        self._paths.pop(container_id, None)
+        self._samples.pop(container_id, None)
+
+    def prune(self, container_ids: List[str]) -> None:
+        """Drops the state of the containers not monitored anymore."""
+        container_ids = set(container_ids)
+        for container_id in set(self._paths) - container_ids:
+            self._paths.pop(container_id, None)
+        for container_id in set(self._samples) - container_ids:
+            self._samples.pop(container_id, None)
+
+    def read_cpu(self, cpu_path: str) -> Tuple[int, List[int]]:
+        """Returns the cpu usage in nanoseconds, in total and per cpu (v1 only)."""
+        if self.is_v2:
+            usage_usec = read_stat(os.path.join(cpu_path, 'cpu.stat'))['usage_usec']
+            return usage_usec * 1000, []
+
+        total_usage = read_int(os.path.join(cpu_path, 'cpuacct.usage'))
+        percpu_usage = [int(usage) for usage in
+                        read_value(os.path.join(cpu_path, 'cpuacct.usage_percpu')).split()]
+        return total_usage, percpu_usage
+
+    def read_memory(self, memory_path: str) -> Tuple[int, Optional[int]]:
+        """Returns the memory used and the memory limit in bytes, the limit is None if unset."""
+        if self.is_v2:
+            memory_used = read_int(os.path.join(memory_path, 'memory.current'))
+            memory_limit = read_value(os.path.join(memory_path, 'memory.max'))
+            return memory_used, None if memory_limit == MEMORY_MAX else int(memory_limit)
+
+        memory_used = read_int(os.path.join(memory_path, 'memory.usage_in_bytes'))
+        memory_limit = read_int(os.path.join(memory_path, 'memory.limit_in_bytes'))
+        if memory_limit >= min(self.host_memory, MEMORY_MAX_V1):
+            return memory_used, None
+        return memory_used, memory_limit
+
+    def sample(self, container_id: str) -> Optional[Dict]:
+        """
+        Returns the cpu percentages and the memory of the container since its previous sample,
+        or None if the container's cgroup is missing or this is its first sample.
+        """
+        paths = self.get_paths(container_id)
+        if not paths:
+            return None
+        cpu_path, memory_path = paths
+        try:
+            timestamp = time.monotonic()
+            total_usage, percpu_usage = self.read_cpu(cpu_path)
+            memory_used, memory_limit = self.read_memory(memory_path)
+        except (OSError, ValueError, KeyError) as e:
+            # The container is gone or the cgroup was moved
+            logger.debug("Could not read the cgroup of container `%s`: %s", container_id, e)
+            self.remove(container_id)
+            return None
+
+        previous = self._samples.get(container_id)
+        self._samples[container_id] = (timestamp, total_usage, percpu_usage)
+        if previous is None:
+            return None
+
+        pre_timestamp, pre_total_usage, pre_percpu_usage = previous
+        # The usage is in nanoseconds, 100% is a fully used cpu
+        delta_time = (timestamp - pre_timestamp) * 1e9
+        if delta_time <= 0:
+            return None
+        cpu_percentage = max(total_usage - pre_total_usage, 0) / delta_time * 100.0
+        percpu_percentage = []
+        if len(percpu_usage) == len(pre_percpu_usage):
+            percpu_percentage = [max(usage - pre_usage, 0) / delta_time * 100.0
+                                 for usage, pre_usage in zip(percpu_usage, pre_percpu_usage)]
+        return {
+            'cpu_percentage': cpu_percentage,
+            'percpu_percentage': percpu_percentage,
+            'memory_used': memory_used,
+            'memory_limit': memory_limit,
+        }
@@ -0,0 +1,164 @@
+import logging
+import os
+import re
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import psutil
+
+try:
+    import pynvml as N
+except ImportError:
+    N = None
+
+logger = logging.getLogger('polyaxon.monitors.resources')
+
+
+def get_container_gpu_indices(container: Any) -> List[int]:
+    gpus = []
+    devices = container.attrs['HostConfig']['Devices']
+    for dev in devices:
+        match = re.match(r'/dev/nvidia(?P<index>[0-9]+)', dev['PathOnHost'])
+        if match:
+            gpus.append(int(match.group('index')))
+    return gpus
+
+
+def _decode(value: Any) -> Any:
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+def _get_or_none(func: Any, *args) -> Any:
+    """Returns None for the metrics not supported by the gpu."""
+    try:
+        return func(*args)
+    except N.NVMLError:
+        return None
+
+
+class GPUCollector(object):
+    """
+    Collects the node's gpus metrics through a NVML session kept open between the sweeps.
+
+    The gpus' static information and the gpus of the containers are only read once,
+    the NVML session is restarted when the number of gpus changes,
+    and on the next sweep after an error.
+    Returns the same metrics as `polyaxon_gpustat.query`.
+    """
+
+    def __init__(self) -> None:
+        self._handles = None  # type: Optional[List[Any]]
+        self._gpus_info = {}  # type: Dict[int, Dict]
+        self._container_gpu_indices = {}  # type: Dict[str, List[int]]
+        # The (serial, name, memory) of the node's gpus as stored in the db
+        self.node_gpus = None  # type: Optional[Dict[int, Tuple]]
+        self.is_available = N is not None
+
+    def setup(self) -> bool:
+        if self._handles is not None:
+            return True
+        if not self.is_available:
+            return False
+        try:
+            N.nvmlInit()
+        except N.NVMLError as e:
+            # No driver or no gpu on the node, it's not checked again
+            logger.info("NVML is not available, gpus will not be collected: %s", e)
+            self.is_available = False
+            return False
+        self._handles = [N.nvmlDeviceGetHandleByIndex(index)
+                         for index in range(N.nvmlDeviceGetCount())]
+        return True
+
+    def shutdown(self) -> None:
+        self._handles = None
+        self._gpus_info = {}
+        try:
+            N.nvmlShutdown()
+        except N.NVMLError:
+            pass
+
+    def _get_gpu_info(self, index: int, handle: Any) -> Dict:
+        gpu_info = self._gpus_info.get(index)
+        if gpu_info is None:
+            minor = _get_or_none(N.nvmlDeviceGetMinorNumber, handle)
+            pci_info = _get_or_none(N.nvmlDeviceGetPciInfo, handle)
+            gpu_info = {
+                'index': index,
+                'uuid': _decode(N.nvmlDeviceGetUUID(handle)),
+                'name': _decode(N.nvmlDeviceGetName(handle)),
+                'minor': int(minor) if minor is not None else None,
+                'bus_id': _decode(pci_info.busId) if pci_info else None,
+                'serial': _decode(_get_or_none(N.nvmlDeviceGetSerial, handle)),
+            }
+            self._gpus_info[index] = gpu_info
+        return gpu_info
+
+    @staticmethod
+    def _get_processes(handle: Any) -> Optional[List[Dict]]:
+        compute_processes = _get_or_none(N.nvmlDeviceGetComputeRunningProcesses, handle)
+        graphics_processes = _get_or_none(N.nvmlDeviceGetGraphicsRunningProcesses, handle)
+        if compute_processes is None and graphics_processes is None:
+            return None
+
+        processes = []
+        for nv_process in (compute_processes or []) + (graphics_processes or []):
+            try:
+                ps_process = psutil.Process(pid=nv_process.pid)
+                cmdline = ps_process.cmdline()
+                processes.append({
+                    'username': ps_process.username(),
+                    'command': os.path.basename(cmdline[0]) if cmdline else '?',
+                    'gpu_memory_usage': int(nv_process.usedGpuMemory / 1024 / 1024),
+                    'pid': nv_process.pid,
+                })
+            except psutil.NoSuchProcess:
+                pass
+        return processes
+
+    def _get_gpu_resources(self, index: int, handle: Any) -> Dict:
+        temperature = _get_or_none(N.nvmlDeviceGetTemperature, handle, N.NVML_TEMPERATURE_GPU)
+        memory = _get_or_none(N.nvmlDeviceGetMemoryInfo, handle)
+        utilization = _get_or_none(N.nvmlDeviceGetUtilizationRates, handle)
+        power = _get_or_none(N.nvmlDeviceGetPowerUsage, handle)
+        power_limit = _get_or_none(N.nvmlDeviceGetEnforcedPowerLimit, handle)
+        return dict(
+            self._get_gpu_info(index, handle),
+            temperature_gpu=temperature,
+            utilization_gpu=utilization.gpu if utilization else None,
+            power_draw=int(power / 1000) if power is not None else None,
+            power_limit=int(power_limit / 1000) if power_limit is not None else None,
+            memory_free=int(memory.free) if memory else None,
+            memory_used=int(memory.used) if memory else None,
+            memory_total=int(memory.total) if memory else None,
+            memory_utilization=utilization.memory if utilization else None,
+            processes=self._get_processes(handle))
+
+    def query(self) -> List[Dict]:
+        try:
+            if not self.setup():
+                return []
+            if N.nvmlDeviceGetCount() != len(self._handles):
+                # A gpu was added or lost, the handles are refreshed
+                self.shutdown()
+                self.setup()
+            return [self._get_gpu_resources(index, handle)
+                    for index, handle in enumerate(self._handles)]
+        except N.NVMLError as e:
+            logger.warning("Could not collect the gpus, NVML will be restarted: %s", e)
+            self.shutdown()
+            return []
+
+    def get_container_gpu_indices(self, container: Any) -> List[int]:
+        """The gpus of a container are fixed once it's created, they are parsed once per id."""
+        gpu_indices = self._container_gpu_indices.get(container.id)
+        if gpu_indices is None:
+            gpu_indices = get_container_gpu_indices(container)
+            self._container_gpu_indices[container.id] = gpu_indices
+        return gpu_indices
+
+    def prune(self, container_ids: List[str]) -> None:
+        """Drops the gpus of the containers not monitored anymore."""
+        container_ids = set(container_ids)
+        for container_id in set(self._container_gpu_indices) - container_ids:
+            self._container_gpu_indices.pop(container_id, None)
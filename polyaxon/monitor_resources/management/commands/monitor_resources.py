@@ -1,5 +1,7 @@
 import time
 
+from concurrent.futures import ThreadPoolExecutor
+
 import redis
 
 from hestia.bool_utils import to_bool
@@ -12,11 +14,30 @@ from db.models.clusters import Cluster
 from db.models.nodes import ClusterNode
 from libs.base_monitor import BaseMonitorCommand
 from monitor_resources import monitor
+from monitor_resources.cgroups import CGROUP_ROOT, CgroupSampler
+from monitor_resources.gpus import GPUCollector
+from monitor_resources.rollups import ResourcesRollup
 
 
 class Command(BaseMonitorCommand):
     help = 'Watch jobs/containers resources.'
 
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        # Docker's client keeps a pool of 10 connections
+        parser.add_argument('--workers',
+                            type=int,
+                            default=10,
+                            help='Number of containers sampled concurrently.')
+        parser.add_argument('--sampler',
+                            choices=['docker', 'cgroups'],
+                            default='docker',
+                            help='Sample the containers with the Docker stats API, '
+                                 'or from the cgroup filesystem with Docker as a fallback.')
+        parser.add_argument('--cgroup_root',
+                            default=CGROUP_ROOT,
+                            help='Mount point of the host cgroup filesystem.')
+
     @staticmethod
     def get_node():
         cluster = Cluster.load()
@@ -40,16 +61,29 @@ class Command(BaseMonitorCommand):
     def handle(self, *args, **options):
         log_sleep_interval = options['log_sleep_interval']
         persist = to_bool(options['persist'])
+        executor = ThreadPoolExecutor(max_workers=options['workers'])
+        sampler = None
+        if options['sampler'] == 'cgroups':
+            sampler = CgroupSampler(root=options['cgroup_root'])
+        rollup = ResourcesRollup(conf.get('RESOURCES_SERIES_RESOLUTIONS'))
+        gpu_collector = GPUCollector()
         node = self.get_node_or_wait(log_sleep_interval)
         self.stdout.write(
             "Started a new resources monitor with, "
-            "log sleep interval: `{}` and persist: `{}`".format(log_sleep_interval, persist),
+            "log sleep interval: `{}`, persist: `{}`, workers: `{}` and sampler: `{}`".format(
+                log_sleep_interval, persist, options['workers'], options['sampler']),
             ending='\n')
         containers = {}
         while True:
             try:
                 if node:
-                    monitor.run(containers, node, persist)
+                    monitor.run(containers,
+                                node,
+                                persist,
+                                executor=executor,
+                                sampler=sampler,
+                                rollup=rollup,
+                                gpu_collector=gpu_collector)
             except redis.exceptions.ConnectionError as e:
                 monitor.logger.warning("Redis connection is probably already closed %s\n", e)
             except Exception as e:
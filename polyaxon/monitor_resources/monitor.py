@@ -1,21 +1,27 @@
 import json
 import logging
-import re
 import requests
+import time
 
-from typing import Any, Dict, List, Mapping, Optional
+from concurrent.futures import Executor
+from typing import Any, Dict, Mapping, Optional, Tuple
 
 import docker
 
 from docker.errors import DockerException, NotFound
 
-import conf
+from django.utils import timezone
+
 import polyaxon_gpustat
 
 from constants.containers import ContainerStatuses
 from db.models.nodes import ClusterNode, NodeGPU
 from db.redis.containers import RedisJobContainers
+from db.redis.resources import RedisResourcesSeries
 from db.redis.to_stream import RedisToStream
+from monitor_resources.cgroups import CgroupSampler
+from monitor_resources.gpus import GPUCollector, get_container_gpu_indices
+from monitor_resources.rollups import ResourcesRollup
 from schemas.containers import ContainerResourcesConfig
 
 logger = logging.getLogger('polyaxon.monitors.resources')
@@ -26,23 +32,15 @@ except DockerException:
     docker_client = None
 
 
-def get_gpu_resources() -> Any:
+def get_gpu_resources(gpu_collector: Optional[GPUCollector] = None) -> Any:
     try:
+        if gpu_collector:
+            return gpu_collector.query()
         return polyaxon_gpustat.query()
     except:  # noqa
         return []
 
 
-def get_container_gpu_indices(container: Any) -> List[int]:
-    gpus = []
-    devices = container.attrs['HostConfig']['Devices']
-    for dev in devices:
-        match = re.match(r'/dev/nvidia(?P<index>[0-9]+)', dev['PathOnHost'])
-        if match:
-            gpus.append(int(match.group('index')))
-    return gpus
-
-
 def get_container(containers: Dict, container_id: str) -> Any:
     if not docker_client:
         return None
@@ -62,36 +60,26 @@ def get_container(containers: Dict, container_id: str) -> Any:
     return container
 
 
-def get_container_resources(node: 'ClusterNode',
-                            container: Any,
-                            gpu_resources: Mapping) -> Optional['ContainerResourcesConfig']:
-    # Check if the container is running
-    if container.status != ContainerStatuses.RUNNING:
-        logger.debug("`%s` container is not running", container.name)
-        RedisJobContainers.remove_container(container.id)
-        return
-
-    job_uuid, experiment_uuid = RedisJobContainers.get_job(container.id)
-
-    if not job_uuid:
-        logger.debug("`%s` container is not recognised", container.name)
-        return
+def get_num_cpu_cores(node: 'ClusterNode', num_cpu_cores: int) -> float:
+    if num_cpu_cores >= node.cpu * 1.5:
+        logger.warning('Docker reporting num cpus `%s` and kubernetes reporting `%s`',
+                       num_cpu_cores, node.cpu)
+        return node.cpu
+    return num_cpu_cores
 
-    logger.debug(
-        "Streaming resources for container %s in (job, experiment) (`%s`, `%s`) ",
-        container.id, job_uuid, experiment_uuid)
 
+def get_docker_stats(node: 'ClusterNode', container: Any) -> Optional[Dict]:
     try:
         stats = container.stats(decode=True, stream=False)
     except json.decoder.JSONDecodeError:
         logger.info("Error streaming states for `%s`", container.name)
-        return
+        return None
     except NotFound:
         logger.debug("`%s` was not found", container.name)
         RedisJobContainers.remove_container(container.id)
-        return
+        return None
     except requests.ReadTimeout:
-        return
+        return None
 
     precpu_stats = stats['precpu_stats']
     cpu_stats = stats['cpu_stats']
@@ -105,23 +93,76 @@ def get_container_resources(node: 'ClusterNode',
     delta_system_cpu_usage = system_cpu_usage - pre_system_cpu_usage
 
     percpu_usage = cpu_stats['cpu_usage']['percpu_usage']
-    num_cpu_cores = len(percpu_usage)
-    if num_cpu_cores >= node.cpu * 1.5:
-        logger.warning('Docker reporting num cpus `%s` and kubernetes reporting `%s`',
-                       num_cpu_cores, node.cpu)
-        num_cpu_cores = node.cpu
+    num_cpu_cores = get_num_cpu_cores(node, len(percpu_usage))
     cpu_percentage = 0.
     percpu_percentage = [0.] * num_cpu_cores
     if delta_total_usage > 0 and delta_system_cpu_usage > 0:
         cpu_percentage = (delta_total_usage / delta_system_cpu_usage) * num_cpu_cores * 100.0
         percpu_percentage = [cpu_usage / total_usage * cpu_percentage for cpu_usage in percpu_usage]
 
-    memory_used = int(stats['memory_stats']['usage'])
-    memory_limit = int(stats['memory_stats']['limit'])
+    return {
+        'cpu_percentage': cpu_percentage,
+        'n_cpus': num_cpu_cores,
+        'percpu_percentage': percpu_percentage,
+        'memory_used': int(stats['memory_stats']['usage']),
+        'memory_limit': int(stats['memory_stats']['limit']),
+    }
+
+
+def get_cgroup_stats(node: 'ClusterNode', container: Any, sampler: CgroupSampler) -> Optional[Dict]:
+    stats = sampler.sample(container.id)
+    if not stats:
+        return None
+    percpu_percentage = stats['percpu_percentage']
+    # cgroup v2 does not account the usage per cpu
+    stats['n_cpus'] = (get_num_cpu_cores(node, len(percpu_percentage))
+                       if percpu_percentage else node.cpu)
+    if stats['memory_limit'] is None:
+        stats['memory_limit'] = node.memory
+    return stats
+
+
+def get_container_resources(node: 'ClusterNode',
+                            container: Any,
+                            gpu_resources: Mapping,
+                            job: Tuple[Optional[str], Optional[str]] = None,
+                            sampler: Optional[CgroupSampler] = None,
+                            gpu_collector: Optional[GPUCollector] = None
+                            ) -> Optional['ContainerResourcesConfig']:
+    """
+    Collects the resources of a container.
+
+    With a `sampler` the cpu and memory are read from the container's cgroup,
+    the Docker stats API is the fallback if the cgroup could not be sampled.
+    """
+    # Check if the container is running
+    if container.status != ContainerStatuses.RUNNING:
+        logger.debug("`%s` container is not running", container.name)
+        RedisJobContainers.remove_container(container.id)
+        if sampler:
+            sampler.remove(container.id)
+        return
+
+    job_uuid, experiment_uuid = job or RedisJobContainers.get_job(container.id)
+
+    if not job_uuid:
+        logger.debug("`%s` container is not recognised", container.name)
+        return
+
+    logger.debug(
+        "Streaming resources for container %s in (job, experiment) (`%s`, `%s`) ",
+        container.id, job_uuid, experiment_uuid)
+
+    stats = get_cgroup_stats(node, container, sampler) if sampler else None
+    if not stats:
+        stats = get_docker_stats(node, container)
+    if not stats:
+        return
 
     container_gpu_resources = None
     if gpu_resources:
-        gpu_indices = get_container_gpu_indices(container)
+        gpu_indices = (gpu_collector.get_container_gpu_indices(container) if gpu_collector
+                       else get_container_gpu_indices(container))
         container_gpu_resources = [gpu_resources[gpu_indice] for gpu_indice in gpu_indices]
 
     return ContainerResourcesConfig.from_dict({
@@ -129,47 +170,120 @@ def get_container_resources(node: 'ClusterNode',
         'job_name': job_uuid,  # it will be updated during the streaming
         'experiment_uuid': experiment_uuid,
         'container_id': container.id,
-        'cpu_percentage': cpu_percentage,
-        'n_cpus': num_cpu_cores,
-        'percpu_percentage': percpu_percentage,
-        'memory_used': memory_used,
-        'memory_limit': memory_limit,
+        'cpu_percentage': stats['cpu_percentage'],
+        'n_cpus': stats['n_cpus'],
+        'percpu_percentage': stats['percpu_percentage'],
+        'memory_used': stats['memory_used'],
+        'memory_limit': stats['memory_limit'],
         'gpu_resources': container_gpu_resources
     })
 
 
-def update_cluster_node(node_gpus: Dict) -> None:
+def update_cluster_node(node: 'ClusterNode',
+                        node_gpus: Dict,
+                        gpu_collector: Optional[GPUCollector] = None) -> None:
+    """
+    Creates or updates the node's gpus whose serial, name or memory changed.
+
+    The gpus stored are read once if a `gpu_collector` keeps them between the sweeps,
+    nothing is written as long as the gpus do not change.
+    """
     if not node_gpus:
         return
-    node = ClusterNode.objects.filter(name=conf.get('K8S_NODE_NAME')).first()
-    for node_gpu_index in node_gpus.keys():
-        node_gpu_value = node_gpus[node_gpu_index]
-        try:
-            node_gpu = NodeGPU.objects.get(cluster_node=node, index=node_gpu_index)
-        except NodeGPU.DoesNotExist:
-            node_gpu = NodeGPU(cluster_node=node, index=node_gpu_index)
-        node_gpu.serial = node_gpu_value['serial']
-        node_gpu.name = node_gpu_value['name']
-        node_gpu.memory = node_gpu_value['memory_total']
-        node_gpu.save()
-
-
-def run(containers: Dict, node: 'ClusterNode', persist: bool) -> None:
+    gpus = {index: (gpu['serial'], gpu['name'], gpu['memory_total'])
+            for index, gpu in node_gpus.items()}
+    stored_gpus = gpu_collector.node_gpus if gpu_collector else None
+    if stored_gpus is None:
+        stored_gpus = {
+            index: (serial, name, memory) for index, serial, name, memory in
+            NodeGPU.objects.filter(cluster_node=node).values_list(
+                'index', 'serial', 'name', 'memory')
+        }
+    changed_gpus = {index: gpu for index, gpu in gpus.items() if stored_gpus.get(index) != gpu}
+    if changed_gpus:
+        node_gpus_to_update = []
+        for node_gpu in NodeGPU.objects.filter(cluster_node=node, index__in=changed_gpus):
+            node_gpu.serial, node_gpu.name, node_gpu.memory = changed_gpus.pop(node_gpu.index)
+            node_gpu.updated_at = timezone.now()
+            node_gpus_to_update.append(node_gpu)
+        NodeGPU.objects.bulk_update(node_gpus_to_update, ['serial', 'name', 'memory', 'updated_at'])
+        # New gpus are saved one by one to trigger their creation's signal
+        for index, (serial, name, memory) in changed_gpus.items():
+            NodeGPU.objects.create(cluster_node=node,
+                                   index=index,
+                                   serial=serial,
+                                   name=name,
+                                   memory=memory)
+        stored_gpus.update(gpus)
+    if gpu_collector:
+        gpu_collector.node_gpus = stored_gpus
+
+
+def get_container_payload(containers: Dict,
+                          container_id: str,
+                          node: 'ClusterNode',
+                          gpu_resources: Mapping,
+                          job: Tuple[Optional[str], Optional[str]],
+                          sampler: Optional[CgroupSampler] = None,
+                          gpu_collector: Optional[GPUCollector] = None) -> Optional[Dict]:
+    container = get_container(containers, container_id)
+    if not container:
+        return None
+    try:
+        payload = get_container_resources(node,
+                                          containers[container_id],
+                                          gpu_resources,
+                                          job=job,
+                                          sampler=sampler,
+                                          gpu_collector=gpu_collector)
+    except KeyError:
+        payload = None
+    return payload.to_dict() if payload else None
+
+
+def run(containers: Dict,
+        node: 'ClusterNode',
+        persist: bool,
+        executor: Optional[Executor] = None,
+        sampler: Optional[CgroupSampler] = None,
+        rollup: Optional[ResourcesRollup] = None,
+        gpu_collector: Optional[GPUCollector] = None) -> None:
+    """
+    Collects the resources of the node's containers.
+
+    Docker blocks about a second to sample the stats of a container,
+    with an `executor` the containers are sampled concurrently.
+    With a cgroup `sampler` the stats are read from the cgroup filesystem instead.
+    With a `rollup` the resources are kept in the jobs' history once their buckets are over.
+    With a `gpu_collector` the NVML session and the gpus' mappings are kept between the sweeps.
+    """
+    timestamp = time.time()
     container_ids = RedisJobContainers.get_containers()
-    gpu_resources = get_gpu_resources()
+    if sampler:
+        sampler.prune(container_ids)
+    if gpu_collector:
+        gpu_collector.prune(container_ids)
+    gpu_resources = get_gpu_resources(gpu_collector)
     if gpu_resources:
         gpu_resources = {gpu_resource['index']: gpu_resource for gpu_resource in gpu_resources}
-    update_cluster_node(gpu_resources)
-    for container_id in container_ids:
-        container = get_container(containers, container_id)
-        if not container:
-            continue
-        try:
-            payload = get_container_resources(node, containers[container_id], gpu_resources)
-        except KeyError:
-            payload = None
+    update_cluster_node(node, gpu_resources, gpu_collector)
+    # The jobs and the monitored sets are read once for all the containers
+    jobs = RedisJobContainers.get_jobs(container_ids)
+    monitored_job_uuids, monitored_experiment_uuids = RedisToStream.get_monitored_resources()
+
+    def get_payload(container_id):
+        return get_container_payload(containers=containers,
+                                     container_id=container_id,
+                                     node=node,
+                                     gpu_resources=gpu_resources,
+                                     job=jobs[container_id],
+                                     sampler=sampler,
+                                     gpu_collector=gpu_collector)
+
+    latest_resources = {}
+    map_payloads = executor.map if executor else map
+    for payload in map_payloads(get_payload, container_ids):
         if payload:
-            payload = payload.to_dict()
             # todo: Re-enable publishing
             # logger.debug("Publishing resources event")
             # celery_app.send_task(
@@ -177,11 +291,14 @@ def run(containers: Dict, node: 'ClusterNode', persist: bool) -> None:
             #     kwargs={'payload': payload, 'persist': persist})
 
             job_uuid = payload['job_uuid']
+            if rollup:
+                rollup.add(job_uuid, payload, timestamp)
             # Check if we should stream the payload
-            # Check if we have this container already in place
-            experiment_uuid = RedisJobContainers.get_experiment_for_job(job_uuid)
             set_last_resources_cond = (
-                RedisToStream.is_monitored_job_resources(job_uuid) or
-                RedisToStream.is_monitored_experiment_resources(experiment_uuid))
+                job_uuid in monitored_job_uuids or
+                payload.get('experiment_uuid') in monitored_experiment_uuids)
             if set_last_resources_cond:
-                RedisToStream.set_latest_job_resources(job_uuid, payload)
+                latest_resources[job_uuid] = payload
+    RedisToStream.set_latest_jobs_resources(latest_resources)
+    if rollup:
+        RedisResourcesSeries.add_points(rollup.pop_points(timestamp))
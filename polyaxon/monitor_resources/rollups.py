@@ -0,0 +1,88 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+# Averaged over the bucket, with their peak value
+RESOURCES_FIELDS = ('cpu_percentage', 'memory_used')
+GPU_FIELDS = ('utilization_gpu', 'memory_used', 'memory_total', 'temperature_gpu', 'power_draw')
+
+
+class ResourcesBucket(object):
+    """Aggregates the resources of a job over a bucket of time, with running sums and peaks."""
+
+    def __init__(self, timestamp: int) -> None:
+        self.timestamp = timestamp
+        self.count = 0
+        self.sums = defaultdict(float)
+        self.maxs = {}
+        self.memory_limit = None
+        self.gpu_counts = defaultdict(int)
+        self.gpu_sums = defaultdict(lambda: defaultdict(float))
+
+    def add(self, payload: Dict) -> None:
+        self.count += 1
+        for field in RESOURCES_FIELDS:
+            value = payload.get(field) or 0
+            self.sums[field] += value
+            self.maxs[field] = max(self.maxs.get(field, value), value)
+        if payload.get('memory_limit') is not None:
+            self.memory_limit = max(self.memory_limit or 0, payload['memory_limit'])
+        for position, gpu in enumerate(payload.get('gpu_resources') or []):
+            index = gpu.get('index', position)
+            self.gpu_counts[index] += 1
+            for field in GPU_FIELDS:
+                if gpu.get(field) is not None:
+                    self.gpu_sums[index][field] += gpu[field]
+
+    def to_dict(self) -> Dict:
+        point = {
+            'timestamp': self.timestamp,
+            'count': self.count,
+            'memory_limit': self.memory_limit,
+        }
+        for field in RESOURCES_FIELDS:
+            point[field] = self.sums[field] / self.count
+            point['{}_max'.format(field)] = self.maxs[field]
+        point['gpu_resources'] = [
+            dict({field: value / self.gpu_counts[index]
+                  for field, value in self.gpu_sums[index].items()}, index=index)
+            for index in sorted(self.gpu_counts)
+        ]
+        return point
+
+
+class ResourcesRollup(object):
+    """
+    Rolls up the jobs' resources into buckets of fixed resolutions.
+
+    Only the open bucket of every job and resolution is kept in memory,
+    a bucket is returned by `pop_points` once its time is over.
+    """
+
+    def __init__(self, resolutions: Iterable[int]) -> None:
+        self.resolutions = tuple(resolutions)
+        self._buckets = {}  # type: Dict[Tuple[str, int], ResourcesBucket]
+        self._points = defaultdict(list)  # type: Dict[Tuple[str, int], List[Dict]]
+
+    def add(self, job_uuid: str, payload: Dict, timestamp: float) -> None:
+        for resolution in self.resolutions:
+            key = (job_uuid, resolution)
+            bucket_timestamp = int(timestamp // resolution * resolution)
+            bucket = self._buckets.get(key)
+            if bucket and bucket.timestamp != bucket_timestamp:
+                self._points[key].append(bucket.to_dict())
+                bucket = None
+            if not bucket:
+                bucket = ResourcesBucket(bucket_timestamp)
+                self._buckets[key] = bucket
+            bucket.add(payload)
+
+    def pop_points(self, timestamp: float) -> Dict[Tuple[str, int], List[Dict]]:
+        """Returns the points of the buckets over by `timestamp`, per (job uuid, resolution)."""
+        for key, bucket in list(self._buckets.items()):
+            _, resolution = key
+            if bucket.timestamp + resolution <= timestamp:
+                self._points[key].append(bucket.to_dict())
+                del self._buckets[key]
+        points = dict(self._points)
+        self._points.clear()
+        return points
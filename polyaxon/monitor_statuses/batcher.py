@@ -0,0 +1,68 @@
+import atexit
+import os
+import threading
+import time
+
+from typing import Callable, Dict, List
+
+from polyaxon.settings import K8SEventsCeleryTasks
+
+
+class StatusesBatcher(object):
+    """
+    Groups the experiment jobs' pod states in batches handled by a single task.
+
+    The batches are sent when they reach `batch_size` pod states or every `batch_interval` seconds,
+    a zero interval sends the pod states right away,
+    the pod states of the other jobs are sent with their own task.
+    """
+
+    BATCH_TASKS = {K8SEventsCeleryTasks.K8S_EVENTS_HANDLE_EXPERIMENT_JOB_STATUSES}
+
+    def __init__(self,
+                 send_task: Callable[[str, Dict], None],
+                 send_batch: Callable[[List[Dict]], None],
+                 batch_interval: float,
+                 batch_size: int) -> None:
+        self.send_task = send_task
+        self.send_batch = send_batch
+        self.batch_interval = batch_interval
+        self.batch_size = batch_size
+        self._batch = []  # type: List[Dict]
+        self._lock = threading.RLock()
+        self._flusher = None
+        self._pid = None
+
+    def _start_flusher(self) -> None:
+        if self._pid == os.getpid():
+            return
+        if self._pid is None:
+            atexit.register(self.flush)
+        self._pid = os.getpid()
+        self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+        self._flusher.start()
+
+    def _flush_periodically(self) -> None:
+        while True:
+            time.sleep(self.batch_interval)
+            self.flush()
+
+    def add(self, task: str, pod_state: Dict) -> None:
+        if task not in self.BATCH_TASKS:
+            self.send_task(task, pod_state)
+            return
+
+        with self._lock:
+            self._batch.append(pod_state)
+            if self.batch_interval <= 0 or len(self._batch) >= self.batch_size:
+                self.flush()
+            else:
+                self._start_flusher()
+
+    def flush(self) -> None:
+        # Sent under the lock, the pod states of a job are kept in order
+        with self._lock:
+            batch = self._batch
+            self._batch = []
+            if batch:
+                self.send_batch(batch)
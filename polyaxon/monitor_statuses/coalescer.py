@@ -0,0 +1,111 @@
+import atexit
+import json
+import os
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+
+def get_job_uuid(pod_state: Dict) -> Optional[str]:
+    details = pod_state.get('details') or {}
+    return (details.get('labels') or {}).get('job_uuid')
+
+
+def get_state_key(pod_state: Dict) -> Tuple:
+    """The parts of a pod state that make a transition for the statuses handlers."""
+    details = pod_state.get('details') or {}
+    return (pod_state.get('status'),
+            pod_state.get('message'),
+            details.get('node_name'),
+            json.dumps(details.get('container_statuses'), sort_keys=True, default=str))
+
+
+class StatusesCoalescer(object):
+    """
+    Drops the jobs' pod states that do not change the last state sent,
+    and coalesces the pod states of a job received within `window` seconds into the latest one.
+
+    The last state sent is kept for the `max_jobs` most recently updated jobs,
+    a zero window sends the pod states right away.
+    """
+
+    def __init__(self,
+                 send_task: Callable[[str, Dict], None],
+                 window: float,
+                 max_jobs: int) -> None:
+        self.send_task = send_task
+        self.window = window
+        self.max_jobs = max_jobs
+        self._sent = OrderedDict()  # Maps the jobs to their last state key sent
+        self._pending = OrderedDict()  # Maps the jobs to their latest (task, state key, pod state)
+        self._lock = threading.RLock()
+        self._flusher = None
+        self._pid = None
+
+    def _start_flusher(self) -> None:
+        if self._pid == os.getpid():
+            return
+        if self._pid is None:
+            atexit.register(self.flush)
+        self._pid = os.getpid()
+        self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+        self._flusher.start()
+
+    def _flush_periodically(self) -> None:
+        while True:
+            time.sleep(self.window)
+            self.flush()
+
+    def _is_transition(self, job_uuid: str, state_key: Tuple) -> bool:
+        if job_uuid in self._pending:
+            return self._pending[job_uuid][1] != state_key
+        return self._sent.get(job_uuid) != state_key
+
+    def is_transition(self, pod_state: Dict) -> bool:
+        """Returns False if the pod state does not change the job's latest state."""
+        job_uuid = get_job_uuid(pod_state)
+        if not job_uuid:
+            return True
+        with self._lock:
+            return self._is_transition(job_uuid, get_state_key(pod_state))
+
+    def add(self, task: str, pod_state: Dict) -> bool:
+        """
+        Queues the pod state to be sent with `task`,
+        returns False if it does not change the job's latest state.
+        """
+        job_uuid = get_job_uuid(pod_state)
+        if not job_uuid:
+            self.send_task(task, pod_state)
+            return True
+
+        state_key = get_state_key(pod_state)
+        with self._lock:
+            if not self._is_transition(job_uuid, state_key):
+                return False
+            # The latest pod state replaces the pending one
+            self._pending[job_uuid] = (task, state_key, pod_state)
+            if self.window <= 0:
+                self.flush()
+            else:
+                self._start_flusher()
+        return True
+
+    def _set_sent(self, job_uuid: str, state_key: Tuple) -> None:
+        self._sent[job_uuid] = state_key
+        self._sent.move_to_end(job_uuid)
+        while len(self._sent) > self.max_jobs:
+            self._sent.popitem(last=False)
+
+    def flush(self) -> None:
+        with self._lock:
+            pending = self._pending
+            self._pending = OrderedDict()
+            for job_uuid, (task, state_key, pod_state) in pending.items():
+                # A burst can end on the state already sent
+                if self._sent.get(job_uuid) == state_key:
+                    continue
+                self.send_task(task, pod_state)
+                self._set_sent(job_uuid, state_key)
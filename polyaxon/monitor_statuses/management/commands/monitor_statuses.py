@@ -1,3 +1,4 @@
+import atexit
 import time
 
 from kubernetes.client.rest import ApiException
@@ -8,6 +9,8 @@ import conf
 
 from libs.base_monitor import BaseMonitorCommand
 from monitor_statuses import monitor
+from monitor_statuses.batcher import StatusesBatcher
+from monitor_statuses.coalescer import StatusesCoalescer
 from polyaxon_k8s.manager import K8SManager
 
 
@@ -22,9 +25,27 @@ class Command(BaseMonitorCommand):
             "log sleep interval: `{}`.".format(log_sleep_interval),
             ending='\n')
         k8s_manager = K8SManager(namespace=conf.get('K8S_NAMESPACE'), in_cluster=True)
+        batcher = StatusesBatcher(send_task=monitor.send_status,
+                                  send_batch=monitor.send_experiment_job_statuses,
+                                  batch_interval=conf.get('STATUSES_BATCH_INTERVAL'),
+                                  batch_size=conf.get('STATUSES_BATCH_SIZE'))
+        # Registered first to run last on exit, after the coalescer's flush
+        atexit.register(batcher.flush)
+        # Kept across the watches, the states replayed by a new watch are dropped
+        coalescer = StatusesCoalescer(send_task=batcher.add,
+                                      window=conf.get('STATUSES_COALESCE_WINDOW'),
+                                      max_jobs=conf.get('STATUSES_COALESCE_MAX_JOBS'))
+
+        def flush() -> None:
+            coalescer.flush()
+            batcher.flush()
+
+        # Kept across the watches, the watch is resumed from the last resource version seen,
+        # which is only persisted once the pod states handled before it are sent
+        pod_watch = monitor.get_pod_watch(k8s_manager, flush=flush)
         while True:
             try:
-                monitor.run(k8s_manager)
+                monitor.run(k8s_manager, coalescer=coalescer, pod_watch=pod_watch)
             except ApiException as e:
                 monitor.logger.warning(
                     "Exception when calling CoreV1Api->list_namespaced_pod: %s\n", e)
@@ -1,13 +1,18 @@
 import logging
 
-from typing import Mapping
+from typing import Callable, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from hestia.tz_utils import now
 
 import conf
-import ocular
 
 from constants.experiment_jobs import get_experiment_job_uuid
 from constants.jobs import JobLifeCycle
 from db.redis.containers import RedisJobContainers
+from libs.k8s_watch import ResumableWatch
+from monitor_statuses.coalescer import StatusesCoalescer
+from ocular.exceptions import OcularException
+from ocular.processor import get_pod_state
 from polyaxon.celery_api import celery_app
 from polyaxon.settings import K8SEventsCeleryTasks
 
@@ -33,6 +38,8 @@ def update_job_containers(event: Mapping,
             return container_id[len('docker://'):]
         return container_id
 
+    containers = {}
+    removed_container_ids = []
     for container_status in event['status']['container_statuses']:
         if container_status['name'] != job_container_name:
             continue
@@ -43,10 +50,13 @@ def update_job_containers(event: Mapping,
             if container_status['state']['running'] is not None:
                 logger.info('Monitoring (container_id, job_uuid): (%s, %s)',
                             container_id, job_uuid)
-                RedisJobContainers.monitor(container_id=container_id, job_uuid=job_uuid)
+                containers[container_id] = job_uuid
             else:
+                removed_container_ids.append(container_id)
 
-                RedisJobContainers.remove_container(container_id=container_id)
+    # A round trip for all the containers of the event, none if there are no containers
+    RedisJobContainers.monitor_containers(containers)
+    RedisJobContainers.remove_containers(removed_container_ids)
 
 
 def get_label_selector() -> str:
@@ -56,28 +66,99 @@ def get_label_selector() -> str:
         conf.get('TYPE_LABELS_RUNNER'))
 
 
-def handle_experiment_job_condition(event_object, pod_state, status, labels, container_name):
-    update_job_containers(event_object, status, container_name)
+def send_status(task: str, pod_state: Dict) -> None:
+    celery_app.send_task(task, kwargs={'payload': pod_state})
+
+
+def send_experiment_job_statuses(pod_states: List[Dict]) -> None:
+    celery_app.send_task(K8SEventsCeleryTasks.K8S_EVENTS_BATCH_EXPERIMENT_JOB_STATUSES,
+                         kwargs={'payloads': pod_states})
+
+
+def handle_job_condition(task: str,
+                         event_object: Mapping,
+                         pod_state: Dict,
+                         status: str,
+                         labels: Mapping,
+                         container_name: Optional[str] = None,
+                         coalescer: Optional[StatusesCoalescer] = None) -> None:
+    """
+    Sends the pod state to the statuses handler `task`.
+
+    With a `coalescer` the pod states that do not change the job's state are dropped,
+    and the bursts of pod states of a job are sent as a single task.
+    """
+    if coalescer and not coalescer.is_transition(pod_state):
+        logger.debug("Dropping unchanged state %s, %s", status, labels)
+        return
+    if container_name:
+        update_job_containers(event_object, status, container_name)
     logger.debug("Sending state to handler %s, %s", status, labels)
+    if coalescer:
+        coalescer.add(task, pod_state)
+    else:
+        send_status(task, pod_state)
+
+
+def handle_experiment_job_condition(event_object,
+                                    pod_state,
+                                    status,
+                                    labels,
+                                    container_name,
+                                    coalescer=None):
     # Handle experiment job statuses
-    celery_app.send_task(
-        K8SEventsCeleryTasks.K8S_EVENTS_HANDLE_EXPERIMENT_JOB_STATUSES,
-        kwargs={'payload': pod_state})
-
-
-def run(k8s_manager: 'K8SManager') -> None:
-    for (event_object, pod_state) in ocular.monitor(k8s_manager.k8s_api,
-                                                    namespace=conf.get('K8S_NAMESPACE'),
-                                                    container_names=(
-                                                        conf.get('CONTAINER_NAME_EXPERIMENT_JOB'),
-                                                        conf.get('CONTAINER_NAME_TF_JOB'),
-                                                        conf.get('CONTAINER_NAME_PYTORCH_JOB'),
-                                                        conf.get('CONTAINER_NAME_PLUGIN_JOB'),
-                                                        conf.get('CONTAINER_NAME_JOB'),
-                                                        conf.get('CONTAINER_NAME_DOCKERIZER_JOB')),
-                                                    label_selector=get_label_selector(),
-                                                    return_event=True,
-                                                    watch_ttl=conf.get('TTL_WATCH_STATUSES')):
+    handle_job_condition(task=K8SEventsCeleryTasks.K8S_EVENTS_HANDLE_EXPERIMENT_JOB_STATUSES,
+                         event_object=event_object,
+                         pod_state=pod_state,
+                         status=status,
+                         labels=labels,
+                         container_name=container_name,
+                         coalescer=coalescer)
+
+
+def get_pod_watch(k8s_manager: 'K8SManager',
+                  flush: Optional[Callable[[], None]] = None) -> ResumableWatch:
+    """`flush` sends the pod states buffered before the resource version is persisted."""
+    return ResumableWatch(name='statuses',
+                          list_func=k8s_manager.k8s_api.list_namespaced_pod,
+                          watch_ttl=conf.get('TTL_WATCH_STATUSES'),
+                          page_size=conf.get('K8S_WATCH_PAGE_SIZE'),
+                          flush=flush,
+                          namespace=conf.get('K8S_NAMESPACE'),
+                          label_selector=get_label_selector())
+
+
+def get_pod_states(pod_watch: ResumableWatch) -> Iterator[Tuple[Dict, Dict]]:
+    container_names = (
+        conf.get('CONTAINER_NAME_EXPERIMENT_JOB'),
+        conf.get('CONTAINER_NAME_TF_JOB'),
+        conf.get('CONTAINER_NAME_PYTORCH_JOB'),
+        conf.get('CONTAINER_NAME_PLUGIN_JOB'),
+        conf.get('CONTAINER_NAME_JOB'),
+        conf.get('CONTAINER_NAME_DOCKERIZER_JOB'))
+    for event in pod_watch.stream():
+        event_object = event['object'].to_dict()
+        try:
+            pod_state = get_pod_state(event_type=event['type'],
+                                      event=event_object,
+                                      job_container_names=container_names,
+                                      created_at=now())
+        except OcularException:
+            continue
+        yield event_object, pod_state
+
+
+def run(k8s_manager: 'K8SManager',
+        coalescer: Optional[StatusesCoalescer] = None,
+        pod_watch: Optional[ResumableWatch] = None) -> None:
+    """
+    Watches the jobs' pods and sends their states to the statuses handlers.
+
+    The watch is resumed from the last resource version seen by `pod_watch`,
+    by default the one persisted by the previous monitor.
+    """
+    pod_watch = pod_watch or get_pod_watch(k8s_manager)
+    for (event_object, pod_state) in get_pod_states(pod_watch):
         logger.debug('-------------------------------------------\n%s\n', pod_state)
         if not pod_state:
             continue
@@ -136,7 +217,8 @@ def run(k8s_manager: 'K8SManager') -> None:
                     pod_state=pod_state,
                     status=status,
                     labels=labels,
-                    container_name=conf.get('CONTAINER_NAME_TF_JOB'))
+                    container_name=conf.get('CONTAINER_NAME_TF_JOB'),
+                    coalescer=coalescer)
 
             elif pytorch_job_condition:
                 # We augment the payload with standard Polyaxon requirement
@@ -150,7 +232,8 @@ def run(k8s_manager: 'K8SManager') -> None:
                     pod_state=pod_state,
                     status=status,
                     labels=labels,
-                    container_name=conf.get('CONTAINER_NAME_PYTORCH_JOB'))
+                    container_name=conf.get('CONTAINER_NAME_PYTORCH_JOB'),
+                    coalescer=coalescer)
 
             elif mpi_job_condition:
                 job_name = pod_state['details']['pod_name']
@@ -170,7 +253,8 @@ def run(k8s_manager: 'K8SManager') -> None:
                     pod_state=pod_state,
                     status=status,
                     labels=labels,
-                    container_name=conf.get('CONTAINER_NAME_EXPERIMENT_JOB'))
+                    container_name=conf.get('CONTAINER_NAME_EXPERIMENT_JOB'),
+                    coalescer=coalescer)
 
             elif experiment_job_condition:
                 handle_experiment_job_condition(
@@ -178,28 +262,35 @@ def run(k8s_manager: 'K8SManager') -> None:
                     pod_state=pod_state,
                     status=status,
                     labels=labels,
-                    container_name=conf.get('CONTAINER_NAME_EXPERIMENT_JOB'))
+                    container_name=conf.get('CONTAINER_NAME_EXPERIMENT_JOB'),
+                    coalescer=coalescer)
 
         elif job_condition:
-            update_job_containers(event_object, status, conf.get('CONTAINER_NAME_JOB'))
-            logger.debug("Sending state to handler %s, %s", status, labels)
-            # Handle experiment job statuses
-            celery_app.send_task(
-                K8SEventsCeleryTasks.K8S_EVENTS_HANDLE_JOB_STATUSES,
-                kwargs={'payload': pod_state})
+            # Handle job statuses
+            handle_job_condition(task=K8SEventsCeleryTasks.K8S_EVENTS_HANDLE_JOB_STATUSES,
+                                 event_object=event_object,
+                                 pod_state=pod_state,
+                                 status=status,
+                                 labels=labels,
+                                 container_name=conf.get('CONTAINER_NAME_JOB'),
+                                 coalescer=coalescer)
 
         elif plugin_job_condition:
-            logger.debug("Sending state to handler %s, %s", status, labels)
             # Handle plugin job statuses
-            celery_app.send_task(
-                K8SEventsCeleryTasks.K8S_EVENTS_HANDLE_PLUGIN_JOB_STATUSES,
-                kwargs={'payload': pod_state})
+            handle_job_condition(task=K8SEventsCeleryTasks.K8S_EVENTS_HANDLE_PLUGIN_JOB_STATUSES,
+                                 event_object=event_object,
+                                 pod_state=pod_state,
+                                 status=status,
+                                 labels=labels,
+                                 coalescer=coalescer)
 
         elif dockerizer_job_condition:
-            logger.debug("Sending state to handler %s, %s", status, labels)
             # Handle dockerizer job statuses
-            celery_app.send_task(
-                K8SEventsCeleryTasks.K8S_EVENTS_HANDLE_BUILD_JOB_STATUSES,
-                kwargs={'payload': pod_state})
+            handle_job_condition(task=K8SEventsCeleryTasks.K8S_EVENTS_HANDLE_BUILD_JOB_STATUSES,
+                                 event_object=event_object,
+                                 pod_state=pod_state,
+                                 status=status,
+                                 labels=labels,
+                                 coalescer=coalescer)
         else:
             logger.info("Lost state %s, %s", status, pod_state)
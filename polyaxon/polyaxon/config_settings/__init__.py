@@ -14,6 +14,7 @@ from .oauth import *
 from .ownership import *
 from .redis_settings import *
 from .secrets import *
+from .stats import *
 from .tracker import *
 from .versions import *
 
@@ -4,6 +4,7 @@ DEFAULT_APPS = (
     'polyaxon',
     'conf.apps.ConfConfig',
     'db.apps.DBConfig',
+    'stats.apps.StatsConfig',
 )
 
 EXTRA_APPS = config.get_string('POLYAXON_EXTRA_APPS', is_list=True, is_optional=True)
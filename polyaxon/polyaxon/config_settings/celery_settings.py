@@ -13,6 +13,15 @@ CELERY_BROKER_URL = config.get_broker_url()
 INTERNAL_EXCHANGE = config.get_string('POLYAXON_INTERNAL_EXCHANGE',
                                       is_optional=True,
                                       default='internal')
+PUBLISHER_MONITORED_CACHE_TTL = config.get_float('POLYAXON_PUBLISHER_MONITORED_CACHE_TTL',
+                                                 is_optional=True,
+                                                 default=1)
+PUBLISHER_BATCH_INTERVAL = config.get_float('POLYAXON_PUBLISHER_BATCH_INTERVAL',
+                                            is_optional=True,
+                                            default=0.2)
+PUBLISHER_BATCH_SIZE = config.get_int('POLYAXON_PUBLISHER_BATCH_SIZE',
+                                      is_optional=True,
+                                      default=500)
 
 CELERY_RESULT_BACKEND = config.get_redis_url('POLYAXON_REDIS_CELERY_RESULT_BACKEND_URL')
 CELERYD_PREFETCH_MULTIPLIER = config.get_int('POLYAXON_CELERYD_PREFETCH_MULTIPLIER')
@@ -192,6 +201,7 @@ class K8SEventsCeleryTasks(object):
     K8S_EVENTS_HANDLE_NAMESPACE = 'k8s_events_handle_namespace'
     K8S_EVENTS_HANDLE_RESOURCES = 'k8s_events_handle_resources'
     K8S_EVENTS_HANDLE_EXPERIMENT_JOB_STATUSES = 'k8s_events_handle_experiment_job_statuses'
+    K8S_EVENTS_BATCH_EXPERIMENT_JOB_STATUSES = 'k8s_events_batch_experiment_job_statuses'
     K8S_EVENTS_HANDLE_JOB_STATUSES = 'k8s_events_handle_job_statuses'
     K8S_EVENTS_HANDLE_PLUGIN_JOB_STATUSES = 'k8s_events_handle_plugin_job_statuses'
     K8S_EVENTS_HANDLE_BUILD_JOB_STATUSES = 'k8s_events_handle_build_job_statuses'
@@ -691,6 +701,8 @@ CELERY_TASK_ROUTES = {
         {'queue': CeleryQueues.K8S_EVENTS_RESOURCES},
     K8SEventsCeleryTasks.K8S_EVENTS_HANDLE_EXPERIMENT_JOB_STATUSES:
         {'queue': CeleryQueues.K8S_EVENTS_JOB_STATUSES},
+    K8SEventsCeleryTasks.K8S_EVENTS_BATCH_EXPERIMENT_JOB_STATUSES:
+        {'queue': CeleryQueues.K8S_EVENTS_JOB_STATUSES},
     K8SEventsCeleryTasks.K8S_EVENTS_HANDLE_JOB_STATUSES:
         {'queue': CeleryQueues.K8S_EVENTS_JOB_STATUSES},
     K8SEventsCeleryTasks.K8S_EVENTS_HANDLE_PLUGIN_JOB_STATUSES:
@@ -29,6 +29,14 @@ GLOBAL_COUNTDOWN_DELAYED = GLOBAL_COUNTDOWN * 3
 TTL_HEARTBEAT = config.get_int('POLYAXON_TTL_HEARTBEAT',
                                is_optional=True,
                                default=60 * 30)
+# Heartbeats store: a key with a ttl per run, or a sorted set of pings per kind of run
+HEARTBEAT_BACKEND_KEYS = 'keys'
+HEARTBEAT_BACKEND_SORTED_SET = 'sorted_set'
+HEARTBEAT_BACKEND = config.get_string(
+    'POLYAXON_HEARTBEAT_BACKEND',
+    is_optional=True,
+    default=HEARTBEAT_BACKEND_KEYS,
+    options=(HEARTBEAT_BACKEND_KEYS, HEARTBEAT_BACKEND_SORTED_SET))
 # Token time in days
 TTL_TOKEN = config.get_int('POLYAXON_TTL_TOKEN',
                            is_optional=True,
@@ -43,6 +51,16 @@ GROUP_CHECKS_INTERVAL = config.get_int('POLYAXON_GROUP_CHECKS_INTERVAL',
                                        is_optional=True,
                                        default=5)
 
+# Resources history: the jobs' resources are rolled up in buckets of these resolutions (seconds),
+# the latest points are kept per job and resolution, e.g. 1 hour, 6 hours and 2.5 days
+RESOURCES_SERIES_RESOLUTIONS = (10, 60, 600)
+RESOURCES_SERIES_MAX_LENGTH = config.get_int('POLYAXON_RESOURCES_SERIES_MAX_LENGTH',
+                                             is_optional=True,
+                                             default=360)
+RESOURCES_SERIES_TTL = config.get_int('POLYAXON_RESOURCES_SERIES_TTL',
+                                      is_optional=True,
+                                      default=60 * 60 * 24 * 7)
+
 # Auditor backend
 AUDITOR_BACKEND = config.get_string('POLYAXON_AUDITOR_BACKEND', is_optional=True)
 
@@ -34,3 +34,26 @@ if K8S_AUTHORISATION and K8S_HOST:
     else:
         K8S_CONFIG.verify_ssl = False
         urllib3.disable_warnings()
+
+# Number of objects per page when the monitors' watches list the objects again
+K8S_WATCH_PAGE_SIZE = config.get_int('POLYAXON_K8S_WATCH_PAGE_SIZE',
+                                     is_optional=True,
+                                     default=500)
+
+# The namespace monitor only watches the events matching this field selector
+K8S_EVENTS_FIELD_SELECTOR = config.get_string('POLYAXON_K8S_EVENTS_FIELD_SELECTOR',
+                                              is_optional=True,
+                                              default='type!=Normal')
+# And only reports the events of the objects with these name prefixes, e.g. `plx-`,
+# all objects if empty, including the platform's pods without the prefix
+K8S_EVENTS_OBJECT_PREFIXES = config.get_list('POLYAXON_K8S_EVENTS_OBJECT_PREFIXES',
+                                             is_optional=True,
+                                             default=[])
+# The repeated events of an object with the same reason are reported once per window (seconds)
+K8S_EVENTS_AGGREGATION_WINDOW = config.get_int('POLYAXON_K8S_EVENTS_AGGREGATION_WINDOW',
+                                               is_optional=True,
+                                               default=60)
+# Number of (object, reason) whose repeated events are counted
+K8S_EVENTS_AGGREGATION_MAX_KEYS = config.get_int('POLYAXON_K8S_EVENTS_AGGREGATION_MAX_KEYS',
+                                                 is_optional=True,
+                                                 default=10000)
@@ -1,3 +1,34 @@
 from polyaxon.config_manager import config
 
 PERSISTENCE_LOGS = config.get_dict('POLYAXON_PERSISTENCE_LOGS')
+
+LOGS_WRITER_MAX_FILES = config.get_int('POLYAXON_LOGS_WRITER_MAX_FILES',
+                                       is_optional=True,
+                                       default=256)
+LOGS_WRITER_FLUSH_INTERVAL = config.get_float('POLYAXON_LOGS_WRITER_FLUSH_INTERVAL',
+                                              is_optional=True,
+                                              default=1)
+LOGS_WRITER_BUFFER_SIZE = config.get_int('POLYAXON_LOGS_WRITER_BUFFER_SIZE',
+                                         is_optional=True,
+                                         default=256 * 1024)
+LOGS_RUNS_CACHE_TTL = config.get_int('POLYAXON_LOGS_RUNS_CACHE_TTL',
+                                     is_optional=True,
+                                     default=60)
+LOGS_CHUNK_SIZE = config.get_int('POLYAXON_LOGS_CHUNK_SIZE',
+                                 is_optional=True,
+                                 default=1024 * 1024)
+LOGS_CHUNK_INTERVAL = config.get_int('POLYAXON_LOGS_CHUNK_INTERVAL',
+                                     is_optional=True,
+                                     default=30)
+LOGS_COLLECT_WORKERS = config.get_int('POLYAXON_LOGS_COLLECT_WORKERS',
+                                      is_optional=True,
+                                      default=8)
+LOGS_SEARCH_WORKERS = config.get_int('POLYAXON_LOGS_SEARCH_WORKERS',
+                                     is_optional=True,
+                                     default=8)
+LOGS_SEARCH_CACHE_TTL = config.get_int('POLYAXON_LOGS_SEARCH_CACHE_TTL',
+                                       is_optional=True,
+                                       default=10)
+LOGS_RANGE_CACHE_TTL = config.get_int('POLYAXON_LOGS_RANGE_CACHE_TTL',
+                                      is_optional=True,
+                                      default=10)
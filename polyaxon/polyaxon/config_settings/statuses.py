@@ -3,3 +3,20 @@ from polyaxon.config_manager import config
 TTL_WATCH_STATUSES = config.get_int('POLYAXON_TTL_WATCH_STATUSES',
                                     is_optional=True,
                                     default=60 * 20)
+
+# The pod states of a job received within this window (seconds) are sent in a single task
+STATUSES_COALESCE_WINDOW = config.get_float('POLYAXON_STATUSES_COALESCE_WINDOW',
+                                            is_optional=True,
+                                            default=0.5)
+# Number of jobs whose last state is kept to drop the unchanged pod states
+STATUSES_COALESCE_MAX_JOBS = config.get_int('POLYAXON_STATUSES_COALESCE_MAX_JOBS',
+                                            is_optional=True,
+                                            default=10000)
+
+# The experiment jobs' pod states are sent in batches every interval (seconds) or batch size
+STATUSES_BATCH_INTERVAL = config.get_float('POLYAXON_STATUSES_BATCH_INTERVAL',
+                                           is_optional=True,
+                                           default=0.5)
+STATUSES_BATCH_SIZE = config.get_int('POLYAXON_STATUSES_BATCH_SIZE',
+                                     is_optional=True,
+                                     default=200)
@@ -0,0 +1,85 @@
+import atexit
+import os
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Callable, Dict, List, Tuple
+
+from hestia.list_utils import to_list
+
+
+class PublishBatcher(object):
+    """
+    Coalesces the log messages published to the same routing key.
+
+    The messages are buffered per routing key, and their log lines are merged in a single message,
+    the batches are published together when a batch reaches `batch_size` lines
+    or every `batch_interval` seconds, a zero interval publishes the messages right away.
+    """
+
+    def __init__(self,
+                 publish: Callable[[List[Tuple[str, Dict]]], None],
+                 batch_interval: float,
+                 batch_size: int) -> None:
+        self.publish = publish
+        self.batch_interval = batch_interval
+        self.batch_size = batch_size
+        self._batches = OrderedDict()  # Maps routing keys to the payloads to coalesce
+        self._batches_sizes = {}  # type: Dict[str, int]
+        self._lock = threading.RLock()
+        self._flusher = None
+        self._pid = None
+
+    def _start_flusher(self) -> None:
+        # The flusher thread does not survive a fork, e.g. of the celery worker
+        if self._pid == os.getpid():
+            return
+        if self._pid is None:
+            atexit.register(self.flush)
+        self._pid = os.getpid()
+        self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+        self._flusher.start()
+
+    def _flush_periodically(self) -> None:
+        while True:
+            time.sleep(self.batch_interval)
+            self.flush()
+
+    @staticmethod
+    def coalesce(payloads: List[Dict]) -> Dict:
+        if len(payloads) == 1:
+            return payloads[0]
+        payload = dict(payloads[0])
+        payload['log_lines'] = [log_line for p in payloads for log_line in to_list(p['log_lines'])]
+        return payload
+
+    def _pop_batches(self, routing_keys: List[str]) -> List[Tuple[str, Dict]]:
+        batches = []
+        for routing_key in routing_keys:
+            payloads = self._batches.pop(routing_key, None)
+            self._batches_sizes.pop(routing_key, None)
+            if payloads:
+                batches.append((routing_key, self.coalesce(payloads)))
+        return batches
+
+    def add(self, routing_key: str, payload: Dict) -> None:
+        """Buffers the payload, its `log_lines` are merged with the routing key's batch."""
+        with self._lock:
+            self._batches.setdefault(routing_key, []).append(payload)
+            size = self._batches_sizes.get(routing_key, 0) + len(to_list(payload['log_lines']))
+            self._batches_sizes[routing_key] = size
+            if self.batch_interval <= 0 or size >= self.batch_size:
+                self._publish([routing_key])
+            else:
+                self._start_flusher()
+
+    def _publish(self, routing_keys: List[str]) -> None:
+        # Published under the lock, the messages of a routing key are kept in order
+        batches = self._pop_batches(routing_keys)
+        if batches:
+            self.publish(batches)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._publish(list(self._batches.keys()))
@@ -1,3 +1,5 @@
+import time
+
 from amqp import AMQPError
 from hestia.list_utils import to_list
 from hestia.service_interface import Service
@@ -5,9 +7,12 @@ from redis import RedisError
 
 from django.conf import settings
 
+import conf
+
 from db.redis.to_stream import RedisToStream
 from polyaxon.celery_api import celery_app
 from polyaxon.settings import LogsCeleryTasks, RoutingKeys
+from publisher.batcher import PublishBatcher
 
 
 class PublisherService(Service):
@@ -19,6 +24,38 @@ class PublisherService(Service):
 
     def __init__(self):
         self._logger = None
+        self._batcher = None
+        self._monitored = {}  # Maps the monitored sets' getters to their members and expiration
+
+    def _is_monitored(self, get_monitored, object_id):
+        """
+        Checks the monitored set's membership against a local copy of the set,
+        the copy is read with a single round trip every `PUBLISHER_MONITORED_CACHE_TTL` seconds.
+        """
+        members, expires_at = self._monitored.get(get_monitored, (None, 0))
+        current = time.monotonic()
+        if members is None or current >= expires_at:
+            try:
+                members = get_monitored()
+            except RedisError:
+                members = set()
+            self._monitored[get_monitored] = (
+                members, current + conf.get('PUBLISHER_MONITORED_CACHE_TTL'))
+        return object_id in members
+
+    def _publish(self, batches):
+        """Publishes the batched messages through a single producer."""
+        with celery_app.producer_or_acquire(None) as producer:
+            for routing_key, payload in batches:
+                try:
+                    producer.publish(
+                        payload,
+                        retry=True,
+                        routing_key=routing_key,
+                        exchange=settings.INTERNAL_EXCHANGE,
+                    )
+                except (TimeoutError, AMQPError):
+                    pass
 
     def publish_experiment_job_log(self,
                                    log_lines,
@@ -37,54 +74,34 @@ class PublisherService(Service):
                     'log_lines': log_lines,
                     'temp': True
                 })
-        try:
-            should_stream = (RedisToStream.is_monitored_job_logs(job_uuid) or
-                             RedisToStream.is_monitored_experiment_logs(experiment_uuid))
-        except RedisError:
-            should_stream = False
+        should_stream = (
+            self._is_monitored(RedisToStream.get_monitored_job_logs, job_uuid) or
+            self._is_monitored(RedisToStream.get_monitored_experiment_logs, experiment_uuid))
         if should_stream:
             self._logger.info("Streaming new log event for experiment: %s job: %s",
                               experiment_uuid,
                               job_uuid)
 
-            with celery_app.producer_or_acquire(None) as producer:
-                try:
-                    producer.publish(
-                        {
-                            'experiment_uuid': experiment_uuid,
-                            'job_uuid': job_uuid,
-                            'log_lines': log_lines,
-                        },
-                        retry=True,
-                        routing_key='{}.{}.{}'.format(RoutingKeys.STREAM_LOGS_SIDECARS_EXPERIMENTS,
-                                                      experiment_uuid,
-                                                      job_uuid),
-                        exchange=settings.INTERNAL_EXCHANGE,
-                    )
-                except (TimeoutError, AMQPError):
-                    pass
+            self._batcher.add(
+                routing_key='{}.{}.{}'.format(RoutingKeys.STREAM_LOGS_SIDECARS_EXPERIMENTS,
+                                              experiment_uuid,
+                                              job_uuid),
+                payload={
+                    'experiment_uuid': experiment_uuid,
+                    'job_uuid': job_uuid,
+                    'log_lines': log_lines,
+                })
 
     def _stream_job_log(self, job_uuid, log_lines, routing_key):
-        try:
-            should_stream = RedisToStream.is_monitored_job_logs(job_uuid)
-        except RedisError:
-            should_stream = False
-        if should_stream:
+        if self._is_monitored(RedisToStream.get_monitored_job_logs, job_uuid):
             self._logger.info("Streaming new log event for job: %s", job_uuid)
 
-            with celery_app.producer_or_acquire(None) as producer:
-                try:
-                    producer.publish(
-                        {
-                            'job_uuid': job_uuid,
-                            'log_lines': log_lines,
-                        },
-                        retry=True,
-                        routing_key='{}.{}'.format(routing_key, job_uuid),
-                        exchange=settings.INTERNAL_EXCHANGE,
-                    )
-                except (TimeoutError, AMQPError):
-                    pass
+            self._batcher.add(
+                routing_key='{}.{}'.format(routing_key, job_uuid),
+                payload={
+                    'job_uuid': job_uuid,
+                    'log_lines': log_lines,
+                })
 
     def publish_build_job_log(self, log_lines, job_uuid, job_name, send_task=True):
         self._logger.info("Publishing log event for task: %s", job_uuid)
@@ -122,3 +139,6 @@ class PublisherService(Service):
         import logging
 
         self._logger = logging.getLogger('polyaxon.monitors.publisher')
+        self._batcher = PublishBatcher(publish=self._publish,
+                                       batch_interval=conf.get('PUBLISHER_BATCH_INTERVAL'),
+                                       batch_size=conf.get('PUBLISHER_BATCH_SIZE'))
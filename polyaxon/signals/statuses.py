@@ -1,6 +1,7 @@
 import logging
 
 from hestia.signal_decorators import ignore_raw, ignore_updates
+from redis import RedisError
 
 from django.db.models.signals import post_save
 from django.dispatch import receiver
@@ -18,6 +19,7 @@ from db.models.experiments import ExperimentStatus
 from db.models.jobs import JobStatus
 from db.models.notebooks import NotebookJobStatus
 from db.models.tensorboards import TensorboardJobStatus
+from db.redis.statuses import RedisStatuses
 from event_manager.events.build_job import (
     BUILD_JOB_CREATED,
     BUILD_JOB_DONE,
@@ -71,6 +73,14 @@ from signals.run_time import (
 _logger = logging.getLogger('polyaxon.signals.statuses')
 
 
+def publish_status(instance, status: str) -> None:
+    """Notifies the subscribers, e.g. the streams service, of a new status."""
+    try:
+        RedisStatuses.publish(uuid=instance.uuid.hex, status=status)
+    except RedisError as e:
+        _logger.warning('Could not publish the status of `%s`: %s', instance.uuid.hex, e)
+
+
 @receiver(post_save, sender=BuildJobStatus, dispatch_uid="build_job_status_post_save")
 @ignore_updates
 @ignore_raw
@@ -84,6 +94,7 @@ def build_job_status_post_save(sender, **kwargs):
     set_job_started_at(instance=job, status=instance.status)
     set_job_finished_at(instance=job, status=instance.status)
     job.save(update_fields=['status', 'started_at', 'updated_at', 'finished_at'])
+    publish_status(instance=job, status=instance.status)
     auditor.record(event_type=BUILD_JOB_NEW_STATUS,
                    instance=job,
                    previous_status=previous_status)
@@ -121,6 +132,7 @@ def job_status_post_save(sender, **kwargs):
     set_job_started_at(instance=job, status=instance.status)
     set_job_finished_at(instance=job, status=instance.status)
     job.save(update_fields=['status', 'started_at', 'updated_at', 'finished_at'])
+    publish_status(instance=job, status=instance.status)
     auditor.record(event_type=JOB_NEW_STATUS,
                    instance=job,
                    previous_status=previous_status)
@@ -259,6 +271,7 @@ def experiment_job_status_post_save(sender, **kwargs):
     set_job_started_at(instance=job, status=instance.status)
     set_job_finished_at(instance=job, status=instance.status)
     job.save(update_fields=['status', 'started_at', 'updated_at', 'finished_at'])
+    publish_status(instance=job, status=instance.status)
 
     # check if the new status is done to remove the containers from the monitors
     if job.is_done:
@@ -288,6 +301,7 @@ def experiment_status_post_save(sender, **kwargs):
                     status=instance.status,
                     is_done=ExperimentLifeCycle.is_done)
     experiment.save(update_fields=['status', 'started_at', 'updated_at', 'finished_at'])
+    publish_status(instance=experiment, status=instance.status)
     auditor.record(event_type=EXPERIMENT_NEW_STATUS,
                    instance=experiment,
                    previous_status=previous_status)
@@ -33,3 +33,9 @@ class DatadogStatsBackend(BaseStatsBackend):
         if self.tags:
             tags += self.tags
         self.stats.increment(key, amount, sample_rate=sample_rate, tags=tags, host=self.host)
+
+    def _timing(self, key, value, sample_rate=1, **kwargs):
+        tags = kwargs.get('tags', [])
+        if self.tags:
+            tags += self.tags
+        self.stats.timing(key, value, sample_rate=sample_rate, tags=tags, host=self.host)
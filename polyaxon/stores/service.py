@@ -139,13 +139,21 @@ class StoresService(Service):
 
     @classmethod
     def delete_logs_path(cls, subpath, persistence='default'):
+        from libs.log_blocks import get_blocks_index_path, get_blocks_path
+        from libs.log_chunks import get_chunks_path
+
         logs_path = cls.get_logs_path(persistence=persistence)
         path = os.path.join(logs_path, subpath)
         store = cls.get_logs_store(persistence_logs=persistence)
-        try:
-            store.delete(path)
-        except (PolyaxonStoresException, VolumeNotFoundError):
-            pass
+        # The logs can also be compacted, or uploaded in chunks
+        for deletion_path in [path,
+                              get_blocks_path(path),
+                              get_blocks_index_path(path),
+                              get_chunks_path(path)]:
+            try:
+                store.delete(deletion_path)
+            except (PolyaxonStoresException, VolumeNotFoundError):
+                pass
 
     @staticmethod
     def _get_store(store, secret_key):
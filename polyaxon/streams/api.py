@@ -4,11 +4,13 @@ from sanic.response import text
 
 import conf
 
+from streams.data_access import monitor_loop_lag
 from streams.resources.builds import build_logs_v2
 from streams.resources.experiment_jobs import experiment_job_logs_v2, experiment_job_resources
 from streams.resources.experiments import experiment_logs_v2, experiment_resources
 from streams.resources.health import health
 from streams.resources.jobs import job_logs_v2
+from streams.statuses import StatusesListener
 
 app = Sanic(__name__, log_config=conf.get('LOGGING'))
 
@@ -51,17 +53,29 @@ async def ignore_404s(request, exception):
 @app.listener('after_server_start')
 async def notify_server_started(app, loop):  # pylint:disable=redefined-outer-name
     app.job_resources_ws_managers = {}
-    app.experiment_resources_ws_managers = {}
+    app.experiment_resources_pollers = {}
     app.experiment_logs_ws_managers = {}
     app.job_logs_ws_managers = {}
     app.job_logs_consumers = {}
     app.experiment_logs_consumers = {}
+    app.pod_log_streams = {}
+    app.loop_lag = 0
+    app.loop_lag_monitor = loop.create_task(monitor_loop_lag(app))
+    app.statuses = StatusesListener(loop=loop)
+    app.statuses.start()
 
 
 @app.listener('after_server_stop')
 async def notify_server_stopped(app, loop):  # pylint:disable=redefined-outer-name
     app.job_resources_ws_managers = {}
-    app.experiment_resources_ws_manager = {}
+    app.loop_lag_monitor.cancel()
+    app.statuses.stop()
+
+    for poller in list(app.experiment_resources_pollers.values()):
+        poller.close()
+
+    for stream in list(app.pod_log_streams.values()):
+        stream.close()
 
     consumer_keys = list(app.job_logs_consumers.keys())
     for consumer_key in consumer_keys:
@@ -2,3 +2,17 @@ SOCKET_SLEEP = 2
 MAX_RETRIES = 7
 RESOURCES_CHECK = 7
 CHECK_DELAY = 5
+LOGS_BUFFER_SIZE = 1000
+LOGS_BATCH_WINDOW = 0.25  # seconds
+LOGS_BATCH_SIZE = 64 * 1024  # bytes
+SOCKET_QUEUE_SIZE = 100  # frames
+DB_POOL_SIZE = 10
+LOOP_LAG_INTERVAL = 1  # seconds
+LOOP_LAG_WARNING = 0.5  # seconds
+STATUSES_CACHE_SIZE = 10000
+RESOURCES_JOBS_REFRESH = 15  # ticks
+SUBSCRIPTION_QUEUE_SIZE = 1000  # messages
+CONSUMER_PREFETCH_COUNT = 200  # messages
+CONSUMER_ACK_BATCH_SIZE = 50  # messages
+CONSUMER_ACK_INTERVAL = 0.5  # seconds
+CONSUMER_RECONNECT_DELAY = 5  # seconds
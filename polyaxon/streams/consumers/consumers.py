@@ -1,19 +1,71 @@
 import asyncio
 import logging
+import uuid
+
+from typing import Any, Callable, Dict, List, Optional
 
 import pika
 
 from pika import adapters
 from pika.exceptions import AMQPConnectionError
 
+from websockets import ConnectionClosed
+
 from django.conf import settings
 
-from streams.socket_manager import SocketManager
+from streams.constants import (
+    CHECK_DELAY,
+    CONSUMER_ACK_BATCH_SIZE,
+    CONSUMER_ACK_INTERVAL,
+    CONSUMER_PREFETCH_COUNT,
+    CONSUMER_RECONNECT_DELAY,
+    MAX_RETRIES,
+    SOCKET_SLEEP,
+    SUBSCRIPTION_QUEUE_SIZE
+)
+from streams.statuses import StatusesListener, get_last_status
 
 _logger = logging.getLogger("polyaxon.streams.events")
 
 
-class Consumer(SocketManager):
+class Subscription(object):
+    """A bounded queue of messages for a single subscriber of a consumer.
+
+    When the subscriber is too slow and the queue is full, either the oldest message is
+    discarded to make room for the new one, or the new message is dropped.
+    """
+    DROP_OLDEST = 'drop_oldest'
+    DROP_NEWEST = 'drop_newest'
+
+    def __init__(self, max_size: int = SUBSCRIPTION_QUEUE_SIZE, overflow: str = DROP_OLDEST):
+        self.queue = asyncio.Queue(maxsize=max_size)
+        self.overflow = overflow
+        self.dropped = 0
+
+    def put(self, message: str) -> None:
+        if self.queue.full():
+            self.dropped += 1
+            if self.overflow == self.DROP_NEWEST:
+                return
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[str]:
+        """Waits for the next message, returns None if nothing arrived within `timeout`."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def get_messages(self) -> List[str]:
+        """Returns the messages already queued without waiting."""
+        messages = []
+        while not self.queue.empty():
+            messages.append(self.queue.get_nowait())
+        return messages
+
+
+class Consumer(object):
     """This is a consumer that will handle unexpected interactions
     with RabbitMQ such as channel and connection closures.
 
@@ -24,45 +76,89 @@ class Consumer(SocketManager):
 
     If the channel is closed, it will indicate a problem with one of the
     commands that were issued and that should surface in the output as well.
+
+    Every message is fanned out to the bounded queues of the consumer's subscriptions,
+    the consumer connects with the first subscription, and unbinds its queue and closes
+    the connection when the last subscription leaves.
+    Deliveries are acknowledged in batches of `ack_batch_size` or every `ack_interval` seconds,
+    `prefetch_count` bounds the number of unacknowledged messages the broker sends.
     """
     AMQP_URL = settings.CELERY_BROKER_URL
     EXCHANGE = settings.INTERNAL_EXCHANGE
     EXCHANGE_TYPE = 'topic'
 
-    def __init__(self, routing_key, queue, loop=None):
+    def __init__(self,
+                 routing_key: str,
+                 queue: str,
+                 loop: Optional[asyncio.AbstractEventLoop] = None,
+                 prefetch_count: int = CONSUMER_PREFETCH_COUNT,
+                 ack_batch_size: int = CONSUMER_ACK_BATCH_SIZE,
+                 ack_interval: float = CONSUMER_ACK_INTERVAL,
+                 on_closed: Optional[Callable] = None) -> None:
         self._connection = None
         self._channel = None
         self._closing = False
         self._consumer_tag = None
         self._routing_key = routing_key
-        self._queue = queue
-        self._loop = loop
-        self.messages = []
-        super().__init__()
-
-    def get_messages(self):
-        messages = self.messages[:]
-        self.messages = []
-        return messages
+        # The queue is exclusive to this process, otherwise the processes would share the messages
+        self._queue = '{}.{}'.format(queue, uuid.uuid4().hex)
+        self._loop = loop or asyncio.get_event_loop()
+        self._prefetch_count = prefetch_count
+        self._ack_batch_size = ack_batch_size
+        self._ack_interval = ack_interval
+        self._last_delivery_tag = None
+        self._unacked = 0
+        self._ack_handle = None
+        self._on_closed = on_closed
+        self.subscriptions = set()
+
+    @property
+    def routing_key(self) -> str:
+        return self._routing_key
+
+    def subscribe(self, **kwargs) -> Subscription:
+        """Adds a subscription and starts consuming if it's the first one."""
+        subscription = Subscription(**kwargs)
+        self.subscriptions.add(subscription)
+        if self._connection is None:
+            self.run()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Removes the subscription and stops consuming if it was the last one."""
+        self.subscriptions.discard(subscription)
+        if not self.subscriptions:
+            self.stop()
 
     def connect(self):
         """This method connects to RabbitMQ, returning the connection handle.
         When the connection is established, the on_connection_open method
         will be invoked by pika.
 
-        :rtype: pika.SelectConnection
+        :rtype: pika.adapters.AsyncioConnection
         """
         _logger.info('Connecting to %s', self.AMQP_URL)
-        while True:
-            try:
-                return adapters.AsyncioConnection(pika.URLParameters(self.AMQP_URL),
-                                                  self.on_connection_open)
-            except AMQPConnectionError:
-                asyncio.sleep(1)
+        try:
+            return adapters.AsyncioConnection(pika.URLParameters(self.AMQP_URL),
+                                              on_open_callback=self.on_connection_open,
+                                              on_open_error_callback=self.on_connection_open_error,
+                                              custom_ioloop=self._loop)
+        except AMQPConnectionError:
+            self.on_connection_open_error(None, None)
+            return None
+
+    def on_connection_open_error(self, unused_connection, error):
+        """This method is called by pika if the connection to RabbitMQ can't be established,
+        the connection is retried later without blocking the event loop.
+        """
+        _logger.warning('Connection failed, retrying in %s seconds: %s',
+                        CONSUMER_RECONNECT_DELAY, error)
+        self._loop.call_later(CONSUMER_RECONNECT_DELAY, self.reconnect)
 
     def close_connection(self):
         _logger.info('Closing connection')
-        self._connection.close()
+        if self._connection:
+            self._connection.close()
 
     def add_on_connection_close_callback(self):
         """This method adds an on close callback that will be invoked by pika
@@ -81,21 +177,30 @@ class Consumer(SocketManager):
         :param str reply_text: The server provided reply_text if given
         """
         self._channel = None
+        self._discard_acks()
         if self._closing:
-            self._connection.ioloop.stop()
+            self._connection = None
+            if self.subscriptions:
+                # New subscriptions were added while closing
+                self.run()
+            elif self._on_closed:
+                self._on_closed(self)
         else:
-            _logger.warning('Connection closed, reopening in 5 seconds: (%s) %s',
-                            reply_code, reply_text)
-            self._connection.add_timeout(5, self.reconnect)
+            _logger.warning('Connection closed, reopening in %s seconds: (%s) %s',
+                            CONSUMER_RECONNECT_DELAY, reply_code, reply_text)
+            self._connection.add_timeout(CONSUMER_RECONNECT_DELAY, self.reconnect)
 
-    def on_connection_open(self, unused_connection):
+    def on_connection_open(self, connection):
         """This method is called by pika once the connection to RabbitMQ has
-        been established. It passes the handle to the connection object in
-        case we need it, but in this case, we'll just mark it unused.
+        been established. It passes the handle to the connection object,
+        which is closed right away if the consumer was stopped while connecting.
 
-        :type unused_connection: pika.SelectConnection
+        :type connection: pika.adapters.AsyncioConnection
         """
         _logger.debug('Connection opened')
+        if self._closing or connection is not self._connection:
+            connection.close()
+            return
         self.add_on_connection_close_callback()
         self.open_channel()
 
@@ -116,7 +221,10 @@ class Consumer(SocketManager):
 
     def on_channel_closed(self, channel, reply_code, reply_text):
         _logger.warning('Channel %i was closed: (%s) %s', channel, reply_code, reply_text)
-        self._connection.close()
+        self._channel = None
+        self._discard_acks()
+        if self._connection and not (self._connection.is_closing or self._connection.is_closed):
+            self._connection.close()
 
     def on_channel_open(self, channel):
         """This method is invoked by pika when the channel has been opened.
@@ -129,6 +237,20 @@ class Consumer(SocketManager):
         _logger.info('Channel opened')
         self._channel = channel
         self.add_on_channel_close_callback()
+        self.setup_qos()
+
+    def setup_qos(self):
+        """Limits the number of unacknowledged messages RabbitMQ delivers to this consumer.
+        When it is complete, the on_qosok method will be invoked by pika.
+        """
+        _logger.debug('Setting prefetch count to %s', self._prefetch_count)
+        self._channel.basic_qos(self.on_qosok, prefetch_count=self._prefetch_count)
+
+    def on_qosok(self, unused_frame):
+        """Invoked by pika when the Basic.Qos method has completed.
+
+        :param pika.frame.Method unused_frame: The Basic.QosOk response frame
+        """
         self.setup_exchange(self.EXCHANGE)
 
     def setup_exchange(self, exchange_name):
@@ -162,7 +284,10 @@ class Consumer(SocketManager):
         :param str|unicode queue_name: The name of the queue to declare.
         """
         _logger.debug('Declaring queue %s', queue_name)
-        self._channel.queue_declare(self.on_queue_declareok, queue_name)
+        self._channel.queue_declare(self.on_queue_declareok,
+                                    queue_name,
+                                    exclusive=True,
+                                    auto_delete=True)
 
     def on_queue_declareok(self, method_frame):
         """Method invoked by pika when the Queue.Declare RPC call made in
@@ -197,13 +322,39 @@ class Consumer(SocketManager):
             self._channel.close()
 
     def acknowledge_message(self, delivery_tag):
-        """Acknowledge the message delivery from RabbitMQ by sending a
-        Basic.Ack RPC method for the delivery tag.
+        """Acknowledge the message delivery from RabbitMQ in batches,
+        the pending deliveries are acknowledged once the batch is full or after `ack_interval`.
 
         :param int delivery_tag: The delivery tag from the Basic.Deliver frame
         """
-        _logger.debug('Acknowledging message %s', delivery_tag)
-        self._channel.basic_ack(delivery_tag)
+        self._last_delivery_tag = delivery_tag
+        self._unacked += 1
+        if self._unacked >= self._ack_batch_size:
+            self.flush_acks()
+        elif self._ack_handle is None:
+            self._ack_handle = self._loop.call_later(self._ack_interval, self.flush_acks)
+
+    def flush_acks(self):
+        """Acknowledge all deliveries up to the last one by sending a single
+        Basic.Ack RPC method with the multiple flag.
+        """
+        self._cancel_acks()
+        if not self._unacked or not self._channel:
+            return
+        _logger.debug('Acknowledging %s messages up to %s',
+                      self._unacked, self._last_delivery_tag)
+        self._channel.basic_ack(self._last_delivery_tag, multiple=True)
+        self._unacked = 0
+
+    def _cancel_acks(self):
+        if self._ack_handle:
+            self._ack_handle.cancel()
+            self._ack_handle = None
+
+    def _discard_acks(self):
+        """The delivery tags are only valid on the closed channel, the messages are redelivered."""
+        self._cancel_acks()
+        self._unacked = 0
 
     def on_message(self, unused_channel, basic_deliver, properties, body):
         """Invoked by pika when a message is delivered from RabbitMQ. The
@@ -218,12 +369,13 @@ class Consumer(SocketManager):
         :param pika.Spec.BasicProperties: properties
         :param str|unicode body: The message body
         """
-        _logger.debug('Received message # %s from %s: %s',
-                      basic_deliver.delivery_tag, properties.app_id, body)
-        if self.ws and body:
-            self.messages.append(body)
-        _logger.debug('out ws : %s', len(self.ws))
-        _logger.debug('out messages : %s', len(self.messages))
+        _logger.debug('Received message # %s from %s',
+                      basic_deliver.delivery_tag, properties.app_id)
+        if body:
+            if isinstance(body, bytes):
+                body = body.decode('utf-8')
+            for subscription in self.subscriptions:
+                subscription.put(body)
         self.acknowledge_message(basic_deliver.delivery_tag)
 
     def on_cancelok(self, unused_frame):
@@ -244,6 +396,8 @@ class Consumer(SocketManager):
         if self._channel:
             _logger.debug('Sending a Basic.Cancel RPC command to RabbitMQ')
             self._channel.basic_cancel(self.on_cancelok, self._consumer_tag)
+        else:
+            self.close_connection()
 
     def start_consuming(self):
         """This method sets up the consumer by first calling
@@ -275,7 +429,8 @@ class Consumer(SocketManager):
 
         """
         _logger.info('Closing the channel')
-        self._channel.close()
+        if self._channel:
+            self._channel.close()
 
     def open_channel(self):
         """Open a new channel with RabbitMQ by issuing the Channel.Open RPC
@@ -286,24 +441,98 @@ class Consumer(SocketManager):
         self._connection.channel(on_open_callback=self.on_channel_open)
 
     def run(self):
-        """Run the example consumer by connecting to RabbitMQ and then
-        starting the IOLoop to block and allow the SelectConnection to operate.
+        """Run the consumer by connecting to RabbitMQ,
+        the connection is driven by the asyncio loop the streams service is running on.
         """
+        self._closing = False
         self._connection = self.connect()
-        self._connection.ioloop.start()
+
+    def unbind_queue(self):
+        """Unbind the queue from the exchange by issuing the Queue.Unbind RPC command,
+        so that no new messages are routed to it. When it is complete,
+        the on_unbindok method will be invoked by pika.
+        """
+        _logger.info('Unbinding %s from %s with %s',
+                     self._queue, self.EXCHANGE, self._routing_key)
+        self._channel.queue_unbind(self.on_unbindok, self._queue,
+                                   self.EXCHANGE, self._routing_key)
+
+    def on_unbindok(self, unused_frame):
+        """Invoked by pika when the Queue.Unbind method has completed,
+        the consumer can now be cancelled.
+
+        :param pika.frame.Method unused_frame: The Queue.UnbindOk response frame
+        """
+        _logger.debug('Queue unbound')
+        self.stop_consuming()
 
     def stop(self):
-        """Cleanly shutdown the connection to RabbitMQ by stopping the consumer
-        with RabbitMQ. When RabbitMQ confirms the cancellation, on_cancelok
-        will be invoked by pika, which will then closing the channel and
-        connection. The IOLoop is started again because this method is invoked
-        when CTRL-C is pressed raising a KeyboardInterrupt exception. This
-        exception stops the IOLoop which needs to be running for pika to
-        communicate with RabbitMQ. All of the commands issued prior to starting
-        the IOLoop will be buffered but not processed.
+        """Cleanly shutdown the connection to RabbitMQ, the pending deliveries are acknowledged,
+        the queue is unbound and the consumer cancelled. When RabbitMQ confirms the cancellation,
+        on_cancelok will be invoked by pika, which will then close the channel and connection.
         """
+        if self._closing:
+            return
         _logger.debug('Stopping')
         self._closing = True
-        self.stop_consuming()
-        self._connection.ioloop.start()
+        self.subscriptions = set()
+        self.flush_acks()
+        if self._channel and self._consumer_tag:
+            self.unbind_queue()
+        elif self._connection and self._connection.is_open:
+            self.stop_consuming()
+        else:
+            # Not connected yet, the pending connection is closed as soon as it opens
+            self._connection = None
+            if self._on_closed:
+                self._on_closed(self)
         _logger.info('Stopped')
+
+
+def get_consumer(consumers: Dict, routing_key: str, queue: str) -> Consumer:
+    """Returns the consumer of the routing key, there's only one per routing key per process."""
+    consumer = consumers.get(routing_key)
+    if consumer is None:
+        def on_closed(closed_consumer):
+            if consumers.get(closed_consumer.routing_key) is closed_consumer:
+                consumers.pop(closed_consumer.routing_key, None)
+
+        consumer = Consumer(routing_key=routing_key, queue=queue, on_closed=on_closed)
+        consumers[routing_key] = consumer
+    return consumer
+
+
+async def stream_subscription(ws,
+                              subscription: Subscription,
+                              instance: Any,
+                              listener: StatusesListener,
+                              lifecycle: Any) -> None:
+    """
+    Sends the subscription's messages to the socket until it closes or the instance is done,
+    the status pushed to the listener is checked whenever no messages arrive.
+    """
+    num_message_retries = 0
+    while True:
+        message = await subscription.get(timeout=SOCKET_SLEEP)
+        if message is None:
+            num_message_retries += 1
+        else:
+            num_message_retries = 0
+            for message in [message] + subscription.get_messages():
+                try:
+                    await ws.send(message)
+                except ConnectionClosed:
+                    return
+
+        # The database is only checked after trying a couple of times
+        if message is None and (listener.is_connected or num_message_retries > MAX_RETRIES):
+            status = await get_last_status(listener=listener, instance=instance)
+            if lifecycle.is_done(status):
+                _logger.info('Closing logs socket because `%s` is done', instance.uuid.hex)
+                return
+            if num_message_retries > MAX_RETRIES:
+                num_message_retries -= CHECK_DELAY
+
+        # Just to check if connection closed
+        if ws._connection_lost:  # pylint:disable=protected-access
+            return
@@ -0,0 +1,57 @@
+import asyncio
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, List
+
+from django.db import close_old_connections
+
+import stats
+
+from streams.constants import DB_POOL_SIZE, LOOP_LAG_INTERVAL, LOOP_LAG_WARNING
+from streams.logger import logger
+
+# A bounded pool, every thread holds its own database connection
+_executor = ThreadPoolExecutor(max_workers=DB_POOL_SIZE)
+
+
+def _run_query(fn: Callable, *args, **kwargs) -> Any:
+    close_old_connections()
+    return fn(*args, **kwargs)
+
+
+async def run_query(fn: Callable, *args, **kwargs) -> Any:
+    """Runs blocking ORM work on the db thread pool instead of the event loop."""
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(_executor, partial(_run_query, fn, *args, **kwargs))
+
+
+def _refresh_from_db(instance: Any) -> None:
+    instance.refresh_from_db()
+    # Loads the status relation here, so that `last_status` does not query from the loop
+    getattr(instance, 'last_status', None)
+
+
+async def refresh_from_db(instance: Any) -> None:
+    await run_query(_refresh_from_db, instance)
+
+
+async def get_experiment_jobs(experiment: 'Experiment') -> List['ExperimentJob']:
+    return await run_query(lambda: list(experiment.jobs.all()))
+
+
+async def get_experiment_jobs_values(experiment: 'Experiment', *fields) -> List[Dict]:
+    return await run_query(lambda: list(experiment.jobs.values(*fields)))
+
+
+async def monitor_loop_lag(app, interval: float = LOOP_LAG_INTERVAL) -> None:
+    """Measures how late the event loop wakes up, i.e. how long it was blocked."""
+    loop = asyncio.get_event_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(loop.time() - start - interval, 0)
+        app.loop_lag = lag
+        stats.timing('streams.loop_lag', lag * 1000)
+        if lag > LOOP_LAG_WARNING:
+            logger.warning('Streams event loop was blocked for %.3fs', lag)
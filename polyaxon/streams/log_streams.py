@@ -0,0 +1,279 @@
+import asyncio
+import json
+import re
+
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from hestia.tz_utils import now
+
+from logs_handlers.log_queries.base import process_log_line
+from streams.constants import LOGS_BATCH_SIZE, LOGS_BATCH_WINDOW, LOGS_BUFFER_SIZE
+from streams.logger import logger
+from streams.resources.utils import notify_ws
+
+CURSOR_REGEX = re.compile(r'^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})(?:\.(\d+))?Z$')
+
+
+def parse_cursor(cursor: Optional[str]) -> Optional[str]:
+    """
+    Normalizes an RFC3339 UTC timestamp, e.g. `2019-01-01T10:00:00.5Z`,
+    to a fixed nanoseconds precision so that cursors can be compared as strings.
+    """
+    match = CURSOR_REGEX.match(cursor or '')
+    if not match:
+        return None
+    fraction = (match.group(2) or '').ljust(9, '0')[:9]
+    return '{}.{}Z'.format(match.group(1), fraction)
+
+
+def parse_cursors(since: Optional[str]) -> Dict[Optional[str], str]:
+    """
+    Parses the `since` param, either a JSON object mapping the pods to the last cursor received
+    from each of them, or a single cursor for all the pods, mapped to `None`.
+    """
+    try:
+        cursors = json.loads(since)
+    except (TypeError, ValueError):
+        cursors = None
+    if not isinstance(cursors, dict):
+        cursors = {None: since}
+    cursors = {pod_id: parse_cursor(cursor) for pod_id, cursor in cursors.items()}
+    return {pod_id: cursor for pod_id, cursor in cursors.items() if cursor}
+
+
+def get_pod_cursor(cursors: Dict[Optional[str], str], pod_id: str) -> Optional[str]:
+    return cursors.get(pod_id, cursors.get(None))
+
+
+def get_log_cursor(log_line: str) -> Optional[str]:
+    """Returns the cursor of a log line based on the timestamp k8s prefixes it with."""
+    return parse_cursor(log_line.split(' ', 1)[0])
+
+
+def get_cursor_age(cursor: str) -> int:
+    """Returns the number of seconds since the cursor."""
+    timestamp = datetime.strptime(cursor[:26], '%Y-%m-%dT%H:%M:%S.%f')
+    return int((now().replace(tzinfo=None) - timestamp).total_seconds()) + 1
+
+
+def filter_log_lines(log_lines: List[str], since: Optional[str]) -> List[str]:
+    """
+    Keeps the lines from the cursor on.
+
+    The lines with the same timestamp as the cursor can't be told apart from the last line received,
+    they are kept, and so are the lines without a timestamp.
+    """
+    if not since:
+        return list(log_lines)
+    return [log_line for log_line in log_lines
+            if (get_log_cursor(log_line) or since) >= since]
+
+
+class PodLogStream(object):
+    """
+    Reads the logs of a single (pod, container) once, and broadcasts every line
+    to all the socket managers subscribed to it.
+
+    The stream is reference counted, every socket acquiring the stream must release it,
+    the upstream reader is stopped as soon as the last socket leaves.
+
+    The latest lines are kept in a bounded ring buffer,
+    late joiners get the recent history without a second upstream request.
+
+    Lines are coalesced for up to `batch_window` seconds or `batch_size` bytes,
+    and sent as a single `{'log_lines': [...], 'cursor': ..., 'pod_id': ...}` frame,
+    the cursor is the k8s timestamp of the last line, sockets reconnecting with `since=<cursor>`,
+    or `since={"<pod_id>": "<cursor>", ...}` for several pods, only get the lines from it.
+    """
+
+    def __init__(self,
+                 streams: Dict,
+                 pod_id: str,
+                 container: str,
+                 namespace: str,
+                 buffer_size: int = LOGS_BUFFER_SIZE,
+                 batch_window: float = LOGS_BATCH_WINDOW,
+                 batch_size: int = LOGS_BATCH_SIZE) -> None:
+        self.streams = streams
+        self.pod_id = pod_id
+        self.container = container
+        self.namespace = namespace
+        self.buffer = deque(maxlen=buffer_size)
+        self.batch_window = batch_window
+        self.batch_size = batch_size
+        self.batch = []
+        self.batch_bytes = 0
+        self._flush_handle = None
+        self.subscribers = {}  # Maps socket managers to their (task_type, task_idx)
+        self.since = {}  # Maps sockets resuming from a cursor, until they catch up, to the cursor
+        self.truncated = False  # Whether the buffer had to discard its oldest lines
+        self.refs = 0
+        self.task = None
+        self.k8s_api = None
+
+    @staticmethod
+    def get_key(pod_id: str, container: str) -> str:
+        return '{}.{}'.format(pod_id, container)
+
+    @property
+    def key(self) -> str:
+        return self.get_key(pod_id=self.pod_id, container=self.container)
+
+    @property
+    def is_done(self) -> bool:
+        return self.task is not None and self.task.done()
+
+    def start(self, k8s_api) -> None:
+        if self.task is None:
+            self.k8s_api = k8s_api
+            self.task = asyncio.ensure_future(self.run(k8s_api))
+
+    def get_message(self, log_lines: List[str], task_type=None, task_idx=None) -> str:
+        return json.dumps({
+            'log_lines': [process_log_line(log_line=log_line,
+                                           task_type=task_type,
+                                           task_idx=task_idx)
+                          for log_line in log_lines],
+            'cursor': get_log_cursor(log_lines[-1]) if log_lines else None,
+            'pod_id': self.pod_id,
+        })
+
+    async def read_history(self, since: str) -> List[str]:
+        """Reads the lines since the cursor that are not in the buffer anymore."""
+        oldest = get_log_cursor(self.buffer[0]) if self.buffer else None
+        try:
+            logs = await self.k8s_api.read_namespaced_pod_log(self.pod_id,
+                                                              self.namespace,
+                                                              container=self.container,
+                                                              since_seconds=get_cursor_age(since),
+                                                              timestamps=True)
+        except Exception as e:  # pylint:disable=broad-except
+            logger.warning('Could not read the logs history of pod `%s`: %s', self.pod_id, e)
+            return []
+        log_lines = [log_line for log_line in logs.split('\n') if log_line]
+        return [log_line for log_line in filter_log_lines(log_lines, since)
+                if not oldest or (get_log_cursor(log_line) or '') < oldest]
+
+    async def acquire(self, ws, ws_manager, task_type=None, task_idx=None, since=None) -> None:
+        self.refs += 1
+        self.subscribers[ws_manager] = (task_type, task_idx)
+        since = parse_cursor(since)
+        log_lines = filter_log_lines(self.buffer, since)
+        if since and self.truncated and len(log_lines) == len(self.buffer):
+            # The cursor is older than the buffer, the gap is read from k8s
+            log_lines = await self.read_history(since) + log_lines
+        if since:
+            # Live lines can still be older than the cursor, e.g. for a new stream
+            self.since[ws] = since
+        if log_lines:
+            # Replay the recent history to the new socket only
+            await notify_ws(ws=ws, message=self.get_message(log_lines=log_lines,
+                                                            task_type=task_type,
+                                                            task_idx=task_idx))
+
+    def release(self, ws=None) -> None:
+        self.refs -= 1
+        self.since.pop(ws, None)
+        if self.refs <= 0:
+            self.close()
+
+    def close(self) -> None:
+        if self.streams.get(self.key) is self:
+            self.streams.pop(self.key, None)
+        if self.task and not self.task.done():
+            logger.info('Stopping logs stream for pod `%s`', self.pod_id)
+            self.task.cancel()
+        self._cancel_flush()
+        self.subscribers = {}
+        self.since = {}
+
+    def broadcast(self, log_lines: List[str]) -> None:
+        for ws_manager, (task_type, task_idx) in list(self.subscribers.items()):
+            if not ws_manager.ws:
+                self.subscribers.pop(ws_manager, None)
+                continue
+            resuming = {ws for ws in ws_manager.ws if ws in self.since}
+            message = self.get_message(log_lines=log_lines, task_type=task_type, task_idx=task_idx)
+            ws_manager.publish(message, size=len(log_lines), sockets=ws_manager.ws - resuming)
+            for ws in resuming:
+                since = self.since[ws]
+                if (get_log_cursor(log_lines[-1]) or '') > since:
+                    # The socket caught up with its cursor
+                    self.since.pop(ws, None)
+                resumed_log_lines = filter_log_lines(log_lines, since)
+                if resumed_log_lines:
+                    ws_manager.publish(self.get_message(log_lines=resumed_log_lines,
+                                                        task_type=task_type,
+                                                        task_idx=task_idx),
+                                       size=len(resumed_log_lines),
+                                       sockets={ws, })
+
+    def _cancel_flush(self) -> None:
+        if self._flush_handle:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+    def add_line(self, log_line: str) -> None:
+        if len(self.buffer) == self.buffer.maxlen:
+            self.truncated = True
+        self.buffer.append(log_line)
+        self.batch.append(log_line)
+        self.batch_bytes += len(log_line)
+        if self.batch_bytes >= self.batch_size:
+            self.flush()
+        elif self._flush_handle is None:
+            loop = asyncio.get_event_loop()
+            self._flush_handle = loop.call_later(self.batch_window, self.flush)
+
+    def flush(self) -> None:
+        self._cancel_flush()
+        if not self.batch:
+            return
+        log_lines = self.batch
+        self.batch = []
+        self.batch_bytes = 0
+        self.broadcast(log_lines)
+
+    async def run(self, k8s_api) -> None:
+        logger.info('Starting logs stream for pod `%s`', self.pod_id)
+        resp = await k8s_api.read_namespaced_pod_log(self.pod_id,
+                                                     self.namespace,
+                                                     container=self.container,
+                                                     follow=True,
+                                                     _preload_content=False,
+                                                     timestamps=True)
+        try:
+            while self.subscribers:
+                try:
+                    log_line = await resp.content.readline()
+                except asyncio.TimeoutError:
+                    log_line = None
+                if not log_line:
+                    break
+                self.add_line(log_line.decode('utf-8'))
+                if not self.batch:
+                    # A full batch was just published, let the senders run
+                    await asyncio.sleep(0)
+        finally:
+            # The streamed response is not released by the client, e.g. if the reader is cancelled
+            resp.close()
+            self.flush()
+
+
+def get_pod_log_stream(streams: Dict,
+                       k8s_api,
+                       pod_id: str,
+                       container: str,
+                       namespace: str) -> PodLogStream:
+    key = PodLogStream.get_key(pod_id=pod_id, container=container)
+    stream = streams.get(key)  # type: Optional[PodLogStream]
+    if stream is None or stream.is_done:
+        stream = PodLogStream(streams=streams,
+                              pod_id=pod_id,
+                              container=container,
+                              namespace=namespace)
+        streams[key] = stream
+    stream.start(k8s_api)
+    return stream
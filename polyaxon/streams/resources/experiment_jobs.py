@@ -6,6 +6,7 @@ import auditor
 import conf
 
 from constants.experiment_jobs import get_experiment_job_container_name
+from constants.jobs import JobLifeCycle
 from db.redis.to_stream import RedisToStream
 from event_manager.events.experiment_job import (
     EXPERIMENT_JOB_LOGS_VIEWED,
@@ -13,29 +14,33 @@ from event_manager.events.experiment_job import (
 )
 from streams.authentication import authorized
 from streams.constants import CHECK_DELAY, RESOURCES_CHECK, SOCKET_SLEEP
+from streams.data_access import run_query
 from streams.logger import logger
 from streams.resources.logs import log_job
 from streams.resources.utils import get_error_message
 from streams.socket_manager import SocketManager
+from streams.statuses import get_last_status
 from streams.validation.experiment_job import validate_experiment_job
 
 
 @authorized()
 async def experiment_job_resources(request, ws, username, project_name, experiment_id, job_id):
-    job, _, message = validate_experiment_job(request=request,
-                                              username=username,
-                                              project_name=project_name,
-                                              experiment_id=experiment_id,
-                                              job_id=job_id)
+    job, _, message = await run_query(validate_experiment_job,
+                                      request=request,
+                                      username=username,
+                                      project_name=project_name,
+                                      experiment_id=experiment_id,
+                                      job_id=job_id)
     if job is None:
         await ws.send(get_error_message(message))
         return
     job_uuid = job.uuid.hex
     job_name = '{}.{}'.format(job.role, job.id)
-    auditor.record(event_type=EXPERIMENT_JOB_RESOURCES_VIEWED,
-                   instance=job,
-                   actor_id=request.app.user.id,
-                   actor_name=request.app.user.username)
+    await run_query(auditor.record,
+                    event_type=EXPERIMENT_JOB_RESOURCES_VIEWED,
+                    instance=job,
+                    actor_id=request.app.user.id,
+                    actor_name=request.app.user.username)
 
     if not RedisToStream.is_monitored_job_resources(job_uuid=job_uuid):
         logger.info('Job resources with uuid `%s` is now being monitored', job_name)
@@ -64,8 +69,8 @@ async def experiment_job_resources(request, ws, username, project_name, experime
 
         # After trying a couple of time, we must check the status of the job
         if should_check > RESOURCES_CHECK:
-            job.refresh_from_db()
-            if job.is_done:
+            last_status = await get_last_status(listener=request.app.statuses, instance=job)
+            if JobLifeCycle.is_done(last_status):
                 logger.info('removing all socket because the job `%s` is done', job_name)
                 ws_manager.ws = set([])
                 handle_job_disconnected_ws(ws)
@@ -89,11 +94,12 @@ async def experiment_job_resources(request, ws, username, project_name, experime
 
 @authorized()
 async def experiment_job_logs_v2(request, ws, username, project_name, experiment_id, job_id):
-    job, experiment, message = validate_experiment_job(request=request,
-                                                       username=username,
-                                                       project_name=project_name,
-                                                       experiment_id=experiment_id,
-                                                       job_id=job_id)
+    job, experiment, message = await run_query(validate_experiment_job,
+                                               request=request,
+                                               username=username,
+                                               project_name=project_name,
+                                               experiment_id=experiment_id,
+                                               job_id=job_id)
     if job is None:
         await ws.send(get_error_message(message))
         return
@@ -103,10 +109,11 @@ async def experiment_job_logs_v2(request, ws, username, project_name, experiment
     container_job_name = get_experiment_job_container_name(backend=experiment.backend,
                                                            framework=experiment.framework)
 
-    auditor.record(event_type=EXPERIMENT_JOB_LOGS_VIEWED,
-                   instance=job,
-                   actor_id=request.app.user.id,
-                   actor_name=request.app.user.username)
+    await run_query(auditor.record,
+                    event_type=EXPERIMENT_JOB_LOGS_VIEWED,
+                    instance=job,
+                    actor_id=request.app.user.id,
+                    actor_name=request.app.user.username)
 
     # Stream logs
     await log_job(request=request,
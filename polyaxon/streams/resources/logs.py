@@ -1,14 +1,15 @@
 import asyncio
-import json
 
 from kubernetes_asyncio import client, config
 
 from constants.experiments import ExperimentLifeCycle
 from constants.jobs import JobLifeCycle
-from logs_handlers.log_queries.base import process_log_line
 from streams.constants import SOCKET_SLEEP
-from streams.resources.utils import get_status_message, notify, notify_ws, should_disconnect
+from streams.data_access import get_experiment_jobs
+from streams.log_streams import get_pod_cursor, get_pod_log_stream, parse_cursors
+from streams.resources.utils import get_status_message, notify_ws, should_disconnect
 from streams.socket_manager import SocketManager
+from streams.statuses import get_last_status, wait_for_status
 
 
 async def log_job(request, ws, job, pod_id, namespace, container):
@@ -24,13 +25,15 @@ async def log_job(request, ws, job, pod_id, namespace, container):
     # Stream phase changes
     status = None
     while status != JobLifeCycle.RUNNING and not JobLifeCycle.is_done(status):
-        job.refresh_from_db()
-        if status != job.last_status:
-            status = job.last_status
+        last_status = await get_last_status(listener=request.app.statuses, instance=job)
+        if status != last_status:
+            status = last_status
             await notify_ws(ws=ws, message=get_status_message(status))
             if should_disconnect(ws=ws, ws_manager=ws_manager):
                 return
-        await asyncio.sleep(SOCKET_SLEEP)
+        if status == JobLifeCycle.RUNNING or JobLifeCycle.is_done(status):
+            break
+        await wait_for_status(listener=request.app.statuses, instance=job)
 
     if JobLifeCycle.is_done(status):
         await notify_ws(ws=ws, message=get_status_message(status))
@@ -38,12 +41,15 @@ async def log_job(request, ws, job, pod_id, namespace, container):
 
     config.load_incluster_config()
     k8s_api = client.CoreV1Api()
-    await log_job_pod(k8s_api=k8s_api,
-                      ws=ws,
-                      ws_manager=ws_manager,
-                      pod_id=pod_id,
-                      container=container,
-                      namespace=namespace)
+    stream = get_pod_log_stream(streams=request.app.pod_log_streams,
+                                k8s_api=k8s_api,
+                                pod_id=pod_id,
+                                container=container,
+                                namespace=namespace)
+    await log_pod_streams(ws=ws,
+                          ws_manager=ws_manager,
+                          streams=[(stream, None, None)],
+                          since=request.args.get('since'))
 
 
 async def log_experiment(request, ws, experiment, namespace, container):
@@ -59,13 +65,15 @@ async def log_experiment(request, ws, experiment, namespace, container):
     # Stream phase changes
     status = None
     while status != ExperimentLifeCycle.RUNNING and not ExperimentLifeCycle.is_done(status):
-        experiment.refresh_from_db()
-        if status != experiment.last_status:
-            status = experiment.last_status
+        last_status = await get_last_status(listener=request.app.statuses, instance=experiment)
+        if status != last_status:
+            status = last_status
             await notify_ws(ws=ws, message=get_status_message(status))
             if should_disconnect(ws=ws, ws_manager=ws_manager):
                 return
-        await asyncio.sleep(SOCKET_SLEEP)
+        if status == ExperimentLifeCycle.RUNNING or ExperimentLifeCycle.is_done(status):
+            break
+        await wait_for_status(listener=request.app.statuses, instance=experiment)
 
     if ExperimentLifeCycle.is_done(status):
         await notify_ws(ws=ws, message=get_status_message(status))
@@ -73,52 +81,40 @@ async def log_experiment(request, ws, experiment, namespace, container):
 
     config.load_incluster_config()
     k8s_api = client.CoreV1Api()
-    log_requests = []
-    for job in experiment.jobs.all():
-        pod_id = job.pod_id
-        log_requests.append(
-            log_job_pod(k8s_api=k8s_api,
-                        ws=ws,
-                        ws_manager=ws_manager,
-                        pod_id=pod_id,
-                        container=container,
-                        namespace=namespace,
-                        task_type=job.role,
-                        task_idx=job.sequence))
-    await asyncio.wait(log_requests)
-
-
-async def log_job_pod(k8s_api,
-                      ws,
-                      ws_manager,
-                      pod_id,
-                      container,
-                      namespace,
-                      task_type=None,
-                      task_idx=None):
-    resp = await k8s_api.read_namespaced_pod_log(pod_id,
-                                                 namespace,
-                                                 container=container,
-                                                 follow=True,
-                                                 _preload_content=False,
-                                                 timestamps=True)
-    should_quite = False
-    while True:
-        try:
-            log_line = await resp.content.readline()
-        except asyncio.TimeoutError:
-            log_line = None
-        if not log_line:
-            break
-        log_line = process_log_line(log_line=log_line.decode('utf-8'),
-                                    task_type=task_type,
-                                    task_idx=task_idx)
-        await notify(ws_manager, json.dumps({'log_lines': log_line}))
-
-        if should_disconnect(ws=ws, ws_manager=ws_manager):
-            should_quite = True
-
-        if should_quite:
-            return
-
-        await asyncio.sleep(0.1)
+    streams = []
+    for job in await get_experiment_jobs(experiment):
+        stream = get_pod_log_stream(streams=request.app.pod_log_streams,
+                                    k8s_api=k8s_api,
+                                    pod_id=job.pod_id,
+                                    container=container,
+                                    namespace=namespace)
+        streams.append((stream, job.role, job.sequence))
+    await log_pod_streams(ws=ws,
+                          ws_manager=ws_manager,
+                          streams=streams,
+                          since=request.args.get('since'))
+
+
+async def log_pod_streams(ws, ws_manager, streams, since=None):
+    """
+    Subscribes the socket to the shared pod log streams until it disconnects,
+    a socket reconnecting with the last cursor it received from every pod resumes from it.
+    """
+    cursors = parse_cursors(since)
+    acquired = []
+    try:
+        for stream, task_type, task_idx in streams:
+            await stream.acquire(ws=ws,
+                                 ws_manager=ws_manager,
+                                 task_type=task_type,
+                                 task_idx=task_idx,
+                                 since=get_pod_cursor(cursors, stream.pod_id))
+            acquired.append(stream)
+
+        while not all(stream.is_done for stream in acquired):
+            if should_disconnect(ws=ws, ws_manager=ws_manager):
+                return
+            await asyncio.sleep(SOCKET_SLEEP)
+    finally:
+        for stream in acquired:
+            stream.release(ws)
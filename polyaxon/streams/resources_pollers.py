@@ -0,0 +1,98 @@
+import asyncio
+
+from typing import Dict, List, Optional
+
+from constants.experiments import ExperimentLifeCycle
+from db.redis.to_stream import RedisToStream
+from streams.constants import CHECK_DELAY, RESOURCES_CHECK, RESOURCES_JOBS_REFRESH, SOCKET_SLEEP
+from streams.data_access import get_experiment_jobs_values, run_query
+from streams.logger import logger
+from streams.socket_manager import SocketManager
+from streams.statuses import get_last_status
+
+
+class ExperimentResourcesPoller(object):
+    """
+    Reads the latest resources of an experiment's jobs once per tick,
+    and publishes the frame to all the sockets watching the experiment.
+
+    The experiment's jobs are cached and only reloaded every `RESOURCES_JOBS_REFRESH` ticks,
+    the poller stops as soon as the last socket leaves or the experiment is done.
+    """
+
+    def __init__(self, pollers: Dict, experiment, statuses, interval: float = SOCKET_SLEEP) -> None:
+        self.pollers = pollers
+        self.experiment = experiment
+        self.experiment_uuid = experiment.uuid.hex
+        self.statuses = statuses
+        self.interval = interval
+        self.ws_manager = SocketManager()
+        self.jobs = []  # type: List[Dict]
+        self.task = None
+
+    @property
+    def is_done(self) -> bool:
+        return self.task is not None and self.task.done()
+
+    def start(self) -> None:
+        if self.task is None:
+            self.task = asyncio.ensure_future(self.run())
+
+    def close(self) -> None:
+        if self.pollers.get(self.experiment_uuid) is self:
+            self.pollers.pop(self.experiment_uuid, None)
+        if self.task and not self.task.done():
+            self.task.cancel()
+        self.ws_manager.remove_sockets(set(self.ws_manager.ws))
+        logger.info('Stopping resources monitor for uuid %s', self.experiment_uuid)
+        RedisToStream.remove_experiment_resources(experiment_uuid=self.experiment_uuid)
+
+    async def load_jobs(self) -> None:
+        jobs = []
+        for job in await get_experiment_jobs_values(self.experiment, 'uuid', 'role', 'id'):
+            job['uuid'] = job['uuid'].hex
+            job['name'] = '{}.{}'.format(job.pop('role'), job.pop('id'))
+            jobs.append(job)
+        self.jobs = jobs
+
+    async def run(self) -> None:
+        ticks = 0
+        should_check = 0
+        try:
+            while self.ws_manager.ws:
+                if ticks % RESOURCES_JOBS_REFRESH == 0:
+                    await self.load_jobs()
+                ticks += 1
+
+                # The redis read is blocking, it runs on the pool instead of the event loop
+                resources = await run_query(RedisToStream.get_raw_latest_experiment_resources,
+                                            self.jobs)
+                self.ws_manager.publish(resources.decode('utf-8'))
+
+                # After trying a couple of time, we must check the status of the experiment
+                should_check += 1
+                if should_check > RESOURCES_CHECK:
+                    last_status = await get_last_status(listener=self.statuses,
+                                                        instance=self.experiment)
+                    if ExperimentLifeCycle.is_done(last_status):
+                        logger.info('removing all socket because the experiment `%s` is done',
+                                    self.experiment_uuid)
+                        return
+                    should_check -= CHECK_DELAY
+
+                await asyncio.sleep(self.interval)
+        finally:
+            self.close()
+
+
+def get_experiment_resources_poller(pollers: Dict,
+                                    experiment,
+                                    statuses) -> ExperimentResourcesPoller:
+    experiment_uuid = experiment.uuid.hex
+    poller = pollers.get(experiment_uuid)  # type: Optional[ExperimentResourcesPoller]
+    if poller is None or poller.is_done:
+        poller = ExperimentResourcesPoller(pollers=pollers,
+                                           experiment=experiment,
+                                           statuses=statuses)
+        pollers[experiment_uuid] = poller
+    return poller
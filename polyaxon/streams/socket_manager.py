@@ -1,6 +1,63 @@
+import asyncio
+import json
+
+from websockets import ConnectionClosed
+
+from streams.constants import SOCKET_QUEUE_SIZE
+
+
+class SocketSender(object):
+    """
+    Sends messages to a single socket through a bounded queue.
+
+    When a slow socket's queue is full, new messages are dropped and summarized
+    once the socket catches up, instead of stalling the other sockets.
+    """
+
+    def __init__(self, ws, on_closed=None, max_size: int = SOCKET_QUEUE_SIZE) -> None:
+        self.ws = ws
+        self.on_closed = on_closed
+        self.queue = asyncio.Queue(maxsize=max_size)
+        self.dropped = 0
+        self.task = asyncio.ensure_future(self.run())
+
+    def put(self, message: str, size: int = 1) -> bool:
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += size
+            return False
+
+    def get_dropped_message(self) -> str:
+        message = json.dumps({
+            'log_lines': ['... {} log lines were dropped, '
+                          'the connection is too slow ...'.format(self.dropped)]
+        })
+        self.dropped = 0
+        return message
+
+    async def run(self) -> None:
+        while True:
+            message = await self.queue.get()
+            try:
+                if self.dropped:
+                    await self.ws.send(self.get_dropped_message())
+                await self.ws.send(message)
+            except ConnectionClosed:
+                if self.on_closed:
+                    self.on_closed(self.ws)
+                return
+
+    def stop(self) -> None:
+        if not self.task.done():
+            self.task.cancel()
+
+
 class SocketManager(object):
     def __init__(self):
         self.ws = set()
+        self.senders = {}
 
     def add_socket(self, ws):
         self.ws.add(ws)
@@ -9,3 +66,19 @@ class SocketManager(object):
         if not isinstance(disconnected_ws, set):
             disconnected_ws = {disconnected_ws, }
         self.ws -= disconnected_ws
+        for ws in disconnected_ws:
+            sender = self.senders.pop(ws, None)
+            if sender:
+                sender.stop()
+
+    def publish(self, message: str, size: int = 1, sockets=None) -> None:
+        """
+        Queues the message for all sockets, or the given ones,
+        without waiting for any of them.
+        """
+        for ws in list(self.ws if sockets is None else sockets):
+            sender = self.senders.get(ws)
+            if sender is None:
+                sender = SocketSender(ws=ws, on_closed=self.remove_sockets)
+                self.senders[ws] = sender
+            sender.put(message, size)
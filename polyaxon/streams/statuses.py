@@ -0,0 +1,127 @@
+import asyncio
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Any, Optional
+
+from redis import RedisError
+
+from db.redis.statuses import RedisStatuses
+from streams.constants import SOCKET_SLEEP, STATUSES_CACHE_SIZE
+from streams.data_access import refresh_from_db
+from streams.logger import logger
+
+
+class StatusesListener(object):
+    """
+    Subscribes once per process to the statuses channel,
+    keeps the latest status of every run seen, and wakes up the coroutines waiting on it.
+
+    The subscription runs in a daemon thread, since redis pub/sub is blocking,
+    and hands the messages to the event loop.
+    """
+
+    def __init__(self, loop, cache_size: int = STATUSES_CACHE_SIZE) -> None:
+        self.loop = loop
+        self.cache_size = cache_size
+        self.statuses = OrderedDict()
+        self.waiters = {}
+        self.is_connected = False
+        self._stopped = False
+        self._pubsub = None
+        self._thread = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._listen, name='streams-statuses', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped = True
+        if self._pubsub is not None:
+            try:
+                self._pubsub.close()
+            except RedisError:
+                pass
+
+    def _listen(self) -> None:
+        while not self._stopped:
+            try:
+                self._pubsub = RedisStatuses.subscribe()
+                # Handled on the loop before the statuses pushed on this subscription
+                self.loop.call_soon_threadsafe(self.reset, True)
+                logger.info('Listening to statuses changes')
+                for message in self._pubsub.listen():
+                    if self._stopped:
+                        break
+                    uuid, status = RedisStatuses.get_message_value(message)
+                    if uuid and status:
+                        self.loop.call_soon_threadsafe(self.set_status, uuid, status)
+            except (RedisError, AttributeError) as e:
+                # AttributeError is raised by redis-py when the connection is closed while listening
+                logger.warning('Statuses subscription was interrupted: %s', e)
+            self.is_connected = False
+            if not self._stopped:
+                self.loop.call_soon_threadsafe(self.reset, False)
+                time.sleep(SOCKET_SLEEP)
+
+    def reset(self, is_connected: bool) -> None:
+        """The statuses pushed while the subscription was down were missed, the cache is stale."""
+        self.statuses.clear()
+        self.is_connected = is_connected
+
+    def get_status(self, uuid: str) -> Optional[str]:
+        return self.statuses.get(uuid)
+
+    def set_status(self, uuid: str, status: str, overwrite: bool = True) -> None:
+        if not overwrite and uuid in self.statuses:
+            return
+        self.statuses[uuid] = status
+        self.statuses.move_to_end(uuid)
+        while len(self.statuses) > self.cache_size:
+            self.statuses.popitem(last=False)
+
+        for waiter in self.waiters.pop(uuid, set()):
+            if not waiter.done():
+                waiter.set_result(status)
+
+    async def wait(self, uuid: str, timeout: float) -> Optional[str]:
+        waiter = self.loop.create_future()
+        self.waiters.setdefault(uuid, set()).add(waiter)
+        try:
+            return await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            waiters = self.waiters.get(uuid)
+            if waiters is not None:
+                waiters.discard(waiter)
+                if not waiters:
+                    self.waiters.pop(uuid, None)
+
+
+async def get_last_status(listener: StatusesListener, instance: Any) -> Optional[str]:
+    """
+    Returns the last status pushed for the instance,
+    and only falls back to the database when the listener can't be trusted.
+    """
+    uuid = instance.uuid.hex
+    if listener.is_connected:
+        status = listener.get_status(uuid)
+        if status is not None:
+            return status
+
+    await refresh_from_db(instance)
+    status = instance.last_status
+    if listener.is_connected and status is not None:
+        # Do not overwrite a status that was pushed in the meantime
+        listener.set_status(uuid, status, overwrite=False)
+        return listener.get_status(uuid)
+    return status
+
+
+async def wait_for_status(listener: StatusesListener, instance: Any) -> None:
+    if listener.is_connected:
+        await listener.wait(instance.uuid.hex, timeout=SOCKET_SLEEP)
+    else:
+        await asyncio.sleep(SOCKET_SLEEP)
@@ -12,11 +12,12 @@ def validate_experiment_job(request, username, project_name, experiment_id, job_
     if experiment is None:
         return None, None, message
     try:
-        job = ExperimentJob.objects.get(experiment=experiment, id=job_id)
+        # Going through the related manager caches `job.experiment`
+        job = experiment.jobs.get(id=job_id)
     except (ExperimentJob.DoesNotExist, ValidationError):
         return None, None, 'Experiment was not found'
     if job.is_done:
-        return None, 'Experiment job is not running, current status: {}'.format(
+        return None, None, 'Experiment job is not running, current status: {}'.format(
             job.last_status
         )
     return job, experiment, None
@@ -0,0 +1,37 @@
+import os
+import tempfile
+
+import pytest
+
+from mock import MagicMock
+
+from api.utils.files import query_logs_file
+from tests.utils import BaseTest
+
+
+@pytest.mark.logs_heandlers_mark
+class TestQueryLogsFile(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.log_path = os.path.join(tempfile.mkdtemp(), 'logs')
+
+    def write_logs(self):
+        with open(self.log_path, 'w') as log_file:
+            log_file.write('line\n')
+
+    def test_reuses_recent_logs(self):
+        query_logs = MagicMock(side_effect=self.write_logs)
+        for _ in range(3):
+            log_path = query_logs_file(self.log_path, query_logs=query_logs, max_age=60)
+            assert log_path == self.log_path
+        assert query_logs.call_count == 1
+
+        # The logs are queried again once the file is gone
+        os.remove(self.log_path)
+        query_logs_file(self.log_path, query_logs=query_logs, max_age=60)
+        assert query_logs.call_count == 2
+
+        # Without a max age, the logs are always queried
+        query_logs_file(self.log_path, query_logs=query_logs)
+        query_logs_file(self.log_path, query_logs=query_logs)
+        assert query_logs.call_count == 4
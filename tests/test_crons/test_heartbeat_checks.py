@@ -2,9 +2,12 @@ import pytest
 
 from mock import patch
 
+from django.conf import settings
+
 from constants.experiments import ExperimentLifeCycle
 from constants.jobs import JobLifeCycle
 from crons.tasks.heartbeats import heartbeat_builds, heartbeat_experiments, heartbeat_jobs
+from db.redis.heartbeat import RedisHeartBeat, RedisSortedHeartBeat
 from factories.factory_build_jobs import BuildJobFactory, BuildJobStatusFactory
 from factories.factory_experiments import ExperimentFactory, ExperimentStatusFactory
 from factories.factory_jobs import JobFactory, JobStatusFactory
@@ -60,3 +63,39 @@ class TestHeartBeatCrons(BaseTest):
             heartbeat_builds()
 
         assert mock_fct.call_count == 1
+
+    def test_heartbeat_checks_only_stale_runs(self):
+        experiments = [ExperimentFactory() for _ in range(3)]
+        for experiment in experiments:
+            ExperimentStatusFactory(experiment=experiment, status=ExperimentLifeCycle.RUNNING)
+        RedisHeartBeat.experiment_ping(experiment_id=experiments[0].id)
+        RedisHeartBeat.experiment_ping(experiment_id=experiments[2].id)
+
+        with patch('db.redis.heartbeat.HEARTBEATS_CHUNK_SIZE', 2):
+            with patch('scheduler.tasks.experiments'
+                       '.experiments_check_heartbeat.apply_async') as mock_fct:
+                with patch.object(RedisHeartBeat, 'experiments_are_alive',
+                                  wraps=RedisHeartBeat.experiments_are_alive) as mock_alive:
+                    heartbeat_experiments()
+
+        assert mock_alive.call_count == 2
+        assert mock_fct.call_count == 1
+        assert mock_fct.call_args[0][1] == {'experiment_id': experiments[1].id}
+
+    def test_heartbeat_checks_only_stale_runs_with_sorted_set(self):
+        jobs = [JobFactory() for _ in range(3)]
+        for job in jobs:
+            JobStatusFactory(job=job, status=JobLifeCycle.RUNNING)
+        with self.settings(HEARTBEAT_BACKEND=settings.HEARTBEAT_BACKEND_SORTED_SET):
+            RedisSortedHeartBeat.clear(RedisSortedHeartBeat.KEY_JOBS, [job.id for job in jobs])
+            RedisHeartBeat.jobs_ping([jobs[0].id])
+            RedisSortedHeartBeat.ping(RedisSortedHeartBeat.KEY_JOBS, [jobs[1].id], timestamp=0)
+
+            with patch('scheduler.tasks.jobs.jobs_check_heartbeat.apply_async') as mock_fct:
+                with patch.object(RedisSortedHeartBeat, 'get_pings') as mock_pings:
+                    heartbeat_jobs()
+
+        # The stale job and the job that never pinged are checked with a single range query
+        assert mock_pings.call_count == 0
+        assert sorted(call[0][1]['job_id'] for call in mock_fct.call_args_list) == [
+            jobs[1].id, jobs[2].id]
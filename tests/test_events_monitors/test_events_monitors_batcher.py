@@ -0,0 +1,87 @@
+import pytest
+
+from mock import MagicMock
+
+from constants.jobs import JobLifeCycle
+from monitor_statuses.batcher import StatusesBatcher
+from monitor_statuses.coalescer import StatusesCoalescer
+from polyaxon.settings import K8SEventsCeleryTasks
+from tests.utils import BaseTest
+
+
+def get_pod_state(job_uuid, status):
+    return {
+        'status': status,
+        'message': None,
+        'details': {'labels': {'job_uuid': job_uuid}, 'node_name': None},
+    }
+
+
+@pytest.mark.monitors_mark
+class TestStatusesBatcher(BaseTest):
+    TASK = K8SEventsCeleryTasks.K8S_EVENTS_HANDLE_EXPERIMENT_JOB_STATUSES
+
+    def setUp(self):
+        super().setUp()
+        self.send_task = MagicMock()
+        self.send_batch = MagicMock()
+
+    def get_batches(self):
+        return [[(p['details']['labels']['job_uuid'], p['status']) for p in call[0][0]]
+                for call in self.send_batch.call_args_list]
+
+    def test_sends_batches(self):
+        batcher = StatusesBatcher(send_task=self.send_task,
+                                  send_batch=self.send_batch,
+                                  batch_interval=100,
+                                  batch_size=3)
+        batcher.add(self.TASK, get_pod_state('job1', JobLifeCycle.RUNNING))
+        batcher.add(self.TASK, get_pod_state('job2', JobLifeCycle.RUNNING))
+        assert self.send_batch.call_count == 0
+        batcher.add(self.TASK, get_pod_state('job1', JobLifeCycle.SUCCEEDED))
+        batcher.add(self.TASK, get_pod_state('job3', JobLifeCycle.RUNNING))
+        batcher.flush()
+        batcher.flush()
+        assert self.get_batches() == [
+            [('job1', JobLifeCycle.RUNNING),
+             ('job2', JobLifeCycle.RUNNING),
+             ('job1', JobLifeCycle.SUCCEEDED)],
+            [('job3', JobLifeCycle.RUNNING)],
+        ]
+        assert self.send_task.call_count == 0
+
+    def test_sends_right_away_without_interval(self):
+        batcher = StatusesBatcher(send_task=self.send_task,
+                                  send_batch=self.send_batch,
+                                  batch_interval=0,
+                                  batch_size=100)
+        batcher.add(self.TASK, get_pod_state('job1', JobLifeCycle.RUNNING))
+        batcher.add(self.TASK, get_pod_state('job2', JobLifeCycle.RUNNING))
+        assert self.get_batches() == [[('job1', JobLifeCycle.RUNNING)],
+                                      [('job2', JobLifeCycle.RUNNING)]]
+
+    def test_sends_other_tasks(self):
+        batcher = StatusesBatcher(send_task=self.send_task,
+                                  send_batch=self.send_batch,
+                                  batch_interval=100,
+                                  batch_size=100)
+        pod_state = get_pod_state('job1', JobLifeCycle.RUNNING)
+        batcher.add(K8SEventsCeleryTasks.K8S_EVENTS_HANDLE_JOB_STATUSES, pod_state)
+        self.send_task.assert_called_once_with(
+            K8SEventsCeleryTasks.K8S_EVENTS_HANDLE_JOB_STATUSES, pod_state)
+        assert self.send_batch.call_count == 0
+
+    def test_batches_coalesced_states(self):
+        batcher = StatusesBatcher(send_task=self.send_task,
+                                  send_batch=self.send_batch,
+                                  batch_interval=100,
+                                  batch_size=100)
+        coalescer = StatusesCoalescer(send_task=batcher.add, window=100, max_jobs=100)
+        for job_uuid in ('job1', 'job2', 'job3'):
+            coalescer.add(self.TASK, get_pod_state(job_uuid, JobLifeCycle.RUNNING))
+            coalescer.add(self.TASK, get_pod_state(job_uuid, JobLifeCycle.SUCCEEDED))
+        coalescer.flush()
+        batcher.flush()
+        assert self.get_batches() == [[('job1', JobLifeCycle.SUCCEEDED),
+                                       ('job2', JobLifeCycle.SUCCEEDED),
+                                       ('job3', JobLifeCycle.SUCCEEDED)]]
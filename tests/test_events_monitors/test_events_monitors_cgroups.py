@@ -0,0 +1,176 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+from mock import MagicMock, patch
+
+from constants.containers import ContainerStatuses
+from monitor_resources import monitor
+from monitor_resources.cgroups import CgroupSampler
+from tests.utils import BaseTest
+
+
+class BaseTestCgroupSampler(BaseTest):
+    CONTAINER_ID = 'a1b2c3d4'
+
+    def setUp(self):
+        super().setUp()
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+        super().tearDown()
+
+    def write_files(self, path, files):
+        path = os.path.join(self.root, path)
+        os.makedirs(path, exist_ok=True)
+        for name, value in files.items():
+            with open(os.path.join(path, name), 'w') as f:
+                f.write('{}\n'.format(value))
+
+    @staticmethod
+    def sample(sampler, container_id, timestamp):
+        with patch('monitor_resources.cgroups.time.monotonic', return_value=timestamp):
+            return sampler.sample(container_id)
+
+
+@pytest.mark.monitors_mark
+class TestCgroupV1Sampler(BaseTestCgroupSampler):
+    def set_usage(self, percpu_usage, memory_used, memory_limit=4000):
+        container_path = 'kubepods/burstable/pod1234/{}'.format(self.CONTAINER_ID)
+        self.write_files(os.path.join('cpu,cpuacct', container_path), {
+            'cpuacct.usage': sum(percpu_usage),
+            'cpuacct.usage_percpu': ' '.join(str(usage) for usage in percpu_usage),
+        })
+        self.write_files(os.path.join('memory', container_path), {
+            'memory.usage_in_bytes': memory_used,
+            'memory.limit_in_bytes': memory_limit,
+        })
+
+    def test_sample(self):
+        sampler = CgroupSampler(root=self.root)
+        assert sampler.is_v2 is False
+
+        self.set_usage([1000000000, 0], memory_used=1000)
+        # The first sample has no delta
+        assert self.sample(sampler, self.CONTAINER_ID, timestamp=10) is None
+
+        # 1.5s of cpu over 2s
+        self.set_usage([2000000000, 500000000], memory_used=2000)
+        assert self.sample(sampler, self.CONTAINER_ID, timestamp=12) == {
+            'cpu_percentage': 75.,
+            'percpu_percentage': [50., 25.],
+            'memory_used': 2000,
+            'memory_limit': 4000,
+        }
+
+    def test_sample_unlimited_memory(self):
+        sampler = CgroupSampler(root=self.root, host_memory=8000)
+        self.set_usage([1000000000, 0], memory_used=1000)
+        self.sample(sampler, self.CONTAINER_ID, timestamp=10)
+
+        # No limit on the container
+        self.set_usage([1000000000, 0], memory_used=1000, memory_limit=9223372036854771712)
+        assert self.sample(sampler, self.CONTAINER_ID, timestamp=11)['memory_limit'] is None
+
+        # A limit above the host's memory is not enforced either
+        self.set_usage([1000000000, 0], memory_used=1000, memory_limit=16000)
+        assert self.sample(sampler, self.CONTAINER_ID, timestamp=12)['memory_limit'] is None
+
+        self.set_usage([1000000000, 0], memory_used=1000, memory_limit=8000 - 4096)
+        assert self.sample(sampler, self.CONTAINER_ID, timestamp=13)['memory_limit'] == 3904
+
+    def test_sample_missing_container(self):
+        self.set_usage([1000000000, 0], memory_used=1000)
+        sampler = CgroupSampler(root=self.root)
+        assert self.sample(sampler, 'unknown', timestamp=10) is None
+        assert sampler.get_paths('unknown') is None
+
+    def test_sample_removed_container(self):
+        self.set_usage([1000000000, 0], memory_used=1000)
+        sampler = CgroupSampler(root=self.root)
+        self.sample(sampler, self.CONTAINER_ID, timestamp=10)
+        assert sampler.get_paths(self.CONTAINER_ID) is not None
+
+        shutil.rmtree(os.path.join(self.root, 'memory'))
+        assert self.sample(sampler, self.CONTAINER_ID, timestamp=12) is None
+        assert self.CONTAINER_ID not in sampler._paths
+        assert self.CONTAINER_ID not in sampler._samples
+
+    def test_prune(self):
+        self.set_usage([1000000000, 0], memory_used=1000)
+        sampler = CgroupSampler(root=self.root)
+        self.sample(sampler, self.CONTAINER_ID, timestamp=10)
+        sampler.prune([self.CONTAINER_ID])
+        assert self.CONTAINER_ID in sampler._samples
+        sampler.prune([])
+        assert sampler._paths == {}
+        assert sampler._samples == {}
+
+
+@pytest.mark.monitors_mark
+class TestCgroupV2Sampler(BaseTestCgroupSampler):
+    def setUp(self):
+        super().setUp()
+        self.write_files('', {'cgroup.controllers': 'cpu memory'})
+
+    def set_usage(self, usage_usec, memory_used, memory_limit='max'):
+        self.write_files('system.slice/docker-{}.scope'.format(self.CONTAINER_ID), {
+            'cpu.stat': 'usage_usec {}\nuser_usec {}\nsystem_usec 0'.format(
+                usage_usec, usage_usec),
+            'memory.current': memory_used,
+            'memory.max': memory_limit,
+        })
+
+    def test_sample(self):
+        sampler = CgroupSampler(root=self.root)
+        assert sampler.is_v2 is True
+
+        self.set_usage(1000000, memory_used=1000)
+        assert self.sample(sampler, self.CONTAINER_ID, timestamp=10) is None
+
+        # 0.5s of cpu over 1s
+        self.set_usage(1500000, memory_used=2000)
+        assert self.sample(sampler, self.CONTAINER_ID, timestamp=11) == {
+            'cpu_percentage': 50.,
+            'percpu_percentage': [],
+            'memory_used': 2000,
+            'memory_limit': None,
+        }
+
+        self.set_usage(1500000, memory_used=2000, memory_limit=3000)
+        assert self.sample(sampler, self.CONTAINER_ID, timestamp=12)['memory_limit'] == 3000
+
+    def test_get_container_resources(self):
+        node = MagicMock(cpu=2, memory=8000)
+        container = MagicMock(id=self.CONTAINER_ID, status=ContainerStatuses.RUNNING)
+        container.stats.return_value = {
+            'precpu_stats': {'cpu_usage': {'total_usage': 100}, 'system_cpu_usage': 1000},
+            'cpu_stats': {'cpu_usage': {'total_usage': 200, 'percpu_usage': [100, 100]},
+                          'system_cpu_usage': 2000},
+            'memory_stats': {'usage': 1000, 'limit': 4000},
+        }
+        job = ('job_uuid', 'experiment_uuid')
+        sampler = CgroupSampler(root=self.root)
+
+        # Docker is the fallback until the cgroup has a previous sample
+        self.set_usage(1000000, memory_used=1000)
+        with patch('monitor_resources.cgroups.time.monotonic', return_value=10):
+            resources = monitor.get_container_resources(
+                node, container, gpu_resources=None, job=job, sampler=sampler)
+        assert container.stats.call_count == 1
+        assert resources.cpu_percentage == 20.
+        assert resources.memory_limit == 4000
+
+        self.set_usage(1500000, memory_used=2000)
+        with patch('monitor_resources.cgroups.time.monotonic', return_value=11):
+            resources = monitor.get_container_resources(
+                node, container, gpu_resources=None, job=job, sampler=sampler)
+        assert container.stats.call_count == 1
+        assert resources.cpu_percentage == 50.
+        assert resources.n_cpus == 2
+        assert resources.memory_used == 2000
+        # No limit on the container, the node's memory is the limit
+        assert resources.memory_limit == 8000
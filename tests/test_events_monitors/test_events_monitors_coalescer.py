@@ -0,0 +1,120 @@
+import pytest
+
+from mock import MagicMock, patch
+
+from constants.jobs import JobLifeCycle
+from monitor_statuses import monitor
+from monitor_statuses.coalescer import StatusesCoalescer
+from polyaxon.settings import K8SEventsCeleryTasks
+from tests.utils import BaseTest
+
+
+def get_pod_state(job_uuid, status, message=None, container_state=None):
+    return {
+        'status': status,
+        'message': message,
+        'details': {
+            'labels': {'job_uuid': job_uuid},
+            'node_name': 'node1',
+            'container_statuses': {'polyaxon-experiment-job': {'state': container_state}},
+        }
+    }
+
+
+@pytest.mark.monitors_mark
+class TestStatusesCoalescer(BaseTest):
+    TASK = 'task'
+
+    def setUp(self):
+        super().setUp()
+        self.send_task = MagicMock()
+
+    def get_sent(self):
+        return [(call[0][0], call[0][1]['status'], call[0][1]['details']['labels']['job_uuid'])
+                for call in self.send_task.call_args_list]
+
+    def test_drops_unchanged_states(self):
+        coalescer = StatusesCoalescer(send_task=self.send_task, window=0, max_jobs=100)
+        assert coalescer.add(self.TASK, get_pod_state('job1', JobLifeCycle.BUILDING)) is True
+        assert coalescer.add(self.TASK, get_pod_state('job1', JobLifeCycle.BUILDING)) is False
+        assert coalescer.add(self.TASK, get_pod_state('job2', JobLifeCycle.BUILDING)) is True
+        assert coalescer.is_transition(get_pod_state('job1', JobLifeCycle.BUILDING)) is False
+        assert coalescer.add(self.TASK, get_pod_state('job1', JobLifeCycle.RUNNING)) is True
+        # A change of the message or of the container's state is a transition
+        assert coalescer.add(
+            self.TASK, get_pod_state('job1', JobLifeCycle.RUNNING, message='restarted')) is True
+        assert coalescer.add(
+            self.TASK, get_pod_state('job1',
+                                     JobLifeCycle.RUNNING,
+                                     message='restarted',
+                                     container_state={'running': {}})) is True
+        assert self.get_sent() == [(self.TASK, JobLifeCycle.BUILDING, 'job1'),
+                                   (self.TASK, JobLifeCycle.BUILDING, 'job2'),
+                                   (self.TASK, JobLifeCycle.RUNNING, 'job1'),
+                                   (self.TASK, JobLifeCycle.RUNNING, 'job1'),
+                                   (self.TASK, JobLifeCycle.RUNNING, 'job1')]
+
+    def test_coalesces_bursts(self):
+        coalescer = StatusesCoalescer(send_task=self.send_task, window=100, max_jobs=100)
+        coalescer.add(self.TASK, get_pod_state('job1', JobLifeCycle.BUILDING))
+        coalescer.add(self.TASK, get_pod_state('job2', JobLifeCycle.BUILDING))
+        coalescer.add(self.TASK, get_pod_state('job1', JobLifeCycle.RUNNING))
+        coalescer.add(self.TASK, get_pod_state('job1', JobLifeCycle.SUCCEEDED))
+        assert self.send_task.call_count == 0
+        coalescer.flush()
+        assert self.get_sent() == [(self.TASK, JobLifeCycle.SUCCEEDED, 'job1'),
+                                   (self.TASK, JobLifeCycle.BUILDING, 'job2')]
+
+        # A burst ending on the state already sent is dropped
+        coalescer.add(self.TASK, get_pod_state('job2', JobLifeCycle.RUNNING))
+        coalescer.add(self.TASK, get_pod_state('job2', JobLifeCycle.BUILDING))
+        coalescer.flush()
+        assert self.send_task.call_count == 2
+
+    def test_keeps_latest_jobs(self):
+        coalescer = StatusesCoalescer(send_task=self.send_task, window=0, max_jobs=2)
+        for job_uuid in ('job1', 'job2', 'job3'):
+            coalescer.add(self.TASK, get_pod_state(job_uuid, JobLifeCycle.RUNNING))
+        assert list(coalescer._sent.keys()) == ['job2', 'job3']
+        assert coalescer.add(self.TASK, get_pod_state('job1', JobLifeCycle.RUNNING)) is True
+
+    def test_sends_states_without_job(self):
+        coalescer = StatusesCoalescer(send_task=self.send_task, window=100, max_jobs=100)
+        pod_state = {'status': JobLifeCycle.RUNNING, 'details': {'labels': {}}}
+        assert coalescer.add(self.TASK, pod_state) is True
+        assert coalescer.add(self.TASK, pod_state) is True
+        assert self.send_task.call_count == 2
+
+
+@pytest.mark.monitors_mark
+class TestHandleJobCondition(BaseTest):
+    TASK = K8SEventsCeleryTasks.K8S_EVENTS_HANDLE_EXPERIMENT_JOB_STATUSES
+
+    def handle(self, pod_state, coalescer):
+        monitor.handle_job_condition(task=self.TASK,
+                                     event_object={},
+                                     pod_state=pod_state,
+                                     status=pod_state['status'],
+                                     labels=pod_state['details']['labels'],
+                                     container_name='container',
+                                     coalescer=coalescer)
+
+    @patch('monitor_statuses.monitor.update_job_containers')
+    def test_handle_job_condition(self, update_job_containers):
+        send_task = MagicMock()
+        coalescer = StatusesCoalescer(send_task=send_task, window=0, max_jobs=100)
+        self.handle(get_pod_state('job1', JobLifeCycle.RUNNING), coalescer)
+        self.handle(get_pod_state('job1', JobLifeCycle.RUNNING), coalescer)
+        self.handle(get_pod_state('job1', JobLifeCycle.SUCCEEDED), coalescer)
+        # The containers are not updated for the unchanged states
+        assert update_job_containers.call_count == 2
+        assert [call[0][1]['status'] for call in send_task.call_args_list] == [
+            JobLifeCycle.RUNNING, JobLifeCycle.SUCCEEDED]
+
+    @patch('monitor_statuses.monitor.update_job_containers')
+    def test_handle_job_condition_without_coalescer(self, update_job_containers):
+        with patch('monitor_statuses.monitor.celery_app.send_task') as mock_send_task:
+            self.handle(get_pod_state('job1', JobLifeCycle.RUNNING), None)
+            self.handle(get_pod_state('job1', JobLifeCycle.RUNNING), None)
+        assert update_job_containers.call_count == 2
+        assert mock_send_task.call_count == 2
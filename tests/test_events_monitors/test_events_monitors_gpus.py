@@ -0,0 +1,139 @@
+import pytest
+
+from mock import MagicMock, patch
+
+from db.models.clusters import Cluster
+from db.models.nodes import NodeGPU
+from factories.factory_clusters import ClusterNodeFactory
+from monitor_resources import monitor
+from monitor_resources.gpus import GPUCollector
+from tests.utils import BaseTest
+
+
+class FakeNVMLError(Exception):
+    pass
+
+
+def get_fake_nvml(device_count):
+    nvml = MagicMock()
+    nvml.NVMLError = FakeNVMLError
+    nvml.nvmlDeviceGetCount.return_value = device_count
+    nvml.nvmlDeviceGetHandleByIndex.side_effect = lambda index: 'handle{}'.format(index)
+    nvml.nvmlDeviceGetName.side_effect = lambda handle: b'Tesla'
+    nvml.nvmlDeviceGetUUID.side_effect = lambda handle: 'uuid-{}'.format(handle)
+    nvml.nvmlDeviceGetSerial.side_effect = FakeNVMLError
+    nvml.nvmlDeviceGetMinorNumber.side_effect = lambda handle: 0
+    nvml.nvmlDeviceGetMemoryInfo.return_value = MagicMock(free=1000, used=3000, total=4000)
+    nvml.nvmlDeviceGetUtilizationRates.return_value = MagicMock(gpu=50, memory=75)
+    nvml.nvmlDeviceGetPowerUsage.return_value = 100000
+    nvml.nvmlDeviceGetEnforcedPowerLimit.return_value = 250000
+    nvml.nvmlDeviceGetComputeRunningProcesses.return_value = []
+    nvml.nvmlDeviceGetGraphicsRunningProcesses.return_value = []
+    return nvml
+
+
+@pytest.mark.monitors_mark
+class TestGPUCollector(BaseTest):
+    def test_query(self):
+        nvml = get_fake_nvml(device_count=2)
+        with patch('monitor_resources.gpus.N', nvml):
+            collector = GPUCollector()
+            gpus = collector.query()
+            assert collector.query() == gpus
+
+        assert [gpu['index'] for gpu in gpus] == [0, 1]
+        assert gpus[0]['name'] == 'Tesla'
+        assert gpus[0]['uuid'] == 'uuid-handle0'
+        assert gpus[0]['serial'] is None
+        assert gpus[0]['memory_total'] == 4000
+        assert gpus[0]['utilization_gpu'] == 50
+        assert gpus[0]['power_draw'] == 100
+        assert gpus[0]['power_limit'] == 250
+        assert gpus[0]['processes'] == []
+        # The session and the static information are kept between the sweeps
+        assert nvml.nvmlInit.call_count == 1
+        assert nvml.nvmlDeviceGetName.call_count == 2
+        assert nvml.nvmlDeviceGetMemoryInfo.call_count == 4
+
+    def test_query_restarts_on_error(self):
+        nvml = get_fake_nvml(device_count=1)
+        with patch('monitor_resources.gpus.N', nvml):
+            collector = GPUCollector()
+            collector.query()
+            nvml.nvmlDeviceGetCount.side_effect = FakeNVMLError
+            assert collector.query() == []
+            assert nvml.nvmlShutdown.call_count == 1
+            nvml.nvmlDeviceGetCount.side_effect = None
+            assert len(collector.query()) == 1
+        assert nvml.nvmlInit.call_count == 2
+
+    def test_query_refreshes_gpus(self):
+        nvml = get_fake_nvml(device_count=1)
+        with patch('monitor_resources.gpus.N', nvml):
+            collector = GPUCollector()
+            assert len(collector.query()) == 1
+            nvml.nvmlDeviceGetCount.return_value = 2
+            assert len(collector.query()) == 2
+        assert nvml.nvmlInit.call_count == 2
+
+    def test_query_without_nvml(self):
+        nvml = get_fake_nvml(device_count=1)
+        nvml.nvmlInit.side_effect = FakeNVMLError
+        with patch('monitor_resources.gpus.N', nvml):
+            collector = GPUCollector()
+            assert collector.query() == []
+            assert collector.query() == []
+        assert collector.is_available is False
+        assert nvml.nvmlInit.call_count == 1
+
+    def test_get_container_gpu_indices(self):
+        collector = GPUCollector()
+        container = MagicMock(id='container1')
+        container.attrs = {'HostConfig': {'Devices': [{'PathOnHost': '/dev/nvidia1'},
+                                                      {'PathOnHost': '/dev/nvidiactl'},
+                                                      {'PathOnHost': '/dev/nvidia3'}]}}
+        assert collector.get_container_gpu_indices(container) == [1, 3]
+        container.attrs = {}
+        assert collector.get_container_gpu_indices(container) == [1, 3]
+        collector.prune([])
+        assert collector._container_gpu_indices == {}
+
+
+@pytest.mark.monitors_mark
+class TestUpdateClusterNode(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.node = ClusterNodeFactory(cluster=Cluster.load())
+        self.gpus = {
+            0: {'serial': 'serial0', 'name': 'Tesla', 'memory_total': 4000},
+            1: {'serial': 'serial1', 'name': 'Tesla', 'memory_total': 4000},
+        }
+
+    def get_node_gpus(self):
+        return list(NodeGPU.objects.filter(cluster_node=self.node).order_by('index').values_list(
+            'index', 'serial', 'name', 'memory'))
+
+    def test_update_cluster_node(self):
+        collector = GPUCollector()
+        monitor.update_cluster_node(self.node, self.gpus, collector)
+        assert self.get_node_gpus() == [(0, 'serial0', 'Tesla', 4000),
+                                        (1, 'serial1', 'Tesla', 4000)]
+
+        # Nothing is read or written as long as the gpus do not change
+        with self.assertNumQueries(0):
+            monitor.update_cluster_node(self.node, self.gpus, collector)
+
+        self.gpus[1] = dict(self.gpus[1], memory_total=8000)
+        with self.assertNumQueries(2):
+            monitor.update_cluster_node(self.node, self.gpus, collector)
+        assert self.get_node_gpus() == [(0, 'serial0', 'Tesla', 4000),
+                                        (1, 'serial1', 'Tesla', 8000)]
+
+    def test_update_cluster_node_reads_stored_gpus_once(self):
+        monitor.update_cluster_node(self.node, self.gpus)
+        collector = GPUCollector()
+        with self.assertNumQueries(1):
+            monitor.update_cluster_node(self.node, self.gpus, collector)
+        with self.assertNumQueries(0):
+            monitor.update_cluster_node(self.node, self.gpus, collector)
+        assert NodeGPU.objects.filter(cluster_node=self.node).count() == 2
@@ -0,0 +1,98 @@
+import pytest
+
+from kubernetes.client import V1Event, V1EventSource, V1ObjectMeta, V1ObjectReference
+from mock import MagicMock, patch
+
+from db.models.clusters import Cluster
+from monitor_namespace import monitor
+from monitor_namespace.aggregator import EventsAggregator
+from tests.utils import BaseTest
+
+
+def get_event(name, reason, event_type='Warning'):
+    return {
+        'type': 'ADDED',
+        'object': V1Event(metadata=V1ObjectMeta(name='{}.event'.format(name)),
+                          involved_object=V1ObjectReference(kind='Pod', name=name),
+                          reason=reason,
+                          message='message',
+                          source=V1EventSource(component='kubelet', host='node1'),
+                          type=event_type),
+    }
+
+
+@pytest.mark.monitors_mark
+class TestEventsAggregator(BaseTest):
+    def test_add(self):
+        aggregator = EventsAggregator(window=10, max_keys=100)
+        assert aggregator.add(('pod1', 'BackOff'), timestamp=0) == 1
+        assert aggregator.add(('pod1', 'BackOff'), timestamp=1) is None
+        assert aggregator.add(('pod1', 'BackOff'), timestamp=2) is None
+        assert aggregator.add(('pod1', 'Failed'), timestamp=2) == 1
+        assert aggregator.add(('pod2', 'BackOff'), timestamp=2) == 1
+        # The repeated occurrences are reported with the next one after the window
+        assert aggregator.add(('pod1', 'BackOff'), timestamp=11) == 3
+        assert aggregator.add(('pod1', 'BackOff'), timestamp=25) == 1
+
+    def test_keeps_latest_keys(self):
+        aggregator = EventsAggregator(window=10, max_keys=2)
+        for key in ('key1', 'key2', 'key3'):
+            aggregator.add(key, timestamp=0)
+        assert list(aggregator._keys.keys()) == ['key2', 'key3']
+        assert aggregator.add('key1', timestamp=1) == 1
+
+
+@pytest.mark.monitors_mark
+class TestNamespaceMonitor(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.cluster = Cluster.load()
+        self.k8s_manager = MagicMock(namespace='polyaxon')
+
+    def run_monitor(self, events, aggregator=None):
+        event_watch = MagicMock()
+        event_watch.stream.return_value = iter(events)
+        with patch('monitor_namespace.monitor.celery_app.send_task') as mock_send_task:
+            monitor.run(self.k8s_manager,
+                        self.cluster,
+                        event_watch=event_watch,
+                        aggregator=aggregator)
+        return [call[1]['kwargs']['payload'] for call in mock_send_task.call_args_list]
+
+    def test_reports_warnings_of_polyaxon_objects(self):
+        with self.settings(K8S_EVENTS_OBJECT_PREFIXES=['plx-']):
+            payloads = self.run_monitor([
+                get_event('plx-job-1234-abcd', 'Failed'),
+                get_event('plx-job-1234-abcd', 'Pulled', event_type='Normal'),
+                get_event('other-pod-1234', 'Failed'),
+            ])
+        assert len(payloads) == 1
+        assert payloads[0]['level'] == 'warning'
+        assert payloads[0]['data']['name'] == 'plx-job'
+        assert payloads[0]['data']['count'] == 1
+        assert payloads[0]['meta']['involved_object'] == {'kind': 'Pod',
+                                                          'name': 'plx-job-1234-abcd'}
+
+        with self.settings(K8S_EVENTS_OBJECT_PREFIXES=[]):
+            payloads = self.run_monitor([get_event('other-pod-1234', 'Failed')])
+        assert len(payloads) == 1
+
+        # The objects are not filtered by default
+        payloads = self.run_monitor([get_event('polyaxon-api-1234', 'Failed')])
+        assert len(payloads) == 1
+
+    def test_aggregates_repeated_events(self):
+        aggregator = EventsAggregator(window=100, max_keys=100)
+        with self.settings(K8S_EVENTS_OBJECT_PREFIXES=['plx-']):
+            payloads = self.run_monitor([
+                get_event('plx-job-1234-abcd', 'BackOff'),
+                get_event('plx-job-1234-abcd', 'BackOff'),
+                get_event('plx-job-1234-abcd', 'Failed'),
+                get_event('plx-job-5678-abcd', 'BackOff'),
+                get_event('plx-job-1234-abcd', 'BackOff'),
+            ], aggregator=aggregator)
+        assert [(p['meta']['involved_object']['name'], p['data']['reason ']) for p in payloads] == [
+            ('plx-job-1234-abcd', 'BackOff'),
+            ('plx-job-1234-abcd', 'Failed'),
+            ('plx-job-5678-abcd', 'BackOff'),
+        ]
@@ -0,0 +1,94 @@
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from mock import MagicMock, patch
+
+from constants.containers import ContainerStatuses
+from db.redis.containers import RedisJobContainers
+from db.redis.to_stream import RedisToStream
+from factories.factory_experiments import ExperimentJobFactory
+from monitor_resources import monitor
+from tests.utils import BaseTest
+
+
+class FakeContainer(object):
+    def __init__(self, docker_client, container_id):
+        self.docker_client = docker_client
+        self.id = container_id
+        self.name = container_id
+        self.status = ContainerStatuses.RUNNING
+        self.attrs = {'HostConfig': {'Devices': []}}
+
+    def stats(self, decode, stream):
+        assert stream is False
+        with self.docker_client.lock:
+            self.docker_client.running += 1
+            self.docker_client.max_running = max(self.docker_client.max_running,
+                                                 self.docker_client.running)
+        # Docker samples the stats for a while
+        time.sleep(0.1)
+        with self.docker_client.lock:
+            self.docker_client.running -= 1
+        return {
+            'precpu_stats': {'cpu_usage': {'total_usage': 100}, 'system_cpu_usage': 1000},
+            'cpu_stats': {'cpu_usage': {'total_usage': 200, 'percpu_usage': [100, 100]},
+                          'system_cpu_usage': 2000},
+            'memory_stats': {'usage': 1000, 'limit': 4000},
+        }
+
+
+class FakeDockerClient(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.containers = MagicMock()
+        self.containers.get.side_effect = lambda container_id: FakeContainer(self, container_id)
+
+
+@pytest.mark.monitors_mark
+class TestMonitorResources(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.jobs = [ExperimentJobFactory() for _ in range(6)]
+        RedisJobContainers.monitor_containers({
+            'container{}'.format(i): job.uuid.hex for i, job in enumerate(self.jobs)})
+        for job in self.jobs:
+            RedisToStream.monitor_job_resources(job.uuid.hex)
+        self.node = MagicMock(cpu=2)
+        self.docker_client = FakeDockerClient()
+
+    def get_latest_resources(self):
+        return [RedisToStream.get_latest_job_resources(job.uuid.hex, job.uuid.hex, True)
+                for job in self.jobs]
+
+    @patch('monitor_resources.monitor.get_gpu_resources', return_value=[])
+    def test_run(self, _):
+        with patch('monitor_resources.monitor.docker_client', self.docker_client):
+            monitor.run(containers={}, node=self.node, persist=False)
+        assert self.docker_client.max_running == 1
+        for job, resources in zip(self.jobs, self.get_latest_resources()):
+            assert resources['job_uuid'] == job.uuid.hex
+            assert resources['memory_used'] == 1000
+            assert resources['cpu_percentage'] == 20.0
+
+    @patch('monitor_resources.monitor.get_gpu_resources', return_value=[])
+    def test_run_concurrently(self, _):
+        containers = {}
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            with patch('monitor_resources.monitor.docker_client', self.docker_client):
+                start = time.monotonic()
+                monitor.run(containers=containers,
+                            node=self.node,
+                            persist=False,
+                            executor=executor)
+                duration = time.monotonic() - start
+        assert self.docker_client.max_running == 3
+        # 6 containers sampled by 3 workers
+        assert duration < 0.5
+        assert len(containers) == 6
+        assert all(self.get_latest_resources())
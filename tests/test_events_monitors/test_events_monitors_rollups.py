@@ -0,0 +1,56 @@
+import pytest
+
+from monitor_resources.rollups import ResourcesRollup
+from tests.utils import BaseTest
+
+
+@pytest.mark.monitors_mark
+class TestResourcesRollup(BaseTest):
+    @staticmethod
+    def get_payload(cpu_percentage, memory_used, gpu_utilization=None):
+        payload = {
+            'job_uuid': 'job1',
+            'cpu_percentage': cpu_percentage,
+            'memory_used': memory_used,
+            'memory_limit': 1000,
+        }
+        if gpu_utilization is not None:
+            payload['gpu_resources'] = [{'index': 0, 'utilization_gpu': gpu_utilization}]
+        return payload
+
+    def test_rollup(self):
+        rollup = ResourcesRollup(resolutions=(10, 60))
+        rollup.add('job1', self.get_payload(10., 100, 50), timestamp=61)
+        rollup.add('job1', self.get_payload(30., 300, 100), timestamp=65)
+        # The buckets are still open
+        assert rollup.pop_points(timestamp=69) == {}
+
+        rollup.add('job1', self.get_payload(20., 200), timestamp=70)
+        points = rollup.pop_points(timestamp=70)
+        assert points == {('job1', 10): [{
+            'timestamp': 60,
+            'count': 2,
+            'cpu_percentage': 20.,
+            'cpu_percentage_max': 30.,
+            'memory_used': 200.,
+            'memory_used_max': 300,
+            'memory_limit': 1000,
+            'gpu_resources': [{'index': 0, 'utilization_gpu': 75.}],
+        }]}
+
+        points = rollup.pop_points(timestamp=120)
+        assert sorted(points) == [('job1', 10), ('job1', 60)]
+        assert points[('job1', 10)][0]['timestamp'] == 70
+        assert points[('job1', 60)][0]['timestamp'] == 60
+        assert points[('job1', 60)][0]['count'] == 3
+        assert points[('job1', 60)][0]['cpu_percentage'] == 20.
+        # Nothing is kept once the buckets are over
+        assert rollup.pop_points(timestamp=1000) == {}
+
+    def test_rollup_without_pop(self):
+        rollup = ResourcesRollup(resolutions=(10,))
+        rollup.add('job1', self.get_payload(10., 100), timestamp=1)
+        rollup.add('job1', self.get_payload(10., 100), timestamp=11)
+        rollup.add('job1', self.get_payload(10., 100), timestamp=21)
+        points = rollup.pop_points(timestamp=25)
+        assert [point['timestamp'] for point in points[('job1', 10)]] == [0, 10]
@@ -10,16 +10,18 @@ import conf
 
 from constants.jobs import JobLifeCycle
 from db.models.build_jobs import BuildJobStatus
-from db.models.experiment_jobs import ExperimentJobStatus
+from db.models.experiment_jobs import ExperimentJob, ExperimentJobStatus
 from db.models.jobs import JobStatus
 from db.models.notebooks import NotebookJobStatus
 from db.models.tensorboards import TensorboardJobStatus
+from db.redis.heartbeat import RedisHeartBeat
 from factories.factory_build_jobs import BuildJobFactory
-from factories.factory_experiments import ExperimentJobFactory
+from factories.factory_experiments import ExperimentFactory, ExperimentJobFactory
 from factories.factory_jobs import JobFactory
 from factories.factory_plugins import NotebookJobFactory, TensorboardJobFactory
 from factories.factory_projects import ProjectFactory
 from k8s_events_handlers.tasks.statuses import (
+    k8s_events_batch_experiment_job_statuses,
     k8s_events_handle_build_job_statuses,
     k8s_events_handle_experiment_job_statuses,
     k8s_events_handle_job_statuses,
@@ -169,5 +171,124 @@ class TestEventsDockerizerJobsStatusesHandling(TestEventsBaseJobsStatusesHandlin
         return BuildJobFactory(uuid=job_uuid, project=project)
 
 
+@pytest.mark.monitors_mark
+class TestEventsExperimentJobsStatusesBatchHandling(BaseTest):
+    @staticmethod
+    def get_payload(job, status, node_name=None, created_at=None):
+        return {
+            'status': status,
+            'created_at': created_at.isoformat() if created_at else None,
+            'message': None,
+            'details': {
+                'labels': {'job_uuid': job.uuid.hex},
+                'node_name': node_name,
+                'container_statuses': {},
+            },
+        }
+
+    def get_statuses(self, job):
+        return list(ExperimentJobStatus.objects.filter(job=job).values_list('status', flat=True))
+
+    def test_handle_k8s_events_job_statuses_batch_same_as_single_payloads(self):
+        job_state = get_job_state(
+            event_type=status_experiment_job_event_with_conditions['type'],
+            event=status_experiment_job_event_with_conditions['object'],
+            created_at=timezone.now() + datetime.timedelta(days=1),
+            job_container_names=(conf.get('CONTAINER_NAME_EXPERIMENT_JOB'),),
+            experiment_type_label=conf.get('TYPE_LABELS_RUNNER'))
+        job = ExperimentJobFactory(uuid=job_state.details.labels.job_uuid.hex)
+
+        k8s_events_batch_experiment_job_statuses([job_state.to_dict()])
+        assert set(self.get_statuses(job)) == {JobLifeCycle.CREATED, JobLifeCycle.FAILED}
+
+    def test_handle_k8s_events_job_statuses_batch(self):
+        experiment = ExperimentFactory()
+        job1 = ExperimentJobFactory(experiment=experiment)
+        job2 = ExperimentJobFactory(experiment=experiment)
+        job3 = ExperimentJobFactory()
+        payloads = [
+            self.get_payload(job1, JobLifeCycle.SCHEDULED, node_name='node1'),
+            self.get_payload(job2, JobLifeCycle.RUNNING, node_name='node2'),
+            self.get_payload(job1, JobLifeCycle.RUNNING, node_name='node1'),
+            # Not a valid transition
+            self.get_payload(job1, JobLifeCycle.RUNNING, node_name='node1'),
+            self.get_payload(job2, JobLifeCycle.SUCCEEDED, node_name='node2'),
+            # The job is already done
+            self.get_payload(job2, JobLifeCycle.RUNNING, node_name='node2'),
+            self.get_payload(job3, JobLifeCycle.BUILDING),
+            {'status': JobLifeCycle.RUNNING,
+             'message': None,
+             'details': {'labels': {'job_uuid': 'unknown'}, 'node_name': None}},
+        ]
+        with patch('k8s_events_handlers.tasks.statuses.auditor.record') as auditor_record:
+            with patch('k8s_events_handlers.tasks.statuses.publish_status') as publish_status:
+                k8s_events_batch_experiment_job_statuses(payloads)
+
+        assert self.get_statuses(job1) == [JobLifeCycle.CREATED,
+                                           JobLifeCycle.SCHEDULED,
+                                           JobLifeCycle.RUNNING]
+        assert self.get_statuses(job2) == [JobLifeCycle.CREATED,
+                                           JobLifeCycle.RUNNING,
+                                           JobLifeCycle.SUCCEEDED]
+        assert self.get_statuses(job3) == [JobLifeCycle.CREATED, JobLifeCycle.BUILDING]
+
+        job1 = ExperimentJob.objects.get(id=job1.id)
+        job2 = ExperimentJob.objects.get(id=job2.id)
+        job3 = ExperimentJob.objects.get(id=job3.id)
+        assert job1.last_status == JobLifeCycle.RUNNING
+        assert job1.node_scheduled == 'node1'
+        assert job1.started_at is not None
+        assert job1.finished_at is None
+        assert job2.last_status == JobLifeCycle.SUCCEEDED
+        assert job2.node_scheduled == 'node2'
+        assert job2.finished_at is not None
+        assert job3.last_status == JobLifeCycle.BUILDING
+        assert job3.node_scheduled is None
+
+        # The side effects run once per job
+        assert publish_status.call_count == 3
+        assert auditor_record.call_count == 3
+        # The experiments of the running jobs are pinged
+        assert RedisHeartBeat.experiment_is_alive(experiment.id) is True
+        assert RedisHeartBeat.experiment_is_alive(job3.experiment_id) is False
+
+    def test_handle_k8s_events_job_statuses_batch_out_of_order(self):
+        created_at = timezone.now()
+        payloads = [
+            (JobLifeCycle.RUNNING, created_at + datetime.timedelta(minutes=2)),
+            # Received after the running status, but scheduled before
+            (JobLifeCycle.SCHEDULED, created_at + datetime.timedelta(minutes=1)),
+            # Not a valid transition from the status before it
+            (JobLifeCycle.RUNNING, created_at + datetime.timedelta(minutes=3)),
+        ]
+        job = ExperimentJobFactory()
+        batch_job = ExperimentJobFactory()
+        with patch('k8s_events_handlers.tasks.statuses.auditor.record'):
+            with patch('k8s_events_handlers.tasks.statuses.publish_status'):
+                for status, status_date in payloads:
+                    k8s_events_handle_experiment_job_statuses(
+                        self.get_payload(job, status, created_at=status_date))
+                k8s_events_batch_experiment_job_statuses(
+                    [self.get_payload(batch_job, status, created_at=status_date)
+                     for status, status_date in payloads])
+
+        assert self.get_statuses(job) == [JobLifeCycle.CREATED,
+                                          JobLifeCycle.SCHEDULED,
+                                          JobLifeCycle.RUNNING]
+        assert self.get_statuses(batch_job) == self.get_statuses(job)
+
+    def test_handle_k8s_events_job_statuses_batch_queries(self):
+        jobs = [ExperimentJobFactory() for _ in range(5)]
+        payloads = [self.get_payload(job, status, node_name='node1')
+                    for status in (JobLifeCycle.SCHEDULED, JobLifeCycle.RUNNING)
+                    for job in jobs]
+        with patch('k8s_events_handlers.tasks.statuses.auditor.record'):
+            with patch('k8s_events_handlers.tasks.statuses.publish_status'):
+                # Select, savepoint, nodes update, statuses insert, jobs update, release
+                with self.assertNumQueries(6):
+                    k8s_events_batch_experiment_job_statuses(payloads)
+        assert ExperimentJobStatus.objects.filter(status=JobLifeCycle.RUNNING).count() == 5
+
+
 # Prevent this base class from running tests
 del TestEventsBaseJobsStatusesHandling
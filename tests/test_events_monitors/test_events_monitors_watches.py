@@ -0,0 +1,119 @@
+import itertools
+
+import pytest
+
+from mock import MagicMock, patch
+
+from db.redis.watches import RedisWatches
+from libs.k8s_watch import ResumableWatch
+from tests.utils import BaseTest
+
+
+def get_object(resource_version):
+    return MagicMock(metadata=MagicMock(resource_version=resource_version))
+
+
+def get_objects(resource_version, items, continue_token=None):
+    return MagicMock(items=items,
+                     metadata=MagicMock(resource_version=resource_version,
+                                        _continue=continue_token))
+
+
+def get_event(resource_version, event_type='MODIFIED'):
+    return {'type': event_type, 'object': get_object(resource_version)}
+
+
+def get_gone_event():
+    return {'type': 'ERROR', 'object': get_object(None), 'raw_object': {'code': 410}}
+
+
+@pytest.mark.monitors_mark
+class TestResumableWatch(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.list_func = MagicMock()
+        self.watch = MagicMock()
+        patcher = patch('libs.k8s_watch.watch.Watch', return_value=self.watch)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_watch(self):
+        return ResumableWatch(name='test',
+                              list_func=self.list_func,
+                              page_size=2,
+                              persist_interval=0,
+                              namespace='polyaxon')
+
+    @staticmethod
+    def get_resource_versions(events):
+        return [event['object'].metadata.resource_version for event in events]
+
+    def test_lists_objects_by_pages_on_first_start(self):
+        self.list_func.side_effect = [
+            get_objects('10', [get_object('1'), get_object('2')], continue_token='token'),
+            get_objects('10', [get_object('3')]),
+        ]
+        self.watch.stream.side_effect = [iter([get_event('11')])]
+        resumable_watch = self.get_watch()
+        events = list(itertools.islice(resumable_watch.stream(), 4))
+
+        assert self.get_resource_versions(events) == ['1', '2', '3', '11']
+        assert [event['type'] for event in events] == ['ADDED', 'ADDED', 'ADDED', 'MODIFIED']
+        assert self.list_func.call_args_list[0][1] == {'namespace': 'polyaxon', 'limit': 2}
+        assert self.list_func.call_args_list[1][1] == {'namespace': 'polyaxon',
+                                                       'limit': 2,
+                                                       '_continue': 'token'}
+        assert self.watch.stream.call_args[1]['resource_version'] == '10'
+        # The last event was not handled, the next one was never requested
+        assert RedisWatches.get_resource_version('test') == '10'
+        assert resumable_watch.counters == {'restarts': 0, 'relists': 1}
+
+    def test_resumes_from_persisted_resource_version(self):
+        RedisWatches.set_resource_version('test', '20')
+        self.watch.stream.side_effect = [iter([get_event('21')]), iter([get_event('22')])]
+        resumable_watch = self.get_watch()
+        events = list(itertools.islice(resumable_watch.stream(), 2))
+
+        assert self.get_resource_versions(events) == ['21', '22']
+        assert self.list_func.call_count == 0
+        # The watch timed out and was resumed from the last resource version seen
+        assert [call[1]['resource_version'] for call in self.watch.stream.call_args_list] == [
+            '20', '21']
+        assert RedisWatches.get_resource_version('test') == '21'
+        assert resumable_watch.counters == {'restarts': 1, 'relists': 0}
+
+    def test_relists_when_resource_version_is_gone(self):
+        RedisWatches.set_resource_version('test', '20')
+        self.watch.stream.side_effect = [iter([get_gone_event()]), iter([get_event('31')])]
+        self.list_func.return_value = get_objects(
+            '30', [get_object('15'), get_object('20'), get_object('25')])
+        resumable_watch = self.get_watch()
+        events = list(itertools.islice(resumable_watch.stream(), 2))
+
+        # The objects not modified since the last resource version seen are dropped
+        assert self.get_resource_versions(events) == ['25', '31']
+        assert self.watch.stream.call_args[1]['resource_version'] == '30'
+        assert RedisWatches.get_resource_version('test') == '30'
+        assert resumable_watch.counters == {'restarts': 0, 'relists': 1}
+
+    def test_persists_handled_events_once_flushed(self):
+        RedisWatches.set_resource_version('test', '20')
+        self.watch.stream.side_effect = [iter([get_event('21'), get_event('22')])]
+        flushed = []
+        resumable_watch = ResumableWatch(
+            name='test',
+            list_func=self.list_func,
+            persist_interval=0,
+            flush=lambda: flushed.append(RedisWatches.get_resource_version('test')),
+            namespace='polyaxon')
+        events = resumable_watch.stream()
+
+        next(events)
+        assert RedisWatches.get_resource_version('test') == '20'
+        # Requesting the next event means the first one was handled
+        next(events)
+        assert flushed == ['20']
+        assert RedisWatches.get_resource_version('test') == '21'
+
+        events.close()
+        assert RedisWatches.get_resource_version('test') == '21'
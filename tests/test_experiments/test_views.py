@@ -45,6 +45,7 @@ from db.models.repos import CodeReference
 from db.redis.ephemeral_tokens import RedisEphemeralTokens
 from db.redis.group_check import GroupChecks
 from db.redis.heartbeat import RedisHeartBeat
+from db.redis.resources import RedisResourcesSeries
 from db.redis.tll import RedisTTL
 from factories.factory_code_reference import CodeReferenceFactory
 from factories.factory_experiment_groups import ExperimentGroupFactory
@@ -2539,6 +2540,64 @@ class TestExperimentChartViewDetailViewV1(BaseViewTest):
         assert self.model_class.objects.count() == 0
 
 
+@pytest.mark.experiments_mark
+class TestExperimentResourcesViewV1(BaseViewTest):
+    HAS_AUTH = True
+
+    def setUp(self):
+        super().setUp()
+        project = ProjectFactory(user=self.auth_client.user)
+        self.experiment = ExperimentFactory(project=project)
+        self.job1 = ExperimentJobFactory(experiment=self.experiment, role='master', sequence=0)
+        self.job2 = ExperimentJobFactory(experiment=self.experiment, role='worker', sequence=1)
+        self.url = '/{}/{}/{}/experiments/{}/resources'.format(
+            API_V1,
+            project.user.username,
+            project.name,
+            self.experiment.id)
+        RedisResourcesSeries.add_points({
+            (self.job1.uuid.hex, 10): [{'timestamp': 10, 'cpu_percentage': 10.},
+                                       {'timestamp': 20, 'cpu_percentage': 20.}],
+            (self.job1.uuid.hex, 60): [{'timestamp': 0, 'cpu_percentage': 15.}],
+            (self.job2.uuid.hex, 10): [{'timestamp': 20, 'cpu_percentage': 30.}],
+        })
+
+    def test_get(self):
+        resp = self.auth_client.get(self.url)
+        assert resp.status_code == status.HTTP_200_OK
+        assert resp.data == {
+            'resolution': 10,
+            'jobs': [{
+                'uuid': self.job1.uuid.hex,
+                'replica': 'master.0',
+                'points': [{'timestamp': 10, 'cpu_percentage': 10.},
+                           {'timestamp': 20, 'cpu_percentage': 20.}],
+            }, {
+                'uuid': self.job2.uuid.hex,
+                'replica': 'worker.1',
+                'points': [{'timestamp': 20, 'cpu_percentage': 30.}],
+            }]
+        }
+
+    def test_get_resolution_since(self):
+        resp = self.auth_client.get(self.url + '?resolution=60')
+        assert resp.status_code == status.HTTP_200_OK
+        assert [job['points'] for job in resp.data['jobs']] == [
+            [{'timestamp': 0, 'cpu_percentage': 15.}], []]
+
+        resp = self.auth_client.get(self.url + '?since=15')
+        assert resp.status_code == status.HTTP_200_OK
+        assert [job['points'] for job in resp.data['jobs']] == [
+            [{'timestamp': 20, 'cpu_percentage': 20.}],
+            [{'timestamp': 20, 'cpu_percentage': 30.}]]
+
+    def test_get_wrong_resolution(self):
+        resp = self.auth_client.get(self.url + '?resolution=30')
+        assert resp.status_code == status.HTTP_400_BAD_REQUEST
+        resp = self.auth_client.get(self.url + '?resolution=foo')
+        assert resp.status_code == status.HTTP_400_BAD_REQUEST
+
+
 @pytest.mark.experiments_mark
 class TestExperimentHeartBeatViewV1(BaseViewTest):
     HAS_AUTH = True
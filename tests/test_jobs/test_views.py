@@ -18,6 +18,7 @@ from api.jobs.serializers import (
     JobSerializer,
     JobStatusSerializer
 )
+from api.utils.files import LOGS_CURSOR_HEADER
 from api.utils.views.protected import ProtectedView
 from constants.jobs import JobLifeCycle
 from constants.urls import API_V1
@@ -28,6 +29,7 @@ from db.redis.tll import RedisTTL
 from factories.factory_jobs import JobFactory, JobStatusFactory
 from factories.factory_projects import ProjectFactory
 from factories.fixtures import job_spec_parsed_content
+from libs.log_blocks import compact_log_file, get_blocks_index_path, get_blocks_path
 from schemas.specifications import JobSpecification
 from tests.utils import BaseFilesViewTest, BaseViewTest
 
@@ -763,6 +765,201 @@ class TestJobLogsViewV1(BaseViewTest):
         assert len(data) == len(self.logs)
         assert data == self.logs
 
+    @patch.dict('api.utils.files._queried_logs', clear=True)
+    @patch('api.jobs.views.process_logs')
+    def test_get_ranges_non_done_job(self, process_logs):
+        process_logs.side_effect = lambda **kwargs: self.create_logs(temp=True)
+        with self.settings(LOGS_RANGE_CACHE_TTL=100):
+            resp = self.auth_client.get(self.url, HTTP_RANGE='bytes=0-9')
+            content = ''.join('{}\n'.format(line) for line in self.logs).encode('utf-8')
+            assert b''.join(resp._iterator) == content[:10]  # pylint:disable=protected-access
+            resp = self.auth_client.get(self.url, HTTP_RANGE='bytes=10-19')
+            assert b''.join(resp._iterator) == content[10:20]  # pylint:disable=protected-access
+            resp = self.auth_client.get('{}?offset=2&limit=4'.format(self.url))
+            data = b''.join(resp._iterator)  # pylint:disable=protected-access
+            assert data.decode('utf-8').splitlines() == self.logs[2:6]
+        # The logs queried by the first range are reused
+        assert process_logs.call_count == 1
+
+        # The whole logs are queried again
+        resp = self.auth_client.get(self.url)
+        assert resp.status_code == status.HTTP_200_OK
+        assert process_logs.call_count == 2
+
+    def test_get_since_cursor(self):
+        self.job.set_status(JobLifeCycle.SUCCEEDED)
+        self.create_logs(temp=False)
+        resp = self.auth_client.get(self.url)
+        assert resp.status_code == status.HTTP_200_OK
+        cursor = int(resp[LOGS_CURSOR_HEADER])
+        assert cursor == len(''.join('{}\n'.format(line) for line in self.logs))
+
+        # Resuming from the first line's end only returns the rest
+        since = len(self.logs[0]) + 1
+        resp = self.auth_client.get('{}?since={}'.format(self.url, since))
+        assert resp.status_code == status.HTTP_200_OK
+        assert int(resp[LOGS_CURSOR_HEADER]) == cursor
+        data = [i for i in resp._iterator]  # pylint:disable=protected-access
+        data = [d for d in data[0].decode('utf-8').split('\n') if d]
+        assert data == self.logs[1:]
+
+        # Resuming from the cursor returns nothing new
+        resp = self.auth_client.get('{}?since={}'.format(self.url, cursor))
+        assert resp.status_code == status.HTTP_200_OK
+        assert resp['Content-Length'] == '0'
+
+        resp = self.auth_client.get('{}?since=foo'.format(self.url))
+        assert resp.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_get_tail_and_lines_range(self):
+        self.job.set_status(JobLifeCycle.SUCCEEDED)
+        self.create_logs(temp=False)
+
+        resp = self.auth_client.get('{}?tail=3'.format(self.url))
+        assert resp.status_code == status.HTTP_200_OK
+        data = [i for i in resp._iterator]  # pylint:disable=protected-access
+        assert b''.join(data).decode('utf-8').splitlines() == self.logs[-3:]
+
+        resp = self.auth_client.get('{}?offset=2&limit=4'.format(self.url))
+        assert resp.status_code == status.HTTP_200_OK
+        data = [i for i in resp._iterator]  # pylint:disable=protected-access
+        assert b''.join(data).decode('utf-8').splitlines() == self.logs[2:6]
+
+        resp = self.auth_client.get('{}?tail=-1'.format(self.url))
+        assert resp.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_get_range(self):
+        self.job.set_status(JobLifeCycle.SUCCEEDED)
+        self.create_logs(temp=False)
+        content = ''.join('{}\n'.format(line) for line in self.logs).encode('utf-8')
+
+        resp = self.auth_client.get(self.url, HTTP_RANGE='bytes=0-9')
+        assert resp.status_code == status.HTTP_206_PARTIAL_CONTENT
+        assert resp['Content-Range'] == 'bytes 0-9/{}'.format(len(content))
+        assert b''.join(resp._iterator) == content[:10]  # pylint:disable=protected-access
+
+        resp = self.auth_client.get(self.url, HTTP_RANGE='bytes=-5')
+        assert resp.status_code == status.HTTP_206_PARTIAL_CONTENT
+        assert b''.join(resp._iterator) == content[-5:]  # pylint:disable=protected-access
+
+        resp = self.auth_client.get(self.url, HTTP_RANGE='bytes={}-'.format(len(content)))
+        assert resp.status_code == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+
+    def compact_logs(self, log_path, block_size):
+        compact_log_file(log_path, block_size=block_size)
+        self.addCleanup(os.remove, get_blocks_path(log_path))
+        self.addCleanup(os.remove, get_blocks_index_path(log_path))
+
+    def test_get_compacted_logs(self):
+        self.job.set_status(JobLifeCycle.SUCCEEDED)
+        self.create_logs(temp=False)
+        content = ''.join('{}\n'.format(line) for line in self.logs).encode('utf-8')
+        log_path = stores.get_job_logs_path(job_name=self.job.unique_name, temp=False)
+        self.compact_logs(log_path, block_size=100)
+        assert os.path.exists(log_path) is False
+
+        resp = self.auth_client.get(self.url)
+        assert resp.status_code == status.HTTP_200_OK
+        assert int(resp[LOGS_CURSOR_HEADER]) == len(content)
+        assert b''.join(resp._iterator) == content  # pylint:disable=protected-access
+
+        resp = self.auth_client.get('{}?tail=3'.format(self.url))
+        data = b''.join(resp._iterator)  # pylint:disable=protected-access
+        assert data.decode('utf-8').splitlines() == self.logs[-3:]
+
+        resp = self.auth_client.get('{}?offset=2&limit=4'.format(self.url))
+        data = b''.join(resp._iterator)  # pylint:disable=protected-access
+        assert data.decode('utf-8').splitlines() == self.logs[2:6]
+
+        resp = self.auth_client.get(self.url, HTTP_RANGE='bytes=5-104')
+        assert resp.status_code == status.HTTP_206_PARTIAL_CONTENT
+        assert b''.join(resp._iterator) == content[5:105]  # pylint:disable=protected-access
+
+    def test_get_time_window(self):
+        self.job.set_status(JobLifeCycle.SUCCEEDED)
+        self.logs = ['2019-01-01 10:00:0{} UTC -- line {}'.format(i, i) for i in range(6)]
+        log_path = stores.get_job_logs_path(job_name=self.job.unique_name, temp=False)
+        stores.create_job_logs_path(job_name=self.job.unique_name, temp=False)
+        with open(log_path, 'w') as file:
+            file.write(''.join('{}\n'.format(line) for line in self.logs))
+
+        url = '{}?start_time=2019-01-01T10:00:02Z&end_time=2019-01-01T10:00:04Z'.format(self.url)
+        resp = self.auth_client.get(url)
+        data = b''.join(resp._iterator)  # pylint:disable=protected-access
+        assert data.decode('utf-8').splitlines() == self.logs[2:5]
+
+        self.compact_logs(log_path, block_size=50)
+        resp = self.auth_client.get(url)
+        data = b''.join(resp._iterator)  # pylint:disable=protected-access
+        assert data.decode('utf-8').splitlines() == self.logs[2:5]
+
+        resp = self.auth_client.get('{}?start_time=foo'.format(self.url))
+        assert resp.status_code == status.HTTP_400_BAD_REQUEST
+
+    @patch('api.jobs.views.process_logs')
+    @patch('api.jobs.views.tail_logs')
+    def test_get_tail_non_done_job(self, tail_logs, process_logs):
+        tail_logs.return_value = '\n'.join(self.logs[-2:])
+        resp = self.auth_client.get('{}?tail=2'.format(self.url))
+        assert resp.status_code == status.HTTP_200_OK
+        assert resp.content.decode('utf-8').splitlines() == self.logs[-2:]
+        assert tail_logs.call_args[1]['tail_lines'] == 2
+        assert tail_logs.call_args[1]['since_seconds'] is None
+        assert process_logs.call_count == 0
+
+        resp = self.auth_client.get('{}?since_seconds=30'.format(self.url))
+        assert resp.status_code == status.HTTP_200_OK
+        assert tail_logs.call_args[1]['tail_lines'] is None
+        assert tail_logs.call_args[1]['since_seconds'] == 30
+        assert process_logs.call_count == 0
+
+
+@pytest.mark.jobs_mark
+class TestJobLogsSearchViewV1(BaseViewTest):
+    HAS_AUTH = True
+
+    def setUp(self):
+        super().setUp()
+        project = ProjectFactory(user=self.auth_client.user)
+        self.job = JobFactory(project=project)
+        self.url = '/{}/{}/{}/jobs/{}/logs/search'.format(
+            API_V1,
+            project.user.username,
+            project.name,
+            self.job.id)
+        self.logs = ['2019-01-01 10:00:0{} UTC -- {} {}'.format(i, 'error' if i % 2 else 'info', i)
+                     for i in range(10)]
+
+    def create_logs(self, temp=False):
+        log_path = stores.get_job_logs_path(job_name=self.job.unique_name, temp=temp)
+        stores.create_job_logs_path(job_name=self.job.unique_name, temp=temp)
+        with open(log_path, 'w') as file:
+            file.write(''.join('{}\n'.format(line) for line in self.logs))
+
+    def search(self, query):
+        resp = self.auth_client.get('{}?{}'.format(self.url, query))
+        assert resp.status_code == status.HTTP_200_OK
+        data = b''.join(resp._iterator)  # pylint:disable=protected-access
+        return data.decode('utf-8').splitlines()
+
+    def test_search(self):
+        self.job.set_status(JobLifeCycle.SUCCEEDED)
+        self.create_logs()
+
+        assert self.search('q=error') == self.logs[1::2]
+        assert self.search('q=error&limit=2') == self.logs[1:4:2]
+        assert self.search('q=info&since=2019-01-01T10:00:04&until=2019-01-01T10:00:06') == [
+            self.logs[4], self.logs[6]]
+
+        resp = self.auth_client.get('{}?q=['.format(self.url))
+        assert resp.status_code == status.HTTP_400_BAD_REQUEST
+
+    @patch('api.jobs.views.process_logs')
+    def test_search_non_done_job(self, process_logs):
+        process_logs.side_effect = lambda **kwargs: self.create_logs(temp=True)
+        assert self.search('q=info&limit=1') == self.logs[:1]
+        assert process_logs.call_count == 1
+
 
 @pytest.mark.jobs_mark
 class DownloadJobOutputsViewTest(BaseViewTest):
@@ -0,0 +1,144 @@
+import fcntl
+import gzip
+import os
+import tempfile
+import threading
+
+import pytest
+
+from libs.log_blocks import (
+    compact_log_file,
+    get_blocks_index,
+    get_blocks_lines_range,
+    get_blocks_path,
+    get_blocks_tail_offset,
+    get_blocks_time_range,
+    get_compacted_index,
+    is_compacted,
+    read_log_blocks
+)
+from libs.log_files import get_time_range
+from tests.utils import BaseTest
+
+
+@pytest.mark.libs_mark
+class TestLogBlocks(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.log_path = os.path.join(tempfile.mkdtemp(), 'logs')
+        self.lines = ['2019-01-01 10:{:02d}:00 UTC -- line {} {}'.format(i // 5, i, 'x' * (i % 7))
+                      for i in range(250)]
+        self.content = ''.join('{}\n'.format(line) for line in self.lines).encode('utf-8')
+        with open(self.log_path, 'wb') as log_file:
+            log_file.write(self.content)
+
+    def read_range(self, start, end):
+        return self.content[start:end].decode('utf-8').splitlines()
+
+    def test_compact_log_file(self):
+        raw_size = os.path.getsize(self.log_path)
+        index = compact_log_file(self.log_path, block_size=1024)
+        assert is_compacted(self.log_path) is True
+        assert get_blocks_index(self.log_path) == index
+        assert index['size'] == raw_size
+        assert index['lines'] == 250
+        assert len(index['blocks']) > 1
+        assert index['blocks'][0]['start_time'] == '2019-01-01 10:00:00'
+        assert os.path.getsize(get_blocks_path(self.log_path)) < raw_size
+
+        # The blocks are a valid gzip file of the whole logs
+        with gzip.open(get_blocks_path(self.log_path), 'rb') as blocks_file:
+            assert blocks_file.read() == self.content
+
+    def test_compacts_late_lines_in_new_blocks(self):
+        assert get_compacted_index(self.log_path) is None
+        index = compact_log_file(self.log_path, block_size=1024)
+        assert get_compacted_index(self.log_path) == index
+
+        # A late sidecar appends lines after the compaction, they are read without compacting
+        late_lines = ['2019-01-01 11:00:00 UTC -- late line', '2019-01-01 11:01:00 UTC -- last']
+        late_content = ''.join('{}\n'.format(line) for line in late_lines).encode('utf-8')
+        with open(self.log_path, 'wb') as log_file:
+            log_file.write(late_content)
+        content = self.content + late_content
+        late_index = get_compacted_index(self.log_path)
+        assert os.path.exists(self.log_path) is True
+        assert get_blocks_index(self.log_path) == index
+        assert late_index['size'] == len(content)
+        assert late_index['lines'] == 252
+        assert b''.join(read_log_blocks(self.log_path, late_index)) == content
+        assert b''.join(read_log_blocks(self.log_path, late_index, start=len(self.content) - 3,
+                                        end=len(content) - 5)) == content[-len(late_content) - 3:-5]
+        start = get_blocks_tail_offset(self.log_path, late_index, lines=3)
+        assert content[start:].decode('utf-8').splitlines() == self.lines[-1:] + late_lines
+        start, end = get_blocks_time_range(self.log_path,
+                                           late_index,
+                                           start_time='2019-01-01 11:00:00',
+                                           end_time='2019-01-01 11:00:00')
+        assert content[start:end].decode('utf-8').splitlines() == late_lines[:1]
+
+        # The logs handler compacts them in new blocks
+        late_index = compact_log_file(self.log_path, block_size=1024)
+        assert os.path.exists(self.log_path) is False
+        assert get_compacted_index(self.log_path) == late_index
+        assert late_index['blocks'][:len(index['blocks'])] == index['blocks']
+        assert late_index['lines'] == 252
+        assert late_index['blocks'][-1]['start_time'] == '2019-01-01 11:00:00'
+        with gzip.open(get_blocks_path(self.log_path), 'rb') as blocks_file:
+            assert blocks_file.read() == content
+
+    def test_compaction_waits_for_the_writer_lock(self):
+        late_content = b'2019-01-01 11:00:00 UTC -- late line\n'
+        with open(self.log_path, 'ab') as log_file:
+            fcntl.flock(log_file, fcntl.LOCK_EX)
+            compaction = threading.Thread(target=compact_log_file, args=(self.log_path,))
+            compaction.start()
+            compaction.join(0.1)
+            assert compaction.is_alive() is True
+            log_file.write(late_content)
+            log_file.flush()
+            fcntl.flock(log_file, fcntl.LOCK_UN)
+        compaction.join()
+        index = get_compacted_index(self.log_path)
+        assert index['lines'] == 251
+        assert b''.join(read_log_blocks(self.log_path, index)) == self.content + late_content
+
+        # The logs were compacted meanwhile
+        assert compact_log_file(self.log_path) == index
+
+    def test_read_log_blocks(self):
+        index = compact_log_file(self.log_path, block_size=1024)
+        assert b''.join(read_log_blocks(self.log_path, index)) == self.content
+        for start, end in [(0, 10), (1000, 3000), (5, 5), (len(self.content) - 3, None)]:
+            data = b''.join(read_log_blocks(self.log_path, index, start=start, end=end))
+            assert data == self.content[start:end]
+
+    def test_get_blocks_tail_and_lines_range(self):
+        index = compact_log_file(self.log_path, block_size=1024)
+        for lines in [1, 3, 100, 250]:
+            start = get_blocks_tail_offset(self.log_path, index, lines=lines)
+            assert self.read_range(start, None) == self.lines[-lines:]
+        assert get_blocks_tail_offset(self.log_path, index, lines=0) == len(self.content)
+
+        for offset, limit in [(0, 10), (9, 1), (40, 100), (245, 10), (300, 10)]:
+            start, end = get_blocks_lines_range(self.log_path, index, offset=offset, limit=limit)
+            assert self.read_range(start, end) == self.lines[offset:offset + limit]
+
+    def test_get_time_range(self):
+        windows = [
+            ('2019-01-01 10:02:00', '2019-01-01 10:03:00', self.lines[10:20]),
+            ('2019-01-01 10:30:00', None, self.lines[150:]),
+            (None, '2019-01-01 10:00:00', self.lines[:5]),
+            ('2019-01-01 11:00:00', None, []),
+        ]
+        for start_time, end_time, lines in windows:
+            start, end = get_time_range(self.log_path, start_time=start_time, end_time=end_time)
+            assert self.read_range(start, end) == lines
+
+        index = compact_log_file(self.log_path, block_size=1024)
+        for start_time, end_time, lines in windows:
+            start, end = get_blocks_time_range(self.log_path,
+                                               index,
+                                               start_time=start_time,
+                                               end_time=end_time)
+            assert self.read_range(start, end) == lines
@@ -0,0 +1,158 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+from libs.log_chunks import (
+    discard_log_chunks,
+    download_log_chunks,
+    get_chunks_path,
+    get_chunks_range,
+    get_manifest_path,
+    read_manifest,
+    ship_log_chunks
+)
+from tests.utils import BaseTest
+
+
+class FilesStore(object):
+    """A bucket stand-in backed by the local filesystem, it keeps track of the bytes transferred."""
+
+    def __init__(self, root):
+        self.root = root
+        self.uploaded = {}
+        self.downloaded = []
+
+    def get_path(self, path):
+        return os.path.join(self.root, path.lstrip('/'))
+
+    def upload_file(self, filename, path, use_basename=False):
+        assert use_basename is False
+        os.makedirs(os.path.dirname(self.get_path(path)), exist_ok=True)
+        shutil.copy(filename, self.get_path(path))
+        self.uploaded[path] = self.uploaded.get(path, 0) + os.path.getsize(filename)
+
+    def download_file(self, path, local_path, use_basename=False):
+        assert use_basename is False
+        shutil.copy(self.get_path(path), local_path)
+        self.downloaded.append(path)
+
+    def delete(self, path):
+        shutil.rmtree(self.get_path(path))
+
+
+@pytest.mark.libs_mark
+class TestLogChunks(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.store = FilesStore(tempfile.mkdtemp())
+        self.temp_path = os.path.join(tempfile.mkdtemp(), 'logs')
+        self.log_path = '/logs/user/project/jobs/1'
+        self.download_path = os.path.join(tempfile.mkdtemp(), 'logs')
+
+    def append(self, text):
+        with open(self.temp_path, 'a') as log_file:
+            log_file.write(text)
+
+    def ship(self, **kwargs):
+        params = {'chunk_size': 10, 'chunk_interval': 100}
+        params.update(kwargs)
+        return ship_log_chunks(store=self.store,
+                               temp_path=self.temp_path,
+                               log_path=self.log_path,
+                               **params)
+
+    def read(self, path):
+        with open(path, 'r') as log_file:
+            return log_file.read()
+
+    def test_ship_log_chunks_uploads_every_byte_once(self):
+        text = ''
+        for i in range(20):
+            line = 'line {}\n'.format(i)
+            text += line
+            self.append(line)
+            self.ship()
+        manifest = self.ship(force=True)
+
+        assert manifest['size'] == len(text)
+        assert [chunk['name'] for chunk in manifest['chunks']][:2] == ['chunk-000000',
+                                                                       'chunk-000001']
+        chunks_path = get_chunks_path(self.log_path)
+        chunks_uploaded = sum(size for path, size in self.store.uploaded.items()
+                              if path.startswith(chunks_path) and
+                              path != get_manifest_path(self.log_path))
+        assert chunks_uploaded == len(text)
+        uploaded_manifest = read_manifest(self.store.get_path(get_manifest_path(self.log_path)))
+        assert uploaded_manifest == manifest
+
+    def test_ship_log_chunks_thresholds(self):
+        # The first lines are uploaded right away
+        self.append('line\n')
+        assert len(self.ship()['chunks']) == 1
+
+        self.append('line\n')
+        assert len(self.ship()['chunks']) == 1
+        assert len(self.ship(chunk_interval=0)['chunks']) == 2
+        # Nothing pending
+        assert len(self.ship(force=True)['chunks']) == 2
+
+        self.append('a longer line\n')
+        assert len(self.ship()['chunks']) == 3
+
+    def test_ship_log_chunks_restarts_when_rewritten(self):
+        self.append('line 1\nline 2\n')
+        self.ship(force=True)
+        with open(self.temp_path, 'w') as log_file:
+            log_file.write('line\n')
+        manifest = self.ship(force=True)
+        assert manifest['size'] == 5
+        assert [chunk['name'] for chunk in manifest['chunks']] == ['chunk-000000']
+
+    def test_download_log_chunks(self):
+        self.append('line 1\nline 2\n')
+        manifest = self.ship(force=True)
+        download_log_chunks(store=self.store,
+                            log_path=self.log_path,
+                            manifest=manifest,
+                            download_path=self.download_path)
+        assert self.read(self.download_path) == 'line 1\nline 2\n'
+
+        # Only the new chunks are downloaded
+        self.append('line 3\n')
+        manifest = self.ship(force=True)
+        self.store.downloaded = []
+        download_log_chunks(store=self.store,
+                            log_path=self.log_path,
+                            manifest=manifest,
+                            download_path=self.download_path)
+        assert self.read(self.download_path) == 'line 1\nline 2\nline 3\n'
+        assert self.store.downloaded == [os.path.join(get_chunks_path(self.log_path),
+                                                      'chunk-000001')]
+
+        # A download not ending on a chunk is replaced
+        with open(self.download_path, 'w') as log_file:
+            log_file.write('line')
+        download_log_chunks(store=self.store,
+                            log_path=self.log_path,
+                            manifest=manifest,
+                            download_path=self.download_path)
+        assert self.read(self.download_path) == 'line 1\nline 2\nline 3\n'
+
+    def test_get_chunks_range(self):
+        for i in range(3):
+            self.append('line {}\n'.format(i))
+            manifest = self.ship(force=True)
+        assert [c['name'] for c in get_chunks_range(manifest, start=7)] == ['chunk-000001',
+                                                                            'chunk-000002']
+        assert [c['name'] for c in get_chunks_range(manifest, start=3, end=8)] == ['chunk-000000',
+                                                                                   'chunk-000001']
+
+    def test_discard_log_chunks(self):
+        self.append('line\n')
+        self.ship(force=True)
+        discard_log_chunks(store=self.store, temp_path=self.temp_path, log_path=self.log_path)
+        assert os.path.exists(self.store.get_path(get_chunks_path(self.log_path))) is False
+        manifest = self.ship()
+        assert [chunk['name'] for chunk in manifest['chunks']] == ['chunk-000000']
@@ -0,0 +1,67 @@
+import os
+import tempfile
+
+import pytest
+
+from libs.log_files import get_index_path, get_lines_range, get_tail_offset
+from tests.utils import BaseTest
+
+
+@pytest.mark.libs_mark
+class TestLogFiles(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.log_path = os.path.join(tempfile.mkdtemp(), 'logs')
+        self.lines = ['line {} {}'.format(i, 'x' * (i % 7)) for i in range(250)]
+        self.write_lines(self.lines)
+
+    def write_lines(self, lines, mode='w'):
+        with open(self.log_path, mode) as log_file:
+            log_file.write(''.join('{}\n'.format(line) for line in lines))
+
+    def read_range(self, start, end):
+        with open(self.log_path, 'r') as log_file:
+            log_file.seek(start)
+            return log_file.read(end - start).splitlines()
+
+    def test_get_tail_offset(self):
+        file_size = os.path.getsize(self.log_path)
+        for lines in [1, 3, 100, 250]:
+            offset = get_tail_offset(self.log_path, lines=lines, block_size=32)
+            assert self.read_range(offset, file_size) == self.lines[-lines:]
+
+        assert get_tail_offset(self.log_path, lines=0) == file_size
+        assert get_tail_offset(self.log_path, lines=1000) == 0
+
+    def test_get_lines_range(self):
+        for offset, limit in [(0, 10), (9, 1), (10, 10), (245, 10), (300, 10)]:
+            start, end = get_lines_range(self.log_path, offset=offset, limit=limit, step=10)
+            assert self.read_range(start, end) == self.lines[offset:offset + limit]
+        assert os.path.exists(get_index_path(self.log_path))
+
+        start, end = get_lines_range(self.log_path, offset=240, step=10)
+        assert self.read_range(start, end) == self.lines[240:]
+
+    def test_get_lines_range_extends_index(self):
+        get_lines_range(self.log_path, offset=0, limit=1, step=10)
+        self.write_lines(['new line 1', 'new line 2'], mode='a')
+        start, end = get_lines_range(self.log_path, offset=249, limit=3, step=10)
+        assert self.read_range(start, end) == [self.lines[-1], 'new line 1', 'new line 2']
+
+        # A rewritten file is indexed again
+        self.write_lines(['line a', 'line b'])
+        start, end = get_lines_range(self.log_path, offset=1, limit=1, step=10)
+        assert self.read_range(start, end) == ['line b']
+
+    def test_get_lines_range_reindexes_rewritten_file(self):
+        get_lines_range(self.log_path, offset=0, limit=1, step=10)
+
+        # A file rewritten with as many bytes is not mistaken for the indexed one
+        self.write_lines([line.replace('line', 'LINE') for line in self.lines])
+        start, end = get_lines_range(self.log_path, offset=0, limit=1, step=10)
+        assert self.read_range(start, end) == ['LINE 0 ']
+
+        # Nor a file rewritten with more, but shorter, lines
+        self.write_lines(['l{}'.format(i) for i in range(2000)])
+        start, end = get_lines_range(self.log_path, offset=1000, limit=2, step=10)
+        assert self.read_range(start, end) == ['l1000', 'l1001']
@@ -0,0 +1,79 @@
+import os
+import re
+import tempfile
+
+import pytest
+
+from libs.log_blocks import compact_log_file
+from libs.log_search import is_replica_line, search_log_file, search_log_files
+from tests.utils import BaseTest
+
+
+@pytest.mark.libs_mark
+class TestLogSearch(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.log_dir = tempfile.mkdtemp()
+        self.lines = ['2019-01-01 10:{:02d}:00 UTC {}.{} -- step {}'.format(
+            i // 10, 'master' if i % 3 == 0 else 'worker', i % 3, i) for i in range(200)]
+        self.log_path = self.write_lines('logs', self.lines)
+
+    def write_lines(self, name, lines):
+        log_path = os.path.join(self.log_dir, name)
+        with open(log_path, 'w') as log_file:
+            log_file.write(''.join('{}\n'.format(line) for line in lines))
+        return log_path
+
+    @staticmethod
+    def decode(lines):
+        return [line.decode('utf-8').rstrip('\n') for line in lines]
+
+    def test_is_replica_line(self):
+        assert is_replica_line(b'2019-01-01 10:00:00 UTC worker.1 -- foo', b'worker.1') is True
+        assert is_replica_line(b'2019-01-01 10:00:00 UTC worker.11 -- foo', b'worker.1') is False
+        assert is_replica_line(b'2019-01-01 10:00:00 UTC -- worker.1 -- foo', b'worker.1') is False
+        assert is_replica_line(b'worker.1', b'worker.1') is False
+
+    def test_search_log_file(self):
+        for compact in [False, True]:
+            if compact:
+                compact_log_file(self.log_path, block_size=500)
+
+            results = search_log_file(self.log_path, pattern=re.compile(rb'step 1\d$'))
+            assert self.decode(results) == self.lines[10:20]
+
+            results = search_log_file(self.log_path, replica='worker.2')
+            assert self.decode(results) == [line for line in self.lines if 'worker.2' in line]
+
+            results = search_log_file(self.log_path,
+                                      start_time='2019-01-01 10:05:00',
+                                      end_time='2019-01-01 10:06:00')
+            assert self.decode(results) == self.lines[50:70]
+
+    def test_search_log_files_limit(self):
+        results = search_log_files([self.log_path], limit=5, replica='master.0')
+        assert self.decode(results) == [line for line in self.lines if 'master.0' in line][:5]
+        assert list(search_log_files([self.log_path], limit=0)) == []
+
+    def test_search_log_files_in_parallel(self):
+        worker_lines = [line.replace('-- step', '-- copied step') for line in self.lines]
+        file_paths = [self.log_path,
+                      self.write_lines('worker', worker_lines),
+                      os.path.join(self.log_dir, 'missing')]
+        results = self.decode(search_log_files(file_paths, pattern=re.compile(rb'step 1\d?$')))
+        assert sorted(results) == sorted(self.lines[10:20] + self.lines[1:2] +
+                                         worker_lines[10:20] + worker_lines[1:2])
+        # The lines of every file are in order
+        first_lines = self.lines[1:2] + self.lines[10:20]
+        assert [line for line in results if line in self.lines] == first_lines
+
+        results = list(search_log_files(file_paths, limit=7))
+        assert len(results) == 7
+
+    def test_search_log_files_with_bounded_workers(self):
+        file_paths = [self.write_lines('replica_{}'.format(i), self.lines) for i in range(5)]
+        results = self.decode(search_log_files(file_paths, max_workers=2, replica='master.0'))
+        assert sorted(results) == sorted([line for line in self.lines if 'master.0' in line] * 5)
+
+        results = list(search_log_files(file_paths, limit=3, max_workers=2))
+        assert len(results) == 3
@@ -0,0 +1,135 @@
+import os
+import threading
+import time
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import stores
+
+from factories.factory_experiments import ExperimentFactory, ExperimentJobFactory
+from logs_handlers.log_queries.base import iter_log_lines, query_logs
+from logs_handlers.log_queries.experiment import process_experiment_jobs_logs
+from logs_handlers.utils import stream_log_experiment_job
+from tests.utils import BaseTest
+
+
+class FakeLogsResponse(object):
+    def __init__(self, k8s_api, logs):
+        self.k8s_api = k8s_api
+        self.logs = logs
+        self.released = False
+
+    def stream(self, amt):
+        # Small chunks, lines are split across chunks
+        with self.k8s_api.lock:
+            self.k8s_api.running += 1
+            self.k8s_api.max_running = max(self.k8s_api.max_running, self.k8s_api.running)
+        try:
+            for i in range(0, len(self.logs), 7):
+                time.sleep(0.001)
+                yield self.logs[i:i + 7]
+        finally:
+            with self.k8s_api.lock:
+                self.k8s_api.running -= 1
+
+    def release_conn(self):
+        self.released = True
+
+
+class FakeK8SApi(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.responses = []
+
+    @staticmethod
+    def get_logs(pod_id):
+        return ''.join('2019-01-01T10:00:0{}.000000000Z step {} of {}\n'.format(i, i, pod_id)
+                       for i in range(5)).encode('utf-8')
+
+    def read_namespaced_pod_log(self, pod_id, namespace, container, timestamps, **params):
+        assert timestamps is True
+        assert params == {'_preload_content': False}
+        response = FakeLogsResponse(k8s_api=self, logs=self.get_logs(pod_id))
+        self.responses.append(response)
+        return response
+
+
+class FakeK8SManager(object):
+    k8s_api = None
+
+    def __init__(self, namespace, in_cluster):
+        self.namespace = namespace
+
+
+@pytest.mark.logs_heandlers_mark
+class TestProcessExperimentJobsLogs(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.experiment = ExperimentFactory()
+        self.jobs = [ExperimentJobFactory(experiment=self.experiment, role='worker', sequence=i)
+                     for i in range(6)]
+        FakeK8SManager.k8s_api = FakeK8SApi()
+
+    def test_iter_log_lines(self):
+        chunks = [b'line 1\nli', b'ne 2', b'\n', b'line 3']
+        assert list(iter_log_lines(chunks)) == [b'line 1', b'line 2', b'line 3']
+        assert list(iter_log_lines([])) == []
+
+    def test_query_logs_pushes_down_filters(self):
+        k8s_manager = MagicMock(namespace='polyaxon')
+        query_logs(k8s_manager=k8s_manager, pod_id='pod1', container_job_name='job')
+        assert k8s_manager.k8s_api.read_namespaced_pod_log.call_args[1] == {
+            'container': 'job', 'timestamps': True}
+
+        query_logs(k8s_manager=k8s_manager,
+                   pod_id='pod1',
+                   container_job_name='job',
+                   tail_lines=10,
+                   since_seconds=30)
+        assert k8s_manager.k8s_api.read_namespaced_pod_log.call_args[1] == {
+            'container': 'job', 'timestamps': True, 'tail_lines': 10, 'since_seconds': 30}
+
+    @patch('logs_handlers.log_queries.experiment.K8SManager', FakeK8SManager)
+    def test_process_experiment_jobs_logs(self):
+        with self.settings(LOGS_COLLECT_WORKERS=3):
+            process_experiment_jobs_logs(experiment=self.experiment, temp=True)
+
+        k8s_api = FakeK8SManager.k8s_api
+        assert len(k8s_api.responses) == 6
+        assert all(response.released for response in k8s_api.responses)
+        # The replicas are collected concurrently, with a bounded number of workers
+        assert 1 < k8s_api.max_running <= 3
+
+        for job in self.jobs:
+            log_path = stores.get_experiment_job_logs_path(experiment_job_name=job.unique_name,
+                                                           temp=True)
+            with open(log_path, 'r') as log_file:
+                log_lines = log_file.read().splitlines()
+            assert len(log_lines) == 5
+            for i, log_line in enumerate(log_lines):
+                assert log_line.startswith('2019-01-01 10:00:0{}'.format(i))
+                assert log_line.endswith('worker.{} -- step {} of {}'.format(
+                    job.sequence, i, job.pod_id))
+
+    def test_stream_log_keeps_log_file_on_error(self):
+        job_name = self.jobs[0].unique_name
+        log_path = stores.get_experiment_job_logs_path(experiment_job_name=job_name, temp=True)
+        stream_log_experiment_job(experiment_job_name=job_name,
+                                  log_lines=iter(['line 1']),
+                                  temp=True)
+
+        def get_log_lines():
+            yield 'line 2'
+            raise ConnectionError('Connection reset')
+
+        with self.assertRaises(ConnectionError):
+            stream_log_experiment_job(experiment_job_name=job_name,
+                                      log_lines=get_log_lines(),
+                                      temp=True)
+        with open(log_path, 'r') as log_file:
+            assert log_file.read() == 'line 1\n'
+        assert os.path.exists('{}.tmp'.format(log_path)) is False
@@ -0,0 +1,99 @@
+import fcntl
+import os
+import tempfile
+import threading
+
+import pytest
+
+from logs_handlers.writer import LogWriter
+from tests.utils import BaseTest
+
+
+@pytest.mark.logs_heandlers_mark
+class TestLogWriter(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.log_dir = tempfile.mkdtemp()
+        self.log_paths = [os.path.join(self.log_dir, 'run_{}'.format(i), 'logs.txt')
+                          for i in range(3)]
+
+    def create_path(self, log_path):
+        return lambda: os.makedirs(os.path.dirname(log_path), exist_ok=True)
+
+    @staticmethod
+    def read(log_path):
+        with open(log_path, 'r') as log_file:
+            return log_file.read()
+
+    def test_buffers_until_flush(self):
+        log_writer = LogWriter(max_files=10, flush_interval=100, buffer_size=1024)
+        log_path = self.log_paths[0]
+        log_writer.write(log_path, 'line1', create_path=self.create_path(log_path))
+        log_writer.write(log_path, 'line2\nline3', create_path=self.create_path(log_path))
+        assert os.path.exists(log_path) is False
+
+        log_writer.flush(log_path)
+        assert self.read(log_path) == 'line1\nline2\nline3\n'
+
+        log_writer.write(log_path, 'line4')
+        log_writer.close()
+        assert self.read(log_path) == 'line1\nline2\nline3\nline4\n'
+
+    def test_flushes_when_buffer_is_full(self):
+        log_writer = LogWriter(max_files=10, flush_interval=100, buffer_size=10)
+        log_path = self.log_paths[0]
+        log_writer.write(log_path, 'line1', create_path=self.create_path(log_path))
+        assert os.path.exists(log_path) is False
+        log_writer.write(log_path, 'line2', create_path=self.create_path(log_path))
+        assert self.read(log_path) == 'line1\nline2\n'
+        log_writer.close()
+
+    def test_no_flush_interval_writes_right_away(self):
+        log_writer = LogWriter(max_files=10, flush_interval=0, buffer_size=1024)
+        log_path = self.log_paths[0]
+        log_writer.write(log_path, 'line1', create_path=self.create_path(log_path))
+        assert self.read(log_path) == 'line1\n'
+        log_writer.write(log_path, None)
+        assert self.read(log_path) == 'line1\n'
+        log_writer.close()
+
+    def test_evicts_least_recently_used_files(self):
+        log_writer = LogWriter(max_files=2, flush_interval=0, buffer_size=1024)
+        for log_path in self.log_paths:
+            log_writer.write(log_path, 'line', create_path=self.create_path(log_path))
+        files = log_writer._files  # pylint:disable=protected-access
+        assert list(files.keys()) == self.log_paths[1:]
+
+        log_writer.write(self.log_paths[0], 'line')
+        assert list(log_writer._files.keys()) == [  # pylint:disable=protected-access
+            self.log_paths[2], self.log_paths[0]]
+        log_writer.close()
+        assert self.read(self.log_paths[0]) == 'line\nline\n'
+
+    def test_reopens_deleted_files(self):
+        log_writer = LogWriter(max_files=2, flush_interval=0, buffer_size=1024)
+        log_path = self.log_paths[0]
+        log_writer.write(log_path, 'line1', create_path=self.create_path(log_path))
+        os.remove(log_path)
+        log_writer.write(log_path, 'line2', create_path=self.create_path(log_path))
+        assert self.read(log_path) == 'line2\n'
+        log_writer.close()
+
+    def test_reopens_files_removed_while_waiting_for_the_lock(self):
+        log_writer = LogWriter(max_files=2, flush_interval=100, buffer_size=1024)
+        log_path = self.log_paths[0]
+        log_writer.write(log_path, 'line1', create_path=self.create_path(log_path))
+        log_writer.flush(log_path)
+        log_writer.write(log_path, 'line2')
+        with open(log_path, 'rb') as log_file:
+            # The logs are compacted meanwhile
+            fcntl.flock(log_file, fcntl.LOCK_EX)
+            flush = threading.Thread(target=log_writer.flush, args=(log_path,))
+            flush.start()
+            flush.join(0.1)
+            assert flush.is_alive() is True
+            os.remove(log_path)
+            fcntl.flock(log_file, fcntl.LOCK_UN)
+        flush.join()
+        assert self.read(log_path) == 'line2\n'
+        log_writer.close()
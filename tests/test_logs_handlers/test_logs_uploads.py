@@ -0,0 +1,79 @@
+import os
+import tempfile
+
+import pytest
+
+from mock import MagicMock, patch
+
+import stores
+
+from libs.log_chunks import get_appended_path, get_chunks_path, get_shipped_path, read_manifest
+from logs_handlers.utils import safe_log_job
+from logs_handlers.writer import LogWriter
+from tests.utils import BaseTest
+
+
+@pytest.mark.logs_heandlers_mark
+class TestLogsBucketUploads(BaseTest):
+    JOB_NAME = 'user.project.jobs.1'
+
+    def setUp(self):
+        super().setUp()
+        self.store = MagicMock()
+        self.log_writer = LogWriter(max_files=10, flush_interval=100, buffer_size=1024)
+        for target, kwargs in [
+            ('stores.is_bucket_logs_persistence', {'return_value': True}),
+            ('stores.get_logs_store', {'return_value': self.store}),
+            ('logs_handlers.utils.get_log_writer', {'return_value': self.log_writer}),
+        ]:
+            patcher = patch(target, **kwargs)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        settings = self.settings(LOGS_ARCHIVE_ROOT=tempfile.mkdtemp(),
+                                 LOGS_CHUNK_SIZE=1024,
+                                 LOGS_CHUNK_INTERVAL=100)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.temp_path = stores.get_job_logs_path(job_name=self.JOB_NAME, temp=True)
+        self.log_path = stores.get_job_logs_path(job_name=self.JOB_NAME, temp=False)
+
+    def get_shipped_chunks(self):
+        manifest = read_manifest(get_shipped_path(get_appended_path(self.temp_path)))
+        return [(chunk['start'], chunk['end']) for chunk in manifest['chunks']]
+
+    @staticmethod
+    def read(log_path):
+        with open(log_path, 'r') as log_file:
+            return log_file.read()
+
+    def test_ships_appended_lines_apart_from_the_temp_file(self):
+        # The first batch is flushed by the writer before being shipped
+        safe_log_job(job_name=self.JOB_NAME, log_lines='line 1', temp=False, append=True)
+        assert self.get_shipped_chunks() == [(0, 7)]
+        self.store.upload_file.assert_any_call(
+            filename='{}.chunk-000000'.format(get_appended_path(self.temp_path)),
+            path=os.path.join(get_chunks_path(self.log_path), 'chunk-000000'),
+            use_basename=False)
+
+        # The logs queried for a running run rewrite the temp file only
+        safe_log_job(job_name=self.JOB_NAME, log_lines='queried', temp=True, append=False)
+        assert self.read(self.temp_path) == 'queried\n'
+
+        # Not enough lines are pending
+        safe_log_job(job_name=self.JOB_NAME, log_lines='line 2', temp=False, append=True)
+        assert self.get_shipped_chunks() == [(0, 7)]
+
+        # The done signal of the run ships the pending lines
+        safe_log_job(job_name=self.JOB_NAME, log_lines='', temp=False, append=True)
+        assert self.get_shipped_chunks() == [(0, 7), (7, 14)]
+        assert self.read(get_appended_path(self.temp_path)) == 'line 1\nline 2\n'
+
+    def test_whole_upload_replaces_the_chunks(self):
+        safe_log_job(job_name=self.JOB_NAME, log_lines='line 1', temp=False, append=True)
+        safe_log_job(job_name=self.JOB_NAME, log_lines='line 1\nline 2', temp=False)
+
+        self.store.upload_file.assert_called_with(filename=self.temp_path,
+                                                  path=self.log_path,
+                                                  use_basename=False)
+        self.store.delete.assert_called_once_with(get_chunks_path(self.log_path))
+        assert os.path.exists(get_appended_path(self.temp_path)) is False
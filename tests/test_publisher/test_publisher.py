@@ -0,0 +1,86 @@
+import uuid
+
+from unittest.mock import patch
+
+import pytest
+
+from db.redis.to_stream import RedisToStream
+from polyaxon.settings import RoutingKeys
+from publisher.batcher import PublishBatcher
+from publisher.service import PublisherService
+from tests.utils import BaseTest
+
+
+@pytest.mark.publisher_mark
+class TestPublishBatcher(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.published = []
+
+    def publish(self, batches):
+        self.published.append(batches)
+
+    def test_publishes_right_away_without_interval(self):
+        batcher = PublishBatcher(publish=self.publish, batch_interval=0, batch_size=100)
+        batcher.add('key1', {'job_uuid': 'job1', 'log_lines': 'line1'})
+        batcher.add('key1', {'job_uuid': 'job1', 'log_lines': 'line2'})
+        assert self.published == [[('key1', {'job_uuid': 'job1', 'log_lines': 'line1'})],
+                                  [('key1', {'job_uuid': 'job1', 'log_lines': 'line2'})]]
+
+    def test_coalesces_the_messages_per_routing_key(self):
+        batcher = PublishBatcher(publish=self.publish, batch_interval=100, batch_size=100)
+        batcher.add('key1', {'job_uuid': 'job1', 'log_lines': 'line1'})
+        batcher.add('key2', {'job_uuid': 'job2', 'log_lines': ['line1', 'line2']})
+        batcher.add('key1', {'job_uuid': 'job1', 'log_lines': ['line2', 'line3']})
+        assert self.published == []
+
+        batcher.flush()
+        assert self.published == [[
+            ('key1', {'job_uuid': 'job1', 'log_lines': ['line1', 'line2', 'line3']}),
+            ('key2', {'job_uuid': 'job2', 'log_lines': ['line1', 'line2']}),
+        ]]
+        batcher.flush()
+        assert len(self.published) == 1
+
+    def test_publishes_when_batch_is_full(self):
+        batcher = PublishBatcher(publish=self.publish, batch_interval=100, batch_size=3)
+        batcher.add('key1', {'job_uuid': 'job1', 'log_lines': ['line1', 'line2']})
+        batcher.add('key2', {'job_uuid': 'job2', 'log_lines': ['line1']})
+        assert self.published == []
+        batcher.add('key1', {'job_uuid': 'job1', 'log_lines': ['line3']})
+        assert self.published == [[
+            ('key1', {'job_uuid': 'job1', 'log_lines': ['line1', 'line2', 'line3']}),
+        ]]
+
+
+@pytest.mark.publisher_mark
+class TestPublisherService(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.publisher = PublisherService()
+        self.publisher.setup()
+        self.job_uuid = uuid.uuid4().hex
+
+    def test_caches_monitored_sets(self):
+        with self.settings(PUBLISHER_MONITORED_CACHE_TTL=100):
+            with patch.object(RedisToStream, 'get_monitored_job_logs',
+                              return_value=set()) as mock_get_monitored:
+                for _ in range(10):
+                    self.publisher.publish_job_log(log_lines='line',
+                                                   job_uuid=self.job_uuid,
+                                                   job_name='job',
+                                                   send_task=False)
+        assert mock_get_monitored.call_count == 1
+
+    def test_publishes_monitored_logs(self):
+        RedisToStream.monitor_job_logs(self.job_uuid)
+        self.addCleanup(RedisToStream.remove_job_logs, self.job_uuid)
+        with patch.object(self.publisher._batcher, 'publish') as mock_publish:
+            self.publisher.publish_job_log(log_lines='line',
+                                           job_uuid=self.job_uuid,
+                                           job_name='job',
+                                           send_task=False)
+        assert mock_publish.call_count == 1
+        batches = mock_publish.call_args[0][0]
+        assert batches == [('{}.{}'.format(RoutingKeys.STREAM_LOGS_SIDECARS_JOBS, self.job_uuid),
+                            {'job_uuid': self.job_uuid, 'log_lines': ['line']})]
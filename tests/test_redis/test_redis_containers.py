@@ -0,0 +1,74 @@
+import uuid
+
+from unittest.mock import patch
+
+import pytest
+
+from db.redis.containers import RedisJobContainers
+from factories.factory_experiments import ExperimentJobFactory
+from tests.utils import BaseTest
+
+
+@pytest.mark.redis_mark
+class TestRedisJobContainers(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.job1 = ExperimentJobFactory()
+        self.job2 = ExperimentJobFactory()
+
+    def test_shares_clients(self):
+        assert RedisJobContainers.connection() is RedisJobContainers.connection()
+
+    def test_monitor_containers(self):
+        RedisJobContainers.monitor_containers({
+            'container1': self.job1.uuid.hex,
+            'container2': self.job1.uuid.hex,
+            'container3': self.job2.uuid.hex,
+            'container4': uuid.uuid4().hex})
+        assert sorted(RedisJobContainers.get_containers()) == [
+            'container1', 'container2', 'container3']
+        assert RedisJobContainers.get_jobs(['container1', 'container3', 'container4']) == {
+            'container1': (self.job1.uuid.hex, self.job1.experiment.uuid.hex),
+            'container3': (self.job2.uuid.hex, self.job2.experiment.uuid.hex),
+            'container4': (None, None),
+        }
+        # The containers not mapped to a job come before or between the mapped ones
+        assert RedisJobContainers.get_jobs(['container4', 'container1', 'container5',
+                                            'container3']) == {
+            'container4': (None, None),
+            'container1': (self.job1.uuid.hex, self.job1.experiment.uuid.hex),
+            'container5': (None, None),
+            'container3': (self.job2.uuid.hex, self.job2.experiment.uuid.hex),
+        }
+        assert RedisJobContainers.get_job('container2') == (self.job1.uuid.hex,
+                                                            self.job1.experiment.uuid.hex)
+
+        # The monitored containers are not looked up again
+        with patch('db.models.experiment_jobs.ExperimentJob.objects.filter') as mock_filter:
+            RedisJobContainers.monitor(container_id='container1', job_uuid=self.job1.uuid.hex)
+        assert mock_filter.call_count == 0
+
+    def test_remove_containers_and_jobs(self):
+        RedisJobContainers.monitor_containers({
+            'container1': self.job1.uuid.hex,
+            'container2': self.job1.uuid.hex,
+            'container3': self.job2.uuid.hex})
+        RedisJobContainers.remove_containers(['container3'])
+        assert sorted(RedisJobContainers.get_containers()) == ['container1', 'container2']
+        assert RedisJobContainers.get_job('container3') == (None, None)
+
+        RedisJobContainers.remove_job(self.job1.uuid.hex)
+        assert RedisJobContainers.get_containers() == []
+        assert RedisJobContainers.get_experiment_for_job(self.job1.uuid.hex) is None
+        assert RedisJobContainers.get_experiment_for_job(
+            self.job2.uuid.hex) == self.job2.experiment.uuid.hex
+
+    def test_records_latency(self):
+        with patch('stats.timing') as mock_timing:
+            RedisJobContainers.get_containers()
+            with RedisJobContainers.pipeline() as pipe:
+                pipe.sadd(RedisJobContainers.KEY_CONTAINERS, 'container1')
+                pipe.sadd(RedisJobContainers.KEY_CONTAINERS, 'container2')
+        assert [call[0][0] for call in mock_timing.call_args_list] == ['redis.smembers',
+                                                                       'redis.pipeline']
+        assert sorted(RedisJobContainers.get_containers()) == ['container1', 'container2']
@@ -1,6 +1,14 @@
+import time
+
 import pytest
 
-from db.redis.heartbeat import RedisHeartBeat
+from mock import patch
+
+from django.conf import settings
+
+import conf
+
+from db.redis.heartbeat import RedisHeartBeat, RedisSortedHeartBeat
 from tests.utils import BaseTest
 
 
@@ -72,3 +80,60 @@ class TestRedisHeartBeat(BaseTest):
         RedisHeartBeat.build_ping(1)
         self.assertEqual(heartbeat.is_alive(), True)
         self.assertEqual(RedisHeartBeat.build_is_alive(1), True)
+
+    def test_redis_heartbeats_are_alive(self):
+        RedisHeartBeat.job_ping(101)
+        RedisHeartBeat.job_ping(103)
+        self.assertEqual(RedisHeartBeat.jobs_are_alive([101, 102, 103]),
+                         {101: True, 102: False, 103: True})
+        self.assertEqual(RedisHeartBeat.experiments_are_alive([101, 103]),
+                         {101: False, 103: False})
+        self.assertEqual(RedisHeartBeat.builds_are_alive([]), {})
+
+    def test_redis_heartbeats_get_stale(self):
+        RedisHeartBeat.job_ping(101)
+        RedisHeartBeat.job_ping(103)
+        with patch('db.redis.heartbeat.HEARTBEATS_CHUNK_SIZE', 2):
+            self.assertEqual(list(RedisHeartBeat.get_stale_jobs([101, 102, 103, 104])),
+                             [102, 104])
+        self.assertEqual(list(RedisHeartBeat.get_stale_builds([])), [])
+
+
+@pytest.mark.redis_mark
+class TestRedisSortedHeartBeat(BaseTest):
+    def setUp(self):
+        super().setUp()
+        settings_override = self.settings(
+            HEARTBEAT_BACKEND=settings.HEARTBEAT_BACKEND_SORTED_SET)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_ping(self):
+        self.assertEqual(RedisHeartBeat.experiment_is_alive(1), False)
+        RedisHeartBeat.experiment_ping(1)
+        self.assertEqual(RedisHeartBeat.experiment_is_alive(1), True)
+        # The keys are not used
+        self.assertEqual(RedisHeartBeat(experiment=1).is_alive(), False)
+
+        RedisHeartBeat.jobs_ping([1, 2, 3])
+        self.assertEqual(RedisHeartBeat.jobs_are_alive([1, 3, 4]), {1: True, 3: True, 4: False})
+        self.assertEqual(RedisHeartBeat.builds_are_alive([1]), {1: False})
+
+    def test_get_stale_and_compact(self):
+        key = RedisSortedHeartBeat.KEY_JOBS
+        old = time.time() - conf.get('TTL_HEARTBEAT') - 10
+        RedisSortedHeartBeat.ping(key, [1, 2], timestamp=old)
+        RedisSortedHeartBeat.ping(key, [3, 4])
+        self.assertEqual(sorted(RedisSortedHeartBeat.get_stale(key, since=old + 1)), [1, 2])
+        self.assertEqual(RedisHeartBeat.jobs_are_alive([1, 2, 3, 4]),
+                         {1: False, 2: False, 3: True, 4: True})
+        self.assertEqual(RedisSortedHeartBeat.get_alive(key, since=old + 1), {3, 4})
+        # Job 5 never pinged
+        self.assertEqual(list(RedisHeartBeat.get_stale_jobs([1, 3, 5])), [1, 5])
+
+        # Job 1 is still running, jobs 2 and 4 are finished
+        RedisHeartBeat.compact_jobs([1, 3])
+        self.assertIsNone(RedisSortedHeartBeat.get_pings(key, [2])[2])
+        self.assertEqual(RedisSortedHeartBeat.get_stale(key, since=old + 1), [1])
+        # Job 4 pinged recently, it is removed by a later compaction
+        self.assertIsNotNone(RedisSortedHeartBeat.get_pings(key, [4])[4])
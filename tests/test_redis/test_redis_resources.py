@@ -0,0 +1,41 @@
+import pytest
+
+from db.redis.resources import RedisResourcesSeries
+from tests.utils import BaseTest
+
+
+@pytest.mark.redis_mark
+class TestRedisResourcesSeries(BaseTest):
+    def test_add_get_points(self):
+        RedisResourcesSeries.add_points({
+            ('job1', 10): [{'timestamp': 10, 'cpu_percentage': 1.},
+                           {'timestamp': 20, 'cpu_percentage': 2.}],
+            ('job1', 60): [{'timestamp': 0, 'cpu_percentage': 1.5}],
+            ('job2', 10): [{'timestamp': 10, 'cpu_percentage': 3.}],
+        })
+        assert RedisResourcesSeries.get_points(['job1', 'job2', 'job3'], resolution=10) == {
+            'job1': [{'timestamp': 10, 'cpu_percentage': 1.},
+                     {'timestamp': 20, 'cpu_percentage': 2.}],
+            'job2': [{'timestamp': 10, 'cpu_percentage': 3.}],
+            'job3': [],
+        }
+        assert RedisResourcesSeries.get_points(['job1'], resolution=60) == {
+            'job1': [{'timestamp': 0, 'cpu_percentage': 1.5}]}
+        assert RedisResourcesSeries.get_points(['job1'], resolution=10, since=15) == {
+            'job1': [{'timestamp': 20, 'cpu_percentage': 2.}]}
+        assert RedisResourcesSeries.get_points([], resolution=10) == {}
+
+    def test_add_points_replaces_buckets(self):
+        RedisResourcesSeries.add_points({('job1', 10): [{'timestamp': 10, 'count': 1}]})
+        RedisResourcesSeries.add_points({('job1', 10): [{'timestamp': 10, 'count': 2}]})
+        assert RedisResourcesSeries.get_points(['job1'], resolution=10) == {
+            'job1': [{'timestamp': 10, 'count': 2}]}
+
+    def test_add_points_keeps_latest_points(self):
+        with self.settings(RESOURCES_SERIES_MAX_LENGTH=3):
+            for timestamp in range(0, 100, 10):
+                RedisResourcesSeries.add_points({('job1', 10): [{'timestamp': timestamp}]})
+        assert RedisResourcesSeries.get_points(['job1'], resolution=10) == {
+            'job1': [{'timestamp': 70}, {'timestamp': 80}, {'timestamp': 90}]}
+        red = RedisResourcesSeries.connection()
+        assert red.ttl(RedisResourcesSeries.get_key('job1', 10)) > 0
@@ -0,0 +1,24 @@
+import pytest
+
+from db.redis.statuses import RedisStatuses
+from tests.utils import BaseTest
+
+
+@pytest.mark.redis_mark
+class TestRedisStatuses(BaseTest):
+    def test_get_message_value_ignores_wrong_messages(self):
+        assert RedisStatuses.get_message_value(None) == (None, None)
+        assert RedisStatuses.get_message_value({'type': 'subscribe', 'data': 1}) == (None, None)
+        assert RedisStatuses.get_message_value({'type': 'message', 'data': b'foo'}) == (None, None)
+
+    def test_publish_subscribe(self):
+        pubsub = RedisStatuses.subscribe()
+        RedisStatuses.publish(uuid='uuid1', status='running')
+
+        message = None
+        for _ in range(10):
+            message = pubsub.get_message(timeout=0.1)
+            if message:
+                break
+        assert RedisStatuses.get_message_value(message) == ('uuid1', 'running')
+        pubsub.close()
@@ -1,3 +1,4 @@
+import json
 import uuid
 
 import pytest
@@ -19,8 +20,10 @@ class TestRedisToStream(BaseTest):
         job_uuid = uuid.uuid4().hex
         RedisToStream.monitor_job_logs(job_uuid)
         assert RedisToStream.is_monitored_job_logs(job_uuid) is True
+        assert job_uuid in RedisToStream.get_monitored_job_logs()
         RedisToStream.remove_job_logs(job_uuid)
         assert RedisToStream.is_monitored_job_logs(job_uuid) is False
+        assert job_uuid not in RedisToStream.get_monitored_job_logs()
 
     def test_monitor_experiment_resources(self):
         expeirment_uuid = uuid.uuid4().hex
@@ -33,8 +36,10 @@ class TestRedisToStream(BaseTest):
         expeirment_uuid = uuid.uuid4().hex
         RedisToStream.monitor_experiment_logs(expeirment_uuid)
         assert RedisToStream.is_monitored_experiment_logs(expeirment_uuid) is True
+        assert expeirment_uuid in RedisToStream.get_monitored_experiment_logs()
         RedisToStream.remove_experiment_logs(expeirment_uuid)
         assert RedisToStream.is_monitored_experiment_logs(expeirment_uuid) is False
+        assert expeirment_uuid not in RedisToStream.get_monitored_experiment_logs()
 
     def test_set_latest_job_resources(self):
         gpu_resources = {
@@ -105,3 +110,31 @@ class TestRedisToStream(BaseTest):
         assert RedisToStream.is_monitored_experiment_logs(experiment_uuid) is True
         RedisToStream.remove_experiment_logs(experiment_uuid)
         assert RedisToStream.is_monitored_experiment_logs(experiment_uuid) is False
+
+    def test_get_latest_experiment_resources(self):
+        jobs = [{'uuid': uuid.uuid4().hex, 'name': 'master.{}'.format(i)} for i in range(3)]
+        assert RedisToStream.get_latest_experiment_resources(jobs, True) == []
+        assert RedisToStream.get_raw_latest_experiment_resources(jobs) == b'[]'
+
+        RedisToStream.set_latest_job_resources(jobs[0]['uuid'], {'cpu_percentage': 0.5})
+        RedisToStream.set_latest_job_resources(jobs[2]['uuid'], {})
+        expected = [{'cpu_percentage': 0.5, 'job_name': 'master.0'}, {'job_name': 'master.2'}]
+        assert RedisToStream.get_latest_experiment_resources(jobs, True) == expected
+        assert json.loads(RedisToStream.get_latest_experiment_resources(jobs)) == expected
+        assert json.loads(
+            RedisToStream.get_raw_latest_experiment_resources(jobs).decode('utf-8')) == expected
+
+    def test_get_monitored_resources_and_set_latest_jobs_resources(self):
+        job_uuid = uuid.uuid4().hex
+        experiment_uuid = uuid.uuid4().hex
+        assert RedisToStream.get_monitored_resources() == (set(), set())
+        RedisToStream.monitor_job_resources(job_uuid)
+        RedisToStream.monitor_experiment_resources(experiment_uuid)
+        assert RedisToStream.get_monitored_resources() == ({job_uuid}, {experiment_uuid})
+
+        jobs = [{'uuid': uuid.uuid4().hex, 'name': 'worker.{}'.format(i)} for i in range(2)]
+        RedisToStream.set_latest_jobs_resources({jobs[0]['uuid']: {'cpu_percentage': 0.5},
+                                                 jobs[1]['uuid']: {'cpu_percentage': 1.5}})
+        assert RedisToStream.get_latest_experiment_resources(jobs, True) == [
+            {'cpu_percentage': 0.5, 'job_name': 'worker.0'},
+            {'cpu_percentage': 1.5, 'job_name': 'worker.1'}]
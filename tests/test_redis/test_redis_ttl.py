@@ -87,3 +87,12 @@ class TestRedisTTL(BaseTest):
 
         with self.assertRaises(ValueError):
             RedisTTL.validate_ttl('sdf')
+
+    def test_get_for_experiments(self):
+        RedisTTL.set_for_experiment(experiment_id=1, value=10)
+        RedisTTL.set_for_experiment(experiment_id=3, value=30)
+        assert RedisTTL.get_for_experiments([1, 2, 3]) == {
+            1: 10, 2: conf.get('GLOBAL_COUNTDOWN'), 3: 30}
+        assert RedisTTL.get_for_experiments([1, 3]) == {
+            1: conf.get('GLOBAL_COUNTDOWN'), 3: conf.get('GLOBAL_COUNTDOWN')}
+        assert RedisTTL.get_for_experiments([]) == {}
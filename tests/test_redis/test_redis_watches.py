@@ -0,0 +1,18 @@
+import pytest
+
+from db.redis.watches import RedisWatches
+from tests.utils import BaseTest
+
+
+@pytest.mark.redis_mark
+class TestRedisWatches(BaseTest):
+    def test_resource_version(self):
+        assert RedisWatches.get_resource_version('statuses') is None
+        RedisWatches.set_resource_version('statuses', '100')
+        RedisWatches.set_resource_version('namespace', '50')
+        assert RedisWatches.get_resource_version('statuses') == '100'
+        RedisWatches.set_resource_version('statuses', '120')
+        assert RedisWatches.get_resource_version('statuses') == '120'
+        RedisWatches.clear_resource_version('statuses')
+        assert RedisWatches.get_resource_version('statuses') is None
+        assert RedisWatches.get_resource_version('namespace') == '50'
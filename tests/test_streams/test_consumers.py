@@ -0,0 +1,202 @@
+# pylint:disable=protected-access
+import asyncio
+
+import pytest
+
+from mock import MagicMock, patch
+
+from constants.jobs import JobLifeCycle
+from streams.consumers.consumers import (
+    Consumer,
+    Subscription,
+    get_consumer,
+    stream_subscription
+)
+from streams.constants import CONSUMER_RECONNECT_DELAY
+from tests.utils import BaseTest
+
+
+@pytest.mark.streams_mark
+class TestSubscription(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def put_messages(self, subscription, count):
+        for i in range(count):
+            subscription.put('message {}'.format(i))
+
+    def test_drop_oldest(self):
+        subscription = Subscription(max_size=3, overflow=Subscription.DROP_OLDEST)
+        self.put_messages(subscription, 5)
+        assert subscription.dropped == 2
+        assert subscription.get_messages() == ['message 2', 'message 3', 'message 4']
+
+    def test_drop_newest(self):
+        subscription = Subscription(max_size=3, overflow=Subscription.DROP_NEWEST)
+        self.put_messages(subscription, 5)
+        assert subscription.dropped == 2
+        assert subscription.get_messages() == ['message 0', 'message 1', 'message 2']
+
+    def test_get(self):
+        subscription = Subscription(max_size=3)
+        self.put_messages(subscription, 1)
+        assert self.loop.run_until_complete(subscription.get(timeout=0.01)) == 'message 0'
+        assert self.loop.run_until_complete(subscription.get(timeout=0.01)) is None
+
+
+@pytest.mark.streams_mark
+class TestConsumer(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.loop = MagicMock()
+        self.on_closed = MagicMock()
+        self.consumer = Consumer(routing_key='stream.logs.job1',
+                                 queue='logs',
+                                 loop=self.loop,
+                                 ack_batch_size=3,
+                                 on_closed=self.on_closed)
+        patcher = patch.object(Consumer, 'connect', side_effect=lambda: MagicMock())
+        self.connect = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def open(self):
+        """Goes through the connection handshake up to consuming."""
+        self.consumer.on_connection_open(self.consumer._connection)
+        channel = MagicMock()
+        channel.basic_consume.return_value = 'tag'
+        self.consumer.on_channel_open(channel)
+        self.consumer.on_qosok(None)
+        self.consumer.on_exchange_declareok(None)
+        self.consumer.on_queue_declareok(None)
+        self.consumer.on_bindok(None)
+        return channel
+
+    def deliver(self, delivery_tag, body='message'):
+        self.consumer.on_message(None, MagicMock(delivery_tag=delivery_tag), MagicMock(), body)
+
+    def test_fans_out_messages_to_subscriptions(self):
+        subscriptions = [self.consumer.subscribe(), self.consumer.subscribe()]
+        assert self.connect.call_count == 1
+        self.open()
+        self.deliver(1, b'message 1')
+        self.deliver(2, '')
+        assert [s.get_messages() for s in subscriptions] == [['message 1'], ['message 1']]
+
+    def test_acknowledges_messages_in_batches(self):
+        self.consumer.subscribe()
+        channel = self.open()
+        channel.basic_qos.assert_called_once_with(self.consumer.on_qosok,
+                                                  prefetch_count=self.consumer._prefetch_count)
+
+        for delivery_tag in range(1, 5):
+            self.deliver(delivery_tag)
+        # The batch is acknowledged at once, the 4th delivery waits for the interval
+        channel.basic_ack.assert_called_once_with(3, multiple=True)
+        assert self.loop.call_later.call_count == 2
+        self.loop.call_later.return_value.cancel.assert_called_once_with()
+
+        flush_acks = self.loop.call_later.call_args[0][1]
+        flush_acks()
+        channel.basic_ack.assert_called_with(4, multiple=True)
+        assert channel.basic_ack.call_count == 2
+
+        flush_acks()
+        assert channel.basic_ack.call_count == 2
+
+    def test_reconnects_when_the_connection_closes(self):
+        self.consumer.subscribe()
+        self.open()
+        self.deliver(1)
+        connection = self.consumer._connection
+        self.consumer.on_connection_closed(connection, 320, 'Connection forced')
+        connection.add_timeout.assert_called_once_with(CONSUMER_RECONNECT_DELAY,
+                                                       self.consumer.reconnect)
+        # The deliveries of the closed channel are not acknowledged
+        self.loop.call_later.return_value.cancel.assert_called_once_with()
+        assert self.consumer._channel is None
+
+        self.consumer.reconnect()
+        assert self.connect.call_count == 2
+        assert self.consumer._connection is not connection
+        channel = self.open()
+        channel.basic_consume.assert_called_once_with(self.consumer.on_message,
+                                                      self.consumer._queue)
+        self.consumer.flush_acks()
+        assert channel.basic_ack.call_count == 0
+
+        self.consumer.on_connection_open_error(self.consumer._connection, 'error')
+        self.loop.call_later.assert_called_with(CONSUMER_RECONNECT_DELAY, self.consumer.reconnect)
+        assert self.on_closed.call_count == 0
+
+    def test_unbinds_queue_on_last_unsubscribe(self):
+        subscriptions = [self.consumer.subscribe(), self.consumer.subscribe()]
+        channel = self.open()
+        self.deliver(1)
+
+        self.consumer.unsubscribe(subscriptions[0])
+        assert channel.queue_unbind.call_count == 0
+
+        self.consumer.unsubscribe(subscriptions[1])
+        channel.basic_ack.assert_called_once_with(1, multiple=True)
+        channel.queue_unbind.assert_called_once_with(self.consumer.on_unbindok,
+                                                     self.consumer._queue,
+                                                     self.consumer.EXCHANGE,
+                                                     self.consumer.routing_key)
+
+        self.consumer.on_unbindok(None)
+        channel.basic_cancel.assert_called_once_with(self.consumer.on_cancelok, 'tag')
+        self.consumer.on_cancelok(None)
+        channel.close.assert_called_once_with()
+        self.consumer.on_connection_closed(self.consumer._connection, 200, 'Normal shutdown')
+        self.on_closed.assert_called_once_with(self.consumer)
+        assert self.consumer._connection is None
+
+    def test_get_consumer(self):
+        consumers = {}
+        with patch('streams.consumers.consumers.Consumer.run'):
+            consumer = get_consumer(consumers, routing_key='stream.logs.job1', queue='logs')
+            assert get_consumer(consumers, routing_key='stream.logs.job1', queue='logs') is consumer
+            subscription = consumer.subscribe()
+
+        consumer.unsubscribe(subscription)
+        assert consumers == {}
+
+
+@pytest.mark.streams_mark
+class TestStreamSubscription(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        self.ws = MagicMock(_connection_lost=False)
+        self.sent = []
+
+        async def send(message):
+            self.sent.append(message)
+
+        self.ws.send = send
+        self.instance = MagicMock()
+        self.instance.uuid.hex = 'uuid1'
+        self.listener = MagicMock(is_connected=True)
+
+    def test_closes_once_the_pushed_status_is_done(self):
+        subscription = Subscription()
+        subscription.put('message 1')
+        subscription.put('message 2')
+        statuses = iter([JobLifeCycle.RUNNING, JobLifeCycle.SUCCEEDED])
+
+        async def get_last_status(listener, instance):
+            assert listener is self.listener and instance is self.instance
+            return next(statuses)
+
+        with patch('streams.consumers.consumers.get_last_status', get_last_status), \
+                patch('streams.consumers.consumers.SOCKET_SLEEP', 0.01):
+            self.loop.run_until_complete(stream_subscription(ws=self.ws,
+                                                             subscription=subscription,
+                                                             instance=self.instance,
+                                                             listener=self.listener,
+                                                             lifecycle=JobLifeCycle))
+        assert self.sent == ['message 1', 'message 2']
+        assert next(statuses, None) is None
@@ -0,0 +1,109 @@
+import asyncio
+import json
+
+import pytest
+
+from mock import MagicMock
+
+from streams.log_streams import (
+    PodLogStream,
+    filter_log_lines,
+    get_pod_cursor,
+    parse_cursor,
+    parse_cursors
+)
+from tests.utils import BaseTest
+
+
+def get_log_line(second, text):
+    return '2019-01-01T10:00:0{}.000000000Z {}'.format(second, text)
+
+
+@pytest.mark.streams_mark
+class TestLogCursors(BaseTest):
+    def test_parse_cursor(self):
+        assert parse_cursor('2019-01-01T10:00:00Z') == '2019-01-01T10:00:00.000000000Z'
+        assert parse_cursor('2019-01-01T10:00:00.5Z') == '2019-01-01T10:00:00.500000000Z'
+        assert parse_cursor(
+            '2019-01-01T10:00:00.1234567891Z') == '2019-01-01T10:00:00.123456789Z'
+        assert parse_cursor('2019-01-01 10:00:00') is None
+        assert parse_cursor('') is None
+        assert parse_cursor(None) is None
+
+    def test_parse_cursors(self):
+        cursor = '2019-01-01T10:00:01Z'
+        assert parse_cursors(None) == {}
+        assert parse_cursors('foo') == {}
+        assert parse_cursors(cursor) == {None: parse_cursor(cursor)}
+
+        cursors = parse_cursors(json.dumps({'pod1': cursor, 'pod2': 'foo'}))
+        assert cursors == {'pod1': parse_cursor(cursor)}
+        assert get_pod_cursor(cursors, 'pod1') == parse_cursor(cursor)
+        assert get_pod_cursor(cursors, 'pod2') is None
+        assert get_pod_cursor(parse_cursors(cursor), 'pod2') == parse_cursor(cursor)
+
+    def test_filter_log_lines(self):
+        log_lines = [get_log_line(0, 'line 0'),
+                     get_log_line(1, 'line 1'),
+                     get_log_line(1, 'line 1 bis'),
+                     'line without timestamp',
+                     get_log_line(2, 'line 2')]
+        assert filter_log_lines(log_lines, None) == log_lines
+        # The lines with the same timestamp as the cursor are kept
+        assert filter_log_lines(log_lines, parse_cursor('2019-01-01T10:00:01Z')) == log_lines[1:]
+        assert filter_log_lines(log_lines, parse_cursor('2019-01-01T10:00:03Z')) == [
+            'line without timestamp']
+
+
+@pytest.mark.streams_mark
+class TestPodLogStream(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.stream = PodLogStream(streams={}, pod_id='pod1', container='c', namespace='n')
+        self.ws_manager = MagicMock(ws={'ws1', 'ws2'})
+        self.stream.subscribers[self.ws_manager] = (None, None)
+
+    def get_published(self):
+        published = {}
+        for call in self.ws_manager.publish.call_args_list:
+            message = json.loads(call[0][0])
+            for ws in call[1]['sockets']:
+                published.setdefault(ws, []).append(message)
+        return published
+
+    def test_broadcast_resumes_sockets_from_their_cursor(self):
+        self.stream.since['ws2'] = parse_cursor('2019-01-01T10:00:01Z')
+        self.stream.broadcast([get_log_line(0, 'line 0'), get_log_line(1, 'line 1')])
+        assert 'ws2' in self.stream.since
+        self.stream.broadcast([get_log_line(2, 'line 2')])
+        assert 'ws2' not in self.stream.since
+
+        published = self.get_published()
+        assert [len(message['log_lines']) for message in published['ws1']] == [2, 1]
+        assert [len(message['log_lines']) for message in published['ws2']] == [1, 1]
+        assert published['ws2'][-1]['cursor'] == parse_cursor('2019-01-01T10:00:02Z')
+        assert {message['pod_id'] for message in published['ws2']} == {'pod1'}
+
+    def test_run_closes_the_response_when_cancelled(self):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        resp = MagicMock()
+
+        async def readline():
+            await asyncio.sleep(10)
+
+        async def read_namespaced_pod_log(*args, **kwargs):
+            return resp
+
+        resp.content.readline = readline
+        k8s_api = MagicMock(read_namespaced_pod_log=read_namespaced_pod_log)
+
+        async def cancel():
+            task = asyncio.ensure_future(self.stream.run(k8s_api))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        loop.run_until_complete(cancel())
+        resp.close.assert_called_once_with()
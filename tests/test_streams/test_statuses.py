@@ -0,0 +1,75 @@
+import asyncio
+import json
+
+import pytest
+
+from mock import MagicMock, patch
+from redis import RedisError
+
+from db.redis.statuses import RedisStatuses
+from streams.statuses import StatusesListener, get_last_status
+from tests.utils import BaseTest
+
+
+class FakePubSub(object):
+    def __init__(self, messages, on_listen=None):
+        self.messages = messages
+        self.on_listen = on_listen
+
+    def listen(self):
+        if self.on_listen:
+            self.on_listen()
+        yield from self.messages
+        raise RedisError('Connection closed')
+
+    def close(self):
+        pass
+
+
+def get_message(uuid, status):
+    return {'type': 'message', 'data': json.dumps({'uuid': uuid, 'status': status})}
+
+
+@pytest.mark.streams_mark
+class TestStatusesListener(BaseTest):
+    def setUp(self):
+        super().setUp()
+        loop = MagicMock()
+        loop.call_soon_threadsafe.side_effect = lambda callback, *args: callback(*args)
+        self.listener = StatusesListener(loop=loop)
+
+    def test_clears_statuses_on_resubscribe(self):
+        states = []
+
+        def on_resubscribe():
+            states.append((self.listener.is_connected, self.listener.get_status('uuid1')))
+            self.listener.stop()
+
+        pubsubs = [FakePubSub([get_message('uuid1', 'running')]),
+                   FakePubSub([], on_listen=on_resubscribe)]
+        with patch.object(RedisStatuses, 'subscribe', side_effect=pubsubs), \
+                patch('streams.statuses.time.sleep'):
+            self.listener._listen()  # pylint:disable=protected-access
+
+        # The status pushed on the dropped subscription is not served anymore
+        assert states == [(True, None)]
+        assert self.listener.is_connected is False
+
+    def test_get_last_status_falls_back_to_db_once_disconnected(self):
+        instance = MagicMock(last_status='succeeded')
+        instance.uuid.hex = 'uuid1'
+        self.listener.reset(True)
+        self.listener.set_status('uuid1', 'running')
+
+        async def refresh_from_db(_):
+            pass
+
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        with patch('streams.statuses.refresh_from_db', refresh_from_db):
+            assert loop.run_until_complete(
+                get_last_status(self.listener, instance)) == 'running'
+            self.listener.reset(False)
+            assert self.listener.get_status('uuid1') is None
+            assert loop.run_until_complete(
+                get_last_status(self.listener, instance)) == 'succeeded'